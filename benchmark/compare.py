@@ -0,0 +1,78 @@
+import argparse
+import json
+import sys
+
+
+# Métrica do resumo -> True quando um valor maior é pior.
+COMPARED_METRICS = {
+    ("latency_ms", "p50"): True,
+    ("latency_ms", "p95"): True,
+    ("latency_ms", "p99"): True,
+    ("throughput_rps",): False,
+}
+
+
+def _lookup(data: dict, path: tuple[str, ...]):
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def compare_results(baseline: dict, current: dict, max_regression: float) -> tuple[list[dict], list[str]]:
+    """
+    Compara o resumo de duas execuções. Retorna as linhas da comparação e as regressões acima
+    de 'max_regression' (fração, ex.: 0.1 = 10%), incluindo o aumento da taxa de erros.
+    """
+    rows = []
+    regressions = []
+    for path, higher_is_worse in COMPARED_METRICS.items():
+        name = ".".join(path)
+        before = _lookup(baseline["summary"], path)
+        after = _lookup(current["summary"], path)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        rows.append({"metric": name, "baseline": before, "current": after, "change": change})
+        if (change if higher_is_worse else -change) > max_regression:
+            regressions.append(f"{name}: {before:.2f} -> {after:.2f} ({change:+.1%})")
+
+    for stage, after in sorted(current.get("stages", {}).items()):
+        before = baseline.get("stages", {}).get(stage)
+        if before and before.get("p95_ms"):
+            change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"]
+            rows.append({"metric": f"stage.{stage}.p95_ms", "baseline": before["p95_ms"], "current": after["p95_ms"], "change": change})
+
+    error_rate_before = baseline["summary"].get("error_rate", 0)
+    error_rate_after = current["summary"].get("error_rate", 0)
+    if error_rate_after > error_rate_before:
+        regressions.append(f"error_rate: {error_rate_before:.2%} -> {error_rate_after:.2%}")
+    return rows, regressions
+
+
+def print_comparison(rows: list[dict], regressions: list[str]):
+    print(f"{'métrica':<40} {'base':>12} {'atual':>12} {'variação':>10}")
+    for row in rows:
+        print(f"{row['metric']:<40} {row['baseline']:>12.2f} {row['current']:>12.2f} {row['change']:>+10.1%}")
+    if regressions:
+        print("\nRegressões acima do limite:")
+        for regression in regressions:
+            print(f"  - {regression}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark em JSON.")
+    parser.add_argument("baseline", help="Resultado de referência.")
+    parser.add_argument("current", help="Resultado da execução atual.")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="Piora máxima tolerada (fração).")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as baseline_file, open(args.current, encoding="utf-8") as current_file:
+        rows, regressions = compare_results(json.load(baseline_file), json.load(current_file), args.max_regression)
+    print_comparison(rows, regressions)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+
+
+# Número de blocos de funções por tamanho de trecho; cada bloco tem cerca de 25 linhas.
+SIZES = {
+    "small": 1,
+    "medium": 4,
+    "large": 16,
+    "xlarge": 48,
+}
+
+HEADER = """import hashlib
+import os
+import subprocess
+"""
+
+# Cada bloco tem achados do bandit (shell=True, md5, eval), do flake8 (linha longa, espaçamento)
+# e um laço custoso para o cProfile. As funções perigosas nunca são chamadas: o agente de
+# performance executa o trecho.
+UNIT_TEMPLATE = """
+
+def run_command_{index}(command):
+    return subprocess.check_output(command, shell=True)
+
+
+def checksum_{index}(data):
+    return hashlib.md5(data).hexdigest()
+
+
+def evaluate_{index}(expression):
+    return eval(expression)
+
+
+def build_report_{index}(items):
+    report = ""
+    for item in items:
+        report = report + str(item) + ","
+    return report
+
+
+def slow_sum_{index}(limit):
+    total=0
+    for value in range(limit):
+        total += sum([value for _ in range(10)])
+    return total  # {padding}
+"""
+
+FOOTER = """
+
+if __name__ == "__main__":
+    print(slow_sum_0(2000), len(build_report_0(range(500))), os.getcwd())
+"""
+
+
+def build_snippet(units: int) -> str:
+    body = "".join(UNIT_TEMPLATE.format(index=index, padding="x" * 80) for index in range(units))
+    return HEADER + body + FOOTER
+
+
+def load_corpus(sizes: list[str], corpus_dir: str | None = None) -> list[dict]:
+    """
+    Monta o corpus determinístico do benchmark: um trecho gerado por tamanho pedido, mais os
+    arquivos .py de 'corpus_dir' (se informado), em ordem alfabética.
+    """
+    corpus = [
+        {"name": f"generated_{size}", "size": size, "code": build_snippet(SIZES[size])}
+        for size in sizes
+    ]
+    if corpus_dir:
+        for file_name in sorted(os.listdir(corpus_dir)):
+            if file_name.endswith(".py"):
+                with open(os.path.join(corpus_dir, file_name), encoding="utf-8") as corpus_file:
+                    corpus.append({"name": file_name, "size": "custom", "code": corpus_file.read()})
+    for entry in corpus:
+        entry["lines"] = entry["code"].count("\n") + 1
+        entry["bytes"] = len(entry["code"].encode("utf-8"))
+    return corpus
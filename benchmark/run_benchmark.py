@@ -0,0 +1,420 @@
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from compare import compare_results, print_comparison
+from corpus import SIZES, load_corpus
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARK_DIR)
+
+# Serviço -> deslocamento da porta em relação a --base-port (o servidor LLM simulado usa a própria base).
+SERVICE_PORT_OFFSETS = {
+    "security_agent": 1,
+    "performance_agent": 2,
+    "codestyle_agent": 3,
+    "orchestrator": 4,
+}
+AGENT_URL_VARIABLES = {
+    "security_agent": "SECURITY_AGENT_URL",
+    "performance_agent": "PERFORMANCE_AGENT_URL",
+    "codestyle_agent": "CODESTYLE_AGENT_URL",
+}
+# Histogramas das métricas de cada serviço usados no detalhamento por etapa:
+# nome sem o prefixo do serviço -> (rótulo que identifica a etapa, prefixo do nome da etapa no resultado).
+STAGE_HISTOGRAMS = {
+    "pipeline_stage_duration_seconds": ("stage", ""),
+    "tool_duration_seconds": ("tool", "tool:"),
+    "llm_request_duration_seconds": ("model", "llm:"),
+    "db_operation_duration_seconds": ("operation", "db:"),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Sobe os serviços contra um LLM simulado e um banco SQLite e mede a latência de /orchestrate-analysis."
+    )
+    parser.add_argument("--requests", type=int, default=40, help="Total de requisições medidas.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Requisições simultâneas.")
+    parser.add_argument("--warmup-requests", type=int, default=2, help="Requisições iniciais descartadas.")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Tamanhos de trecho gerados ({', '.join(SIZES)}).")
+    parser.add_argument("--corpus-dir", help="Diretório com arquivos .py adicionados ao corpus.")
+    parser.add_argument("--mode", choices=["fanout", "crew"], default="fanout",
+                        help="Modo de orquestração. 'crew' exige um LLM que acione ferramentas; o simulado não aciona.")
+    parser.add_argument("--deployment", choices=["http", "inprocess"], default="http",
+                        help="Agentes como microsserviços ou importados no orquestrador.")
+    parser.add_argument("--use-history", action="store_true",
+                        help="Não envia force_refresh, permitindo reaproveitar análises do banco.")
+    parser.add_argument("--enable-caches", action="store_true",
+                        help="Mantém os caches de resultado e a base de sugestões dos agentes.")
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="Latência fixa do LLM simulado.")
+    parser.add_argument("--llm-ms-per-output-token", type=float, default=0, help="Latência adicional por token de saída.")
+    parser.add_argument("--llm-output-tokens", type=int, default=200, help="Tokens de saída de cada resposta simulada.")
+    parser.add_argument("--model-name", default="gemini-2.0-flash",
+                        help="Modelo informado aos serviços; precisa ser conhecido pelo litellm.")
+    parser.add_argument("--service-env", action="append", default=[], metavar="CHAVE=VALOR",
+                        help="Variável de ambiente extra para todos os serviços (pode ser repetida).")
+    parser.add_argument("--base-port", type=int, default=9100)
+    parser.add_argument("--ready-timeout", type=float, default=180, help="Tempo máximo de espera por /ready.")
+    parser.add_argument("--request-timeout", type=float, default=300)
+    parser.add_argument("--target-url", help="Mede um orquestrador já em execução em vez de subir os serviços.")
+    parser.add_argument("--output", help="Arquivo JSON do resultado (padrão: benchmark/results/<data>.json).")
+    parser.add_argument("--baseline", help="Resultado anterior para comparação; sai com código 1 se houver regressão.")
+    parser.add_argument("--max-regression", type=float, default=0.1, help="Piora máxima tolerada na comparação (fração).")
+    return parser.parse_args()
+
+
+def _service_environment(args, ports: dict[str, int], work_dir: str) -> dict[str, dict[str, str]]:
+    stub_url = f"http://127.0.0.1:{args.base_port}"
+    common = {
+        **os.environ,
+        "PYTHONUNBUFFERED": "1",
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "GOOGLE_API_KEY": "benchmark",
+        "MODEL_NAME": args.model_name,
+        "LLM_API_BASE": f"{stub_url}/v1beta/models/{args.model_name}",
+        # O token bucket não deve limitar o benchmark, a menos que seja pedido em --service-env.
+        "LLM_RATE_LIMIT_PER_MINUTE": "1000000",
+        "LLM_RATE_LIMIT_BURST": "1000",
+    }
+    if not args.enable_caches:
+        common.update({"CACHE_ENABLED": "false", "SUGGESTION_KB_ENABLED": "false"})
+    for assignment in args.service_env:
+        key, _, value = assignment.partition("=")
+        common[key] = value
+
+    environments = {
+        name: {**common, "SERVICE_NAME": name}
+        for name in SERVICE_PORT_OFFSETS if name in ports
+    }
+    environments["orchestrator"].update({
+        "DATABASE_URL": f"sqlite:///{os.path.join(work_dir, 'benchmark.db')}",
+        "AGENT_DEPLOYMENT_MODE": args.deployment,
+        **{
+            variable: f"http://127.0.0.1:{ports[name]}"
+            for name, variable in AGENT_URL_VARIABLES.items() if name in ports
+        },
+    })
+    return environments
+
+
+def _launch(command: list[str], cwd: str, env: dict, log_path: str, stack: ExitStack) -> subprocess.Popen:
+    log_file = stack.enter_context(open(log_path, "w", encoding="utf-8"))
+    process = subprocess.Popen(command, cwd=cwd, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+    def stop():
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    stack.callback(stop)
+    return process
+
+
+def _wait_until_ready(name: str, url: str, process: subprocess.Popen, timeout: float, log_path: str):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} encerrou durante a inicialização; veja {log_path}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{name} não ficou pronto em {timeout:.0f}s; veja {log_path}")
+
+
+def start_stack(args, work_dir: str, stack: ExitStack) -> str:
+    """
+    Sobe o LLM simulado e os serviços (os agentes só no modo http), aguarda /ready de cada um
+    e retorna a URL do orquestrador.
+    """
+    names = list(SERVICE_PORT_OFFSETS) if args.deployment == "http" else ["orchestrator"]
+    ports = {name: args.base_port + SERVICE_PORT_OFFSETS[name] for name in names}
+    environments = _service_environment(args, ports, work_dir)
+
+    stub_env = {
+        **os.environ,
+        "STUB_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "STUB_LLM_MS_PER_OUTPUT_TOKEN": str(args.llm_ms_per_output_token),
+        "STUB_LLM_OUTPUT_TOKENS": str(args.llm_output_tokens),
+    }
+    processes = {"stub_llm": (
+        _launch(
+            [sys.executable, "-m", "uvicorn", "stub_llm:app", "--host", "127.0.0.1", "--port", str(args.base_port)],
+            BENCHMARK_DIR, stub_env, os.path.join(work_dir, "stub_llm.log"), stack
+        ),
+        f"http://127.0.0.1:{args.base_port}/health",
+    )}
+    for name, port in ports.items():
+        processes[name] = (
+            _launch(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+                os.path.join(REPO_ROOT, name, "app"), environments[name], os.path.join(work_dir, f"{name}.log"), stack
+            ),
+            f"http://127.0.0.1:{port}/ready",
+        )
+
+    for name, (process, ready_url) in processes.items():
+        _wait_until_ready(name, ready_url, process, args.ready_timeout, os.path.join(work_dir, f"{name}.log"))
+        print(f"{name} pronto.")
+    return f"http://127.0.0.1:{ports['orchestrator']}"
+
+
+def parse_server_timing(header: str | None) -> dict[str, float]:
+    timings = {}
+    for entry in (header or "").split(","):
+        name, _, params = entry.strip().partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if name and key == "dur":
+                timings[name] = float(value)
+    return timings
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """
+    Percentil com interpolação linear entre as amostras ordenadas.
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(values: list[float]) -> dict[str, float]:
+    return {
+        "mean": round(sum(values) / len(values), 2) if values else 0.0,
+        "p50": round(percentile(values, 0.50), 2),
+        "p95": round(percentile(values, 0.95), 2),
+        "p99": round(percentile(values, 0.99), 2),
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+async def _send(client: httpx.AsyncClient, url: str, entry: dict, args) -> dict:
+    payload = {"code": entry["code"], "mode": args.mode, "force_refresh": not args.use_history}
+    started = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/orchestrate-analysis", json=payload)
+        status = response.status_code
+        timings = parse_server_timing(response.headers.get("Server-Timing"))
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+        timings = {}
+    return {
+        "name": entry["name"],
+        "size": entry["size"],
+        "status": status,
+        "latency_ms": (time.perf_counter() - started) * 1000,
+        "stages": timings,
+    }
+
+
+async def replay(url: str, corpus: list[dict], total: int, args) -> tuple[list[dict], float]:
+    """
+    Reenvia o corpus em ordem circular com 'args.concurrency' requisições simultâneas (carga em
+    malha fechada: cada worker envia a próxima requisição assim que recebe a resposta).
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for index in range(total):
+        queue.put_nowait(corpus[index % len(corpus)])
+    samples = []
+
+    async with httpx.AsyncClient(timeout=args.request_timeout) as client:
+        async def worker():
+            while not queue.empty():
+                samples.append(await _send(client, url, queue.get_nowait(), args))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(max(1, args.concurrency))))
+        return samples, time.perf_counter() - started
+
+
+def scrape_stage_totals(url: str) -> dict[str, dict[str, dict[str, float]]]:
+    """
+    Lê /metrics de um serviço e retorna, por serviço (prefixo das métricas) e etapa, a soma e a contagem dos histogramas
+    de etapas, ferramentas e chamadas ao LLM.
+    """
+    totals: dict[str, dict[str, dict[str, float]]] = {}
+    try:
+        text = httpx.get(f"{url}/metrics", timeout=5).text
+    except httpx.HTTPError:
+        return totals
+    for family in text_string_to_metric_families(text):
+        # Os nomes têm o prefixo do serviço (METRICS_PREFIX), o que separa os agentes no modo em processo.
+        histogram = next((name for name in STAGE_HISTOGRAMS if family.name.endswith(f"_{name}")), None)
+        if histogram is None:
+            continue
+        service = family.name[:-len(histogram) - 1]
+        label, prefix = STAGE_HISTOGRAMS[histogram]
+        for sample in family.samples:
+            if not sample.name.endswith(("_sum", "_count")):
+                continue
+            stage = f"{prefix}{sample.labels[label]}"
+            entry = totals.setdefault(service, {}).setdefault(stage, {"sum": 0.0, "count": 0.0})
+            entry["sum" if sample.name.endswith("_sum") else "count"] += sample.value
+    return totals
+
+
+def _stage_deltas(before: dict, after: dict) -> dict[str, dict[str, dict[str, float]]]:
+    breakdown = {}
+    for service, stages in after.items():
+        for stage, values in stages.items():
+            previous = before.get(service, {}).get(stage, {"sum": 0.0, "count": 0.0})
+            count = values["count"] - previous["count"]
+            if count > 0:
+                breakdown.setdefault(service, {})[stage] = {
+                    "count": int(count),
+                    "mean_ms": round((values["sum"] - previous["sum"]) / count * 1000, 2),
+                }
+    return breakdown
+
+
+def build_results(args, corpus: list[dict], samples: list[dict], duration: float,
+                  service_stages: dict, llm_stats: dict | None) -> dict:
+    succeeded = [sample for sample in samples if sample["status"] == 200]
+    errors_by_status: dict[str, int] = {}
+    for sample in samples:
+        if sample["status"] != 200:
+            errors_by_status[str(sample["status"])] = errors_by_status.get(str(sample["status"]), 0) + 1
+
+    by_size = {}
+    for size in dict.fromkeys(entry["size"] for entry in corpus):
+        size_samples = [sample for sample in samples if sample["size"] == size]
+        by_size[size] = {
+            "requests": len(size_samples),
+            "errors": sum(1 for sample in size_samples if sample["status"] != 200),
+            "latency_ms": latency_summary([sample["latency_ms"] for sample in size_samples if sample["status"] == 200]),
+        }
+
+    stage_values: dict[str, list[float]] = {}
+    for sample in succeeded:
+        for stage, value in sample["stages"].items():
+            stage_values.setdefault(stage, []).append(value)
+    stages = {
+        stage: {"count": len(values), **{f"{key}_ms": value for key, value in latency_summary(values).items()}}
+        for stage, values in stage_values.items()
+    }
+
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        "version": 1,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": revision,
+        "config": {
+            key: value for key, value in vars(args).items()
+            if key not in ("output", "baseline", "max_regression")
+        },
+        "corpus": [{key: entry[key] for key in ("name", "size", "lines", "bytes")} for entry in corpus],
+        "summary": {
+            "requests": len(samples),
+            "succeeded": len(succeeded),
+            "errors": len(samples) - len(succeeded),
+            "error_rate": round((len(samples) - len(succeeded)) / len(samples), 4) if samples else 0.0,
+            "duration_seconds": round(duration, 3),
+            "throughput_rps": round(len(succeeded) / duration, 3) if duration else 0.0,
+            "latency_ms": latency_summary([sample["latency_ms"] for sample in succeeded]),
+        },
+        "errors_by_status": errors_by_status,
+        "by_size": by_size,
+        "stages": stages,
+        "service_stages": service_stages,
+        "llm": llm_stats,
+    }
+
+
+def run(args, work_dir: str) -> dict:
+    corpus = load_corpus([size for size in args.sizes.split(",") if size], args.corpus_dir)
+    if not corpus:
+        raise ValueError("O corpus está vazio.")
+
+    with ExitStack() as stack:
+        url = args.target_url.rstrip("/") if args.target_url else start_stack(args, work_dir, stack)
+        metrics_urls = [url]
+        if not args.target_url and args.deployment == "http":
+            metrics_urls += [f"http://127.0.0.1:{args.base_port + SERVICE_PORT_OFFSETS[name]}" for name in AGENT_URL_VARIABLES]
+
+        if args.warmup_requests:
+            asyncio.run(replay(url, corpus, args.warmup_requests, args))
+
+        stub_url = None if args.target_url else f"http://127.0.0.1:{args.base_port}"
+        if stub_url:
+            httpx.post(f"{stub_url}/stats/reset", timeout=5)
+        before = {}
+        for metrics_url in metrics_urls:
+            before.update(scrape_stage_totals(metrics_url))
+
+        print(f"Enviando {args.requests} requisições com concorrência {args.concurrency}...")
+        samples, duration = asyncio.run(replay(url, corpus, args.requests, args))
+
+        after = {}
+        for metrics_url in metrics_urls:
+            after.update(scrape_stage_totals(metrics_url))
+        llm_stats = httpx.get(f"{stub_url}/stats", timeout=5).json() if stub_url else None
+
+    return build_results(args, corpus, samples, duration, _stage_deltas(before, after), llm_stats)
+
+
+def main():
+    args = parse_args()
+    output = args.output or os.path.join(
+        BENCHMARK_DIR, "results", f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as work_dir:
+        try:
+            results = run(args, work_dir)
+        except RuntimeError as e:
+            for log_name in sorted(os.listdir(work_dir)):
+                if log_name.endswith(".log"):
+                    with open(os.path.join(work_dir, log_name), encoding="utf-8") as log_file:
+                        print(f"--- {log_name} ---\n{log_file.read()[-4000:]}", file=sys.stderr)
+            sys.exit(f"Falha ao subir os serviços: {e}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as output_file:
+        json.dump(results, output_file, indent=2, ensure_ascii=False)
+
+    summary = results["summary"]
+    latency = summary["latency_ms"]
+    print(
+        f"{summary['succeeded']}/{summary['requests']} requisições em {summary['duration_seconds']}s "
+        f"({summary['throughput_rps']} req/s) - p50 {latency['p50']} ms, p95 {latency['p95']} ms, p99 {latency['p99']} ms"
+    )
+    for stage, values in sorted(results["stages"].items()):
+        print(f"  {stage:<28} média {values['mean_ms']:>9.1f} ms   p95 {values['p95_ms']:>9.1f} ms")
+    print(f"Resultado gravado em {output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            rows, regressions = compare_results(json.load(baseline_file), results, args.max_regression)
+        print_comparison(rows, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import threading
+from http import HTTPStatus
+
+from fastapi import FastAPI, HTTPException, Request
+
+
+LATENCY_MS = float(os.environ.get("STUB_LLM_LATENCY_MS", "200"))
+MS_PER_OUTPUT_TOKEN = float(os.environ.get("STUB_LLM_MS_PER_OUTPUT_TOKEN", "0"))
+OUTPUT_TOKENS = int(os.environ.get("STUB_LLM_OUTPUT_TOKENS", "200"))
+SUGGESTIONS_PER_RESPONSE = int(os.environ.get("STUB_LLM_SUGGESTIONS", "2"))
+
+CHARS_PER_TOKEN = 4
+FILLER = "Trecho de explicação gerado pelo servidor simulado para ocupar o orçamento de tokens de saída. "
+FILE_SECTION_PATTERN = re.compile(r"^### Arquivo: (.+)$", re.MULTILINE)
+
+
+app = FastAPI(title="Stub LLM (Gemini)")
+
+_stats_lock = threading.Lock()
+_stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _prompt_text(body: dict) -> str:
+    parts = []
+    for content in [body.get("system_instruction") or body.get("systemInstruction") or {}, *body.get("contents", [])]:
+        parts.extend(part.get("text", "") for part in content.get("parts", []))
+    return "\n".join(parts)
+
+
+def _suggestions(token_budget: int, label: str) -> list[dict]:
+    """
+    Gera sugestões determinísticas cujo texto soma aproximadamente 'token_budget' tokens.
+    """
+    count = max(1, SUGGESTIONS_PER_RESPONSE)
+    chars_per_suggestion = max(1, token_budget * CHARS_PER_TOKEN // count)
+    explanation = (FILLER * (chars_per_suggestion // len(FILLER) + 1))[:chars_per_suggestion]
+    return [
+        {
+            "title": f"Sugestão simulada {index + 1} ({label})",
+            "explanation": explanation,
+            "code_example": "def exemplo():\n    return None",
+        }
+        for index in range(count)
+    ]
+
+
+def build_answer(prompt: str, generation_config: dict) -> str:
+    """
+    Monta a resposta no formato esperado pelos agentes: {'results': [...]} para os prompts de lote
+    (com seções '### Arquivo:'), {'suggestions': [...]} para os demais.
+    """
+    paths = FILE_SECTION_PATTERN.findall(prompt)
+    if paths or '"results"' in json.dumps(generation_config):
+        token_budget = max(1, OUTPUT_TOKENS // max(1, len(paths)))
+        return json.dumps({
+            "results": [{"path": path.strip(), "suggestions": _suggestions(token_budget, path.strip())} for path in paths]
+        })
+    return json.dumps({"suggestions": _suggestions(OUTPUT_TOKENS, "trecho")})
+
+
+@app.get("/stats")
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+@app.post("/stats/reset")
+def reset_stats():
+    with _stats_lock:
+        for key in _stats:
+            _stats[key] = 0
+    return {"status": "reset"}
+
+
+@app.get("/health")
+def health_check():
+    return {"status": "ok"}
+
+
+# Registrada por último: a rota genérica capturaria as demais requisições POST.
+@app.post("/{path:path}")
+async def generate_content(path: str, request: Request):
+    """
+    Responde no formato da API generateContent do Gemini (o mesmo usado pelo litellm), com latência
+    determinística: STUB_LLM_LATENCY_MS mais STUB_LLM_MS_PER_OUTPUT_TOKEN por token de saída.
+    """
+    if not path.endswith(":generateContent"):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Endpoint não simulado: {path}")
+
+    body = await request.json()
+    prompt = _prompt_text(body)
+    answer = build_answer(prompt, body.get("generationConfig") or body.get("generation_config") or {})
+    prompt_tokens = estimate_tokens(prompt)
+    completion_tokens = estimate_tokens(answer)
+
+    await asyncio.sleep((LATENCY_MS + MS_PER_OUTPUT_TOKEN * completion_tokens) / 1000)
+
+    with _stats_lock:
+        _stats["calls"] += 1
+        _stats["prompt_tokens"] += prompt_tokens
+        _stats["completion_tokens"] += completion_tokens
+
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": answer}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {
+            "promptTokenCount": prompt_tokens,
+            "candidatesTokenCount": completion_tokens,
+            "totalTokenCount": prompt_tokens + completion_tokens,
+        },
+        "modelVersion": path.split("/")[-1].split(":")[0],
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Servidor LLM simulado no formato da API do Gemini.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -0,0 +1,95 @@
+import logging
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from crew import CrewPool
+
+import config
+import models
+from metrics import timed
+from structured_output import parse_with_repair
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa grosseira de tokens (~4 caracteres por token), suficiente para montar os lotes.
+    """
+    return len(text) // 4 + 1
+
+
+def render_file_section(path: str, code: str, report: str) -> str:
+    return (
+        f"### Arquivo: {path}\n"
+        f"Código:\n```python\n{code}\n```\n"
+        f"Relatório da ferramenta:\n{report}\n"
+    )
+
+
+def pack_sections(sections: dict[str, str], token_budget: int) -> list[dict[str, str]]:
+    """
+    Agrupa as seções dos arquivos em lotes cujo tamanho estimado não ultrapassa o orçamento de tokens.
+    Um arquivo maior que o orçamento forma um lote sozinho.
+    """
+    packs, current, current_tokens = [], {}, 0
+    for path, section in sections.items():
+        section_tokens = estimate_tokens(section)
+        if current and current_tokens + section_tokens > token_budget:
+            packs.append(current)
+            current, current_tokens = {}, 0
+        current[path] = section
+        current_tokens += section_tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+def analyze_batch(
+    files: list[models.FileInput],
+    run_tool_batch: Callable[[dict[str, str]], dict[str, str]],
+    batch_crews: "CrewPool",
+    fast_path: Callable[[str], models.AnalysisResponse | None] | None = None,
+    code_context: Callable[[str, str], str] | None = None
+) -> models.BatchAnalysisResponse:
+    """
+    Executa a ferramenta uma única vez sobre todos os arquivos e enriquece os achados com o LLM,
+    enviando vários arquivos por chamada até o limite de LLM_BATCH_TOKEN_BUDGET.
+    Arquivos cujo relatório é resolvido por 'fast_path' não são enviados ao LLM. Com 'code_context',
+    cada arquivo é enviado como o trecho que ela devolve para o código e o relatório da ferramenta.
+    """
+    code_by_path = {file.path: file.code for file in files}
+    reports = run_tool_batch(code_by_path)
+
+    suggestions_by_path = {path: [] for path in code_by_path}
+    sections = {}
+    for path, code in code_by_path.items():
+        fast_response = fast_path(reports.get(path, "")) if fast_path is not None else None
+        if fast_response is not None:
+            suggestions_by_path[path] = list(fast_response.suggestions)
+        else:
+            report = reports.get(path, "")
+            sections[path] = render_file_section(path, code_context(code, report) if code_context else code, report)
+
+    packs = pack_sections(sections, config.LLM_BATCH_TOKEN_BUDGET)
+    logging.info(
+        f"Análise em lote: {len(files) - len(sections)} arquivos resolvidos sem o LLM, "
+        f"{len(sections)} agrupados em {len(packs)} chamadas ao LLM."
+    )
+
+    for pack in packs:
+        with batch_crews.checkout() as batch_crew:
+            with timed("crew"):
+                result = batch_crew.kickoff(inputs={"files": "\n".join(pack.values())})
+            batch_response = parse_with_repair(
+                result.tasks_output[0].raw, models.BatchAnalysisResponse, batch_crew.agents[0].llm
+            )
+
+        for file_analysis in batch_response.results:
+            if file_analysis.path in pack:
+                suggestions_by_path[file_analysis.path].extend(file_analysis.suggestions)
+            else:
+                logging.warning(f"O LLM retornou sugestões para um arquivo desconhecido: {file_analysis.path}")
+
+    return models.BatchAnalysisResponse(results=[
+        models.FileAnalysis(path=path, suggestions=suggestions)
+        for path, suggestions in suggestions_by_path.items()
+    ])
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from metrics import record_cache_lookup
+
+
+def normalize_code(code: str) -> str:
+    """
+    Normaliza o código para o cálculo do hash: padroniza quebras de linha,
+    remove espaços no fim das linhas e linhas vazias nas extremidades.
+    A indentação é preservada, pois faz parte da semântica do Python.
+    """
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n")
+
+
+def code_sha256(code: str) -> str:
+    return hashlib.sha256(normalize_code(code).encode("utf-8")).hexdigest()
+
+
+def make_cache_key(code: str, agent_name: str) -> str:
+    """
+    Gera a chave do cache a partir do código normalizado, do agente, do modelo e da versão do prompt.
+    """
+    key_material = f"{agent_name}|{config.MODEL_NAME}|{config.PROMPT_VERSION}|{code_sha256(code)}"
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Cache de resultados em dois níveis: um LRU em memória, limitado por quantidade
+    de entradas e TTL, e um nível compartilhado opcional em um arquivo SQLite.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, sqlite_path: str | None = None, sqlite_max_entries: int = 10000, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_max_entries = sqlite_max_entries
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "shared_hits": 0, "evictions": 0}
+        self._db = None
+
+        if enabled and sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS result_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS idx_result_cache_last_access ON result_cache (last_access)")
+            self._db.commit()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, value: dict):
+        self._entries[key] = (created_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _get_shared(self, key: str, now: float) -> tuple[float, dict] | None:
+        row = self._db.execute("SELECT value, created_at FROM result_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if self._is_expired(created_at, now):
+            self._db.execute("DELETE FROM result_cache WHERE key = ?", (key,))
+            self._db.commit()
+            return None
+        self._db.execute("UPDATE result_cache SET last_access = ? WHERE key = ?", (now, key))
+        self._db.commit()
+        return created_at, json.loads(value)
+
+    def _set_shared(self, key: str, value: dict, now: float):
+        self._db.execute(
+            "INSERT OR REPLACE INTO result_cache (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now),
+        )
+        if self.ttl_seconds > 0:
+            self._db.execute("DELETE FROM result_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        self._db.execute(
+            "DELETE FROM result_cache WHERE key IN ("
+            "SELECT key FROM result_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.sqlite_max_entries,),
+        )
+        self._db.commit()
+
+    def get(self, key: str) -> dict | None:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._is_expired(entry[0], now):
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                self._counters["memory_hits"] += 1
+                record_cache_lookup("memory_hit")
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+            if self._db is not None:
+                try:
+                    shared_entry = self._get_shared(key, now)
+                except sqlite3.Error as e:
+                    logging.warning(f"Falha ao consultar o cache compartilhado: {e}")
+                    shared_entry = None
+                if shared_entry is not None:
+                    self._remember(key, *shared_entry)
+                    self._counters["hits"] += 1
+                    self._counters["shared_hits"] += 1
+                    record_cache_lookup("shared_hit")
+                    return shared_entry[1]
+
+            self._counters["misses"] += 1
+            record_cache_lookup("miss")
+            return None
+
+    def set(self, key: str, value: dict):
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, value)
+            if self._db is not None:
+                try:
+                    self._set_shared(key, value, now)
+                except sqlite3.Error as e:
+                    logging.warning(f"Falha ao gravar no cache compartilhado: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": self._counters["hits"] / lookups if lookups else 0.0,
+                "memory_entries": len(self._entries),
+                "enabled": self.enabled,
+                "shared_tier": self._db is not None,
+            }
+
+
+result_cache = ResultCache(
+    max_entries=config.CACHE_MAX_ENTRIES,
+    ttl_seconds=config.CACHE_TTL_SECONDS,
+    sqlite_path=config.CACHE_SQLITE_PATH,
+    sqlite_max_entries=config.CACHE_SQLITE_MAX_ENTRIES,
+    enabled=config.CACHE_ENABLED,
+)
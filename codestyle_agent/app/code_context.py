@@ -0,0 +1,67 @@
+import ast
+
+import config
+
+
+def _function_ranges(code: str) -> list[tuple[int, int]]:
+    """
+    Intervalos de linhas (com os decoradores) de todas as funções do código, inclusive métodos
+    e funções aninhadas. Código inválido não tem funções reconhecidas.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    return [
+        (min([decorator.lineno for decorator in node.decorator_list] + [node.lineno]), node.end_lineno)
+        for node in ast.walk(tree)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+    ]
+
+
+def finding_ranges(code: str, lines: list[int]) -> list[tuple[int, int]]:
+    """
+    Para cada linha apontada pela ferramenta, escolhe a menor função que a contém (se tiver até
+    CONTEXT_MAX_FUNCTION_LINES linhas) ou uma janela de CONTEXT_WINDOW_LINES linhas para cada lado.
+    Intervalos sobrepostos ou adjacentes são unidos.
+    """
+    total_lines = max(1, len(code.splitlines()))
+    functions = _function_ranges(code)
+    window = config.CONTEXT_WINDOW_LINES
+
+    ranges = []
+    for line in sorted(set(lines)):
+        line = min(max(line, 1), total_lines)
+        enclosing = [(start, end) for start, end in functions if start <= line <= end]
+        smallest = min(enclosing, key=lambda function: function[1] - function[0], default=None)
+        if smallest is not None and smallest[1] - smallest[0] + 1 <= config.CONTEXT_MAX_FUNCTION_LINES:
+            ranges.append(smallest)
+        else:
+            ranges.append((max(1, line - window), min(total_lines, line + window)))
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def build_code_context(code: str, lines: list[int]) -> str:
+    """
+    Monta o trecho enviado ao LLM: apenas as regiões ao redor dos achados, com o número original
+    de cada linha e '...' entre regiões. Códigos com até CONTEXT_FULL_CODE_MAX_LINES linhas, ou cujas
+    regiões cobririam o arquivo inteiro, são enviados completos.
+    """
+    code_lines = code.splitlines()
+    if not lines or len(code_lines) <= config.CONTEXT_FULL_CODE_MAX_LINES:
+        return code
+
+    ranges = finding_ranges(code, lines)
+    if sum(end - start + 1 for start, end in ranges) >= len(code_lines):
+        return code
+    return "\n...\n".join(
+        "\n".join(f"{number:>5} | {code_lines[number - 1]}" for number in range(start, end + 1))
+        for start, end in ranges
+    )
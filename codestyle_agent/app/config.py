@@ -1,8 +1,7 @@
 import os
 import logging
 
-from crewai import LLM
-from models import AnalysisResponse
+from models import AnalysisResponse, BatchAnalysisResponse
 
 
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
@@ -12,9 +11,99 @@ if not GOOGLE_API_KEY or not MODEL_NAME:
     logging.error("A GOOGLE_API_KEY and MODEL_NAME não estão configurada.")
     raise ValueError("GOOGLE_API_KEY and MODEL_NAME must be set in the environment variables.")
 
-llm = LLM(
-    model=f"gemini/{MODEL_NAME}",
-    api_key=GOOGLE_API_KEY,
-    temperature=0.3,
-    response_format=AnalysisResponse,
+PROMPT_VERSION = os.environ.get("PROMPT_VERSION", "1")
+# Endereço alternativo da API do Gemini (proxy ou servidor simulado dos benchmarks).
+LLM_API_BASE = os.environ.get("LLM_API_BASE") or None
+
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "codestyle_agent")
+# Prefixo fixo dos nomes das métricas: não vem do ambiente, para continuar único quando os
+# agentes são carregados no processo do orquestrador, que compartilha com eles o SERVICE_NAME.
+METRICS_PREFIX = "codestyle_agent"
+
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "none").lower()
+TRACING_FILE_PATH = os.environ.get("TRACING_FILE_PATH", f"/tmp/{SERVICE_NAME}-traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.environ.get("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", "86400"))
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH")
+CACHE_SQLITE_MAX_ENTRIES = int(os.environ.get("CACHE_SQLITE_MAX_ENTRIES", "10000"))
+
+FAST_PATH_ENABLED = os.environ.get("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_ALLOWLIST = frozenset(
+    code.strip().upper() for code in os.environ.get("FAST_PATH_ALLOWLIST", "W291,W292,W293,W391").split(",") if code.strip()
 )
+
+SUGGESTION_KB_ENABLED = os.environ.get("SUGGESTION_KB_ENABLED", "true").lower() == "true"
+SUGGESTION_KB_SQLITE_PATH = os.environ.get("SUGGESTION_KB_SQLITE_PATH")
+SUGGESTION_KB_SEED_PATH = os.environ.get("SUGGESTION_KB_SEED_PATH")
+SUGGESTION_KB_SNIPPET_SPECIFIC = frozenset(
+    code.strip().upper() for code in os.environ.get("SUGGESTION_KB_SNIPPET_SPECIFIC", "").split(",") if code.strip()
+)
+
+LLM_BATCH_TOKEN_BUDGET = int(os.environ.get("LLM_BATCH_TOKEN_BUDGET", "24000"))
+
+# Contexto enviado ao LLM: a função que contém cada achado ou uma janela de linhas ao redor dele.
+CONTEXT_WINDOW_LINES = int(os.environ.get("CONTEXT_WINDOW_LINES", "3"))
+CONTEXT_MAX_FUNCTION_LINES = int(os.environ.get("CONTEXT_MAX_FUNCTION_LINES", "40"))
+CONTEXT_FULL_CODE_MAX_LINES = int(os.environ.get("CONTEXT_FULL_CODE_MAX_LINES", "30"))
+
+ANALYZE_MAX_CONCURRENCY = int(os.environ.get("ANALYZE_MAX_CONCURRENCY", "4"))
+ANALYZE_MAX_QUEUE = int(os.environ.get("ANALYZE_MAX_QUEUE", "32"))
+
+# Roteamento entre modelos: casos simples vão primeiro ao modelo rápido, com escalonamento para
+# MODEL_NAME quando a resposta não valida. Sem FAST_MODEL_NAME, tudo vai ao modelo principal.
+FAST_MODEL_NAME = os.environ.get("FAST_MODEL_NAME") or None
+ROUTING_MAX_FINDINGS = int(os.environ.get("ROUTING_MAX_FINDINGS", "3"))
+ROUTING_MAX_CODE_LINES = int(os.environ.get("ROUTING_MAX_CODE_LINES", "80"))
+ROUTING_RACE = os.environ.get("ROUTING_RACE", "false").lower() == "true"
+ROUTING_RACE_DEADLINE_SECONDS = float(os.environ.get("ROUTING_RACE_DEADLINE_SECONDS", "60"))
+
+# Correção de respostas do LLM que não validam no schema: apenas a última etapa é repetida, com o erro de validação.
+STRUCTURED_OUTPUT_MAX_REPAIRS = int(os.environ.get("STRUCTURED_OUTPUT_MAX_REPAIRS", "2"))
+
+LLM_RATE_LIMIT_PER_MINUTE = float(os.environ.get("LLM_RATE_LIMIT_PER_MINUTE", "60"))
+LLM_RATE_LIMIT_BURST = int(os.environ.get("LLM_RATE_LIMIT_BURST", "10"))
+LLM_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "30"))
+
+_LLM_RESPONSE_FORMATS = {
+    "llm": AnalysisResponse,
+    "llm_for_batch": BatchAnalysisResponse,
+    "fast_llm": AnalysisResponse,
+}
+_LLM_MODELS = {
+    "fast_llm": FAST_MODEL_NAME,
+}
+_llms = {}
+
+
+def __getattr__(name: str):
+    """
+    Cria os objetos LLM sob demanda. Importar o crewai leva alguns segundos, por isso ele só é
+    carregado no aquecimento do serviço (ou no primeiro uso), e não ao importar a configuração.
+    Cada chamada ao LLM consome uma ficha do token bucket compartilhado pela chave de API
+    e tem sua latência e uso de tokens registrados nas métricas.
+    """
+    if name not in _LLM_RESPONSE_FORMATS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name not in _llms:
+        from crewai import LLM
+        from limits import llm_token_bucket, rate_limited
+        from metrics import instrumented_llm_call
+
+        model_name = _LLM_MODELS.get(name, MODEL_NAME)
+
+        llm_instance = LLM(
+            model=f"gemini/{model_name}",
+            api_key=GOOGLE_API_KEY,
+            api_base=LLM_API_BASE,
+            temperature=0.3,
+            response_format=_LLM_RESPONSE_FORMATS[name],
+        )
+        bucket = llm_token_bucket(
+            GOOGLE_API_KEY, LLM_RATE_LIMIT_PER_MINUTE, LLM_RATE_LIMIT_BURST, LLM_RATE_LIMIT_MAX_WAIT_SECONDS
+        )
+        llm_instance.call = rate_limited(instrumented_llm_call(llm_instance.call, model_name), bucket)
+        _llms[name] = llm_instance
+    return _llms[name]
@@ -0,0 +1,80 @@
+import config
+from models import AnalysisResponse, EnrichedSuggestion
+from findings import parse_findings
+from tools import NO_ISSUES_MESSAGE
+
+
+NO_FINDINGS_SUGGESTION = EnrichedSuggestion(
+    title="Nenhuma problema encontrada",
+    explanation="Nenhuma problema foi identificada no código fornecido.",
+    code_example="",
+)
+
+# Sugestões prontas para códigos triviais, cuja explicação não depende do contexto do código.
+TEMPLATES = {
+    "W291": (
+        "Espaços em branco no final da linha",
+        "O flake8 (W291) encontrou espaços em branco após o último caractere da linha. Eles não têm efeito "
+        "no código, mas geram ruído em diffs; remova-os ou configure o editor para removê-los ao salvar.",
+        "x = 1\n",
+    ),
+    "W292": (
+        "Nova linha no final do arquivo",
+        "O flake8 (W292) indica que o arquivo não termina com uma quebra de linha. A PEP 8 e muitas "
+        "ferramentas POSIX esperam que todo arquivo de texto termine com uma nova linha.",
+        "def soma(a, b):\n    return a + b\n",
+    ),
+    "W293": (
+        "Linha em branco contendo espaços",
+        "O flake8 (W293) encontrou linhas em branco que contêm espaços ou tabulações. Linhas em branco "
+        "devem estar realmente vazias.",
+        "def f():\n    x = 1\n\n    return x\n",
+    ),
+    "W391": (
+        "Linhas em branco no final do arquivo",
+        "O flake8 (W391) encontrou linhas em branco extras no final do arquivo. O arquivo deve terminar "
+        "com uma única quebra de linha.",
+        "x = 1\n",
+    ),
+}
+
+
+def _templated_suggestion(code: str, findings: list[dict]) -> EnrichedSuggestion:
+    lines = ", ".join(str(finding["line"]) for finding in findings)
+    if code in TEMPLATES:
+        title, explanation, code_example = TEMPLATES[code]
+        return EnrichedSuggestion(title=title, explanation=f"{explanation} Linhas: {lines}.", code_example=code_example)
+
+    text = findings[0]["text"]
+    return EnrichedSuggestion(
+        title=f"{code}: {text}",
+        explanation=f"O flake8 ({code}) apontou '{text}'. Linhas: {lines}.",
+        code_example="",
+    )
+
+
+def build_fast_path_response(tool_report: str) -> AnalysisResponse | None:
+    """
+    Monta a resposta sem o LLM quando o flake8 não encontra problemas, ou só encontra códigos
+    listados em FAST_PATH_ALLOWLIST. Retorna None quando o crew precisa ser executado.
+    """
+    if not config.FAST_PATH_ENABLED:
+        return None
+    if tool_report.strip() == NO_ISSUES_MESSAGE:
+        return AnalysisResponse(suggestions=[NO_FINDINGS_SUGGESTION])
+
+    findings = parse_findings(tool_report)
+    if findings is None:
+        return None
+
+    findings_by_code: dict[str, list[dict]] = {}
+    for finding in findings:
+        if finding["code"] not in config.FAST_PATH_ALLOWLIST:
+            return None
+        findings_by_code.setdefault(finding["code"], []).append(finding)
+
+    if not findings_by_code:
+        return AnalysisResponse(suggestions=[NO_FINDINGS_SUGGESTION])
+    return AnalysisResponse(suggestions=[
+        _templated_suggestion(code, code_findings) for code, code_findings in findings_by_code.items()
+    ])
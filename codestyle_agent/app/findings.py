@@ -0,0 +1,25 @@
+def parse_findings(tool_report: str) -> list[dict] | None:
+    """
+    Converte a saída %(row)d:%(col)d:%(code)s:%(text)s do flake8 em dicionários com
+    'code', 'line' e 'text'. Retorna None se alguma linha não estiver nesse formato.
+    """
+    findings = []
+    for line in tool_report.splitlines():
+        if not line.strip():
+            continue
+        parts = line.split(":", 3)
+        if len(parts) != 4 or not parts[0].isdigit():
+            return None
+        row, _, code, text = parts
+        findings.append({"code": code, "line": int(row), "text": text})
+    return findings
+
+
+def render_findings(tool_report: str, codes: set[str]) -> str:
+    """
+    Retorna a saída do flake8 contendo apenas as linhas dos códigos informados.
+    """
+    return "\n".join(
+        line for line in tool_report.splitlines()
+        if len(line.split(":", 3)) == 4 and line.split(":", 3)[2] in codes
+    )
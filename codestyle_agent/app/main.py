@@ -1,20 +1,75 @@
+import importlib
 import logging
-import json
+import time
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 
 import models
-from crew import code_style_crew
+import config
+from cache import result_cache
+from limits import ConcurrencyLimiter, QueueFullError, RateLimitExceeded, llm_bucket_stats
+from metrics import metrics_response, record_error, record_request_metrics
+from structured_output import STRUCTURED_OUTPUT_ERRORS
+from tracing import install_log_correlation, trace_request
+from warmup import Warmup
+from suggestion_kb import suggestion_kb
 
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+install_log_correlation()
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [trace_id=%(trace_id)s] %(message)s')
+
+# Etapas executadas uma única vez: o import do crewai domina o tempo de inicialização,
+# seguido da criação dos objetos LLM e dos crews (feita ao importar 'analysis').
+warmup = Warmup([
+    ("crewai", lambda: importlib.import_module("crewai")),
+    ("llm", lambda: (config.llm, config.llm_for_batch)),
+    ("analysis", lambda: importlib.import_module("analysis")),
+])
+
+# Limita as análises simultâneas e a fila de espera; o kickoff bloqueante roda no pool de threads do limitador.
+analysis_limiter = ConcurrencyLimiter(config.ANALYZE_MAX_CONCURRENCY, config.ANALYZE_MAX_QUEUE)
+
+
+def _analyze(code: str) -> models.AnalysisResponse:
+    return warmup.result("analysis").analyze(code)
+
+
+def _analyze_files(files: list[models.FileInput]) -> models.BatchAnalysisResponse:
+    return warmup.result("analysis").analyze_files(files)
+
+
+def _too_many_requests(error: QueueFullError | RateLimitExceeded) -> HTTPException:
+    record_error(error)
+    logging.warning(str(error))
+    return HTTPException(
+        status_code=HTTPStatus.TOO_MANY_REQUESTS,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicia o aquecimento em segundo plano para que o serviço aceite conexões imediatamente;
+    o endpoint /ready só responde com sucesso quando o aquecimento termina.
+    """
+    await warmup.start_in_background()
+    yield
+    analysis_limiter.shutdown()
 
 app = FastAPI(
     title="Code Style Agent",
     description="Analisa trechos de código Python em busca de melhorias de estilo e boas práticas, utilizando Flake8. Agente orquestrado por CrewAI.",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
+app.middleware("http")(record_request_metrics)
+app.middleware("http")(trace_request)
+warmup.mark_app_loaded()
 
 @app.post("/analyze", response_model=models.AnalysisResponse)
 async def analyze_code(payload: models.CodeInput):
@@ -22,30 +77,89 @@ async def analyze_code(payload: models.CodeInput):
     Endpoint que recebe um código, analisa com flake8 e enriquece com Gemini.
     """
     logging.info("Recebida nova requisição para /analyze.")
+    started = time.perf_counter()
     try:
-        inputs = {'code': payload.code}
-        result = code_style_crew.kickoff(inputs=inputs)
-
-        try:
-            result_raw = json.loads(result.tasks_output[0].raw)
-            response = models.AnalysisResponse(**result_raw)
-            return response
-
-        except (json.JSONDecodeError, TypeError) as e:
-            logging.error(f"Erro ao fazer parse da resposta da IA: {e}")
-            logging.error(f"Resposta recebida: {result}")
-            raise HTTPException(
-                status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
-                detail="A resposta do serviço de IA não pôde ser processada como um JSON válido."
-            )
+        response = await analysis_limiter.run(_analyze, payload.code)
+        warmup.record_request(time.perf_counter() - started)
+        return response
 
+    except (QueueFullError, RateLimitExceeded) as e:
+        raise _too_many_requests(e)
+    except STRUCTURED_OUTPUT_ERRORS as e:
+        record_error(e)
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="A resposta do serviço de IA não pôde ser processada como um JSON válido."
+        )
     except Exception as e:
+        record_error(e)
         logging.error(f"Ocorreu um erro inesperado durante a execução do crew: {e}")
         raise HTTPException(
             status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
             detail=f"Ocorreu um erro interno no servidor: {str(e)}"
         )
 
+@app.post("/analyze/batch", response_model=models.BatchAnalysisResponse)
+async def analyze_code_batch(payload: models.BatchCodeInput):
+    """
+    Endpoint que recebe vários arquivos, executa o flake8 uma única vez sobre todos eles
+    e enriquece os achados com Gemini, agrupando vários arquivos por chamada.
+    """
+    logging.info(f"Recebida nova requisição para /analyze/batch com {len(payload.files)} arquivos.")
+    try:
+        return await analysis_limiter.run(_analyze_files, payload.files)
+
+    except (QueueFullError, RateLimitExceeded) as e:
+        raise _too_many_requests(e)
+    except STRUCTURED_OUTPUT_ERRORS as e:
+        record_error(e)
+        logging.error(f"Erro ao fazer parse da resposta da IA no lote: {e}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail="A resposta do serviço de IA não pôde ser processada como um JSON válido."
+        )
+    except Exception as e:
+        record_error(e)
+        logging.error(f"Ocorreu um erro inesperado durante a análise em lote: {e}")
+        raise HTTPException(
+            status_code=HTTPStatus.INTERNAL_SERVER_ERROR,
+            detail=f"Ocorreu um erro interno no servidor: {str(e)}"
+        )
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Retorna os contadores de acertos e falhas do cache de resultados."""
+    return result_cache.stats()
+
+@app.get("/suggestions/stats")
+def suggestion_kb_stats():
+    """Retorna os contadores da base de sugestões por código de achado."""
+    return suggestion_kb.stats()
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Expõe as métricas do serviço no formato do Prometheus."""
+    return metrics_response()
+
+@app.get("/limits/stats")
+def limits_stats():
+    """
+    Retorna a ocupação do limitador de concorrência (análises ativas, profundidade da fila
+    e tempo de espera) e o estado do token bucket das chamadas ao LLM.
+    """
+    return {"analysis": analysis_limiter.stats(), "llm": llm_bucket_stats()}
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Endpoint de prontidão: responde 503 enquanto o aquecimento (imports pesados, LLM e crews)
+    não termina. Inclui o perfil de inicialização e a latência da primeira requisição.
+    """
+    profile = warmup.profile()
+    if not profile["ready"]:
+        return JSONResponse(status_code=HTTPStatus.SERVICE_UNAVAILABLE, content={"status": "warming", **profile})
+    return {"status": "ready", **profile}
+
 @app.get("/health")
 def health_check():
     """Endpoint de health check para o orquestrador."""
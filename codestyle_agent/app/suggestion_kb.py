@@ -0,0 +1,177 @@
+import json
+import logging
+import sqlite3
+import threading
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from crew import CrewPool
+
+import config
+from code_context import build_code_context
+from metrics import timed
+from models import AnalysisResponse, EnrichedSuggestion
+from routing import is_simple_case, run_routed
+from structured_output import parse_with_repair
+
+
+def finding_code_from_title(title: str) -> str:
+    """
+    Extrai o código do achado do título de uma sugestão no formato '<código>: <título>'.
+    """
+    return title.split(":", 1)[0].strip().upper()
+
+
+class SuggestionKnowledgeBase:
+    """
+    Base de sugestões por código de achado da ferramenta (test ID do bandit ou código do flake8).
+    É alimentada pelas respostas do LLM para códigos ainda não vistos e, opcionalmente, por um
+    arquivo JSON de sementes. As entradas aprendidas podem ser persistidas em um arquivo SQLite,
+    indexadas, como as chaves do cache de resultados, pelo modelo e pela versão do prompt: ao trocar
+    qualquer um dos dois, as sugestões geradas antes deixam de ser servidas.
+    """
+
+    def __init__(self, sqlite_path: str | None = None, seed_path: str | None = None, enabled: bool = True):
+        self.enabled = enabled
+        self._entries: dict[str, EnrichedSuggestion] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "learned": 0}
+        self._db = None
+
+        if not enabled:
+            return
+        if seed_path:
+            self._load_seed(seed_path)
+        if sqlite_path:
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            columns = {row[1] for row in self._db.execute("PRAGMA table_info(suggestion_kb)")}
+            if columns and "model_name" not in columns:
+                # Entradas gravadas antes de a chave incluir o modelo: não há como saber qual modelo as gerou.
+                logging.info("Base de sugestões sem o modelo na chave: entradas anteriores descartadas.")
+                self._db.execute("DROP TABLE suggestion_kb")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS suggestion_kb ("
+                "code TEXT NOT NULL, model_name TEXT NOT NULL, prompt_version TEXT NOT NULL, value TEXT NOT NULL, "
+                "PRIMARY KEY (code, model_name, prompt_version))"
+            )
+            self._db.commit()
+            rows = self._db.execute(
+                "SELECT code, value FROM suggestion_kb WHERE model_name = ? AND prompt_version = ?",
+                (config.MODEL_NAME, config.PROMPT_VERSION)
+            ).fetchall()
+            for code, value in rows:
+                self._entries[code] = EnrichedSuggestion(**json.loads(value))
+
+    def _load_seed(self, seed_path: str):
+        try:
+            with open(seed_path, encoding="utf-8") as seed_file:
+                seed = json.load(seed_file)
+            for code, suggestion in seed.items():
+                self._entries[code.upper()] = EnrichedSuggestion(**suggestion)
+            logging.info(f"Base de sugestões carregada com {len(seed)} códigos de {seed_path}.")
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(f"Não foi possível carregar as sementes da base de sugestões: {e}")
+
+    def lookup(self, codes: list[str]) -> dict[str, EnrichedSuggestion]:
+        if not self.enabled:
+            return {}
+        with self._lock:
+            found = {code: self._entries[code] for code in codes if code in self._entries}
+            self._counters["hits"] += len(found)
+            self._counters["misses"] += len(codes) - len(found)
+            return found
+
+    def learn(self, codes: list[str], suggestions: list[EnrichedSuggestion]):
+        """
+        Guarda a primeira sugestão do LLM para cada um dos códigos informados.
+        """
+        if not self.enabled:
+            return
+        pending = set(codes)
+        with self._lock:
+            for suggestion in suggestions:
+                code = finding_code_from_title(suggestion.title)
+                if code not in pending:
+                    continue
+                pending.discard(code)
+                self._entries[code] = suggestion
+                self._counters["learned"] += 1
+                if self._db is not None:
+                    try:
+                        self._db.execute(
+                            "INSERT OR REPLACE INTO suggestion_kb (code, model_name, prompt_version, value) VALUES (?, ?, ?, ?)",
+                            (code, config.MODEL_NAME, config.PROMPT_VERSION, suggestion.model_dump_json()),
+                        )
+                        self._db.commit()
+                    except sqlite3.Error as e:
+                        logging.warning(f"Falha ao gravar na base de sugestões: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._counters, "entries": len(self._entries), "enabled": self.enabled}
+
+
+suggestion_kb = SuggestionKnowledgeBase(
+    sqlite_path=config.SUGGESTION_KB_SQLITE_PATH,
+    seed_path=config.SUGGESTION_KB_SEED_PATH,
+    enabled=config.SUGGESTION_KB_ENABLED,
+)
+
+
+def _with_lines(suggestion: EnrichedSuggestion, lines: list[int]) -> EnrichedSuggestion:
+    locations = ", ".join(str(line) for line in lines)
+    return suggestion.model_copy(update={
+        "explanation": f"{suggestion.explanation} Ocorrências nas linhas: {locations}."
+    })
+
+
+def analyze_with_knowledge_base(
+    code: str,
+    findings: list[dict],
+    render_findings: Callable[[set[str]], str],
+    findings_crews: "CrewPool",
+    fast_findings_crews: "CrewPool | None" = None
+) -> AnalysisResponse:
+    """
+    Monta a resposta reaproveitando as sugestões já conhecidas para cada código de achado
+    e envia ao LLM apenas os códigos inéditos (ou os listados em SUGGESTION_KB_SNIPPET_SPECIFIC,
+    que exigem um exemplo de código específico do trecho), junto com o código ao redor das
+    linhas desses achados. Com a base desabilitada, todos os códigos vão ao LLM. Poucos códigos
+    inéditos em um trecho curto vão primeiro aos 'fast_findings_crews', quando configurados.
+    """
+    lines_by_code: dict[str, list[int]] = {}
+    for finding in findings:
+        lines_by_code.setdefault(finding["code"], []).append(finding["line"])
+
+    reusable_codes = [
+        finding_code for finding_code in lines_by_code
+        if finding_code not in config.SUGGESTION_KB_SNIPPET_SPECIFIC
+    ]
+    known = suggestion_kb.lookup(reusable_codes)
+    novel_codes = [finding_code for finding_code in lines_by_code if finding_code not in known]
+    logging.info(f"Base de sugestões: {len(known)} códigos conhecidos, {len(novel_codes)} enviados ao LLM.")
+
+    suggestions = [
+        _with_lines(known[finding_code], lines)
+        for finding_code, lines in lines_by_code.items() if finding_code in known
+    ]
+    if novel_codes:
+        context = build_code_context(code, [line for finding_code in novel_codes for line in lines_by_code[finding_code]])
+        inputs = {"code": context, "findings": render_findings(set(novel_codes))}
+
+        def run_crew(crews: "CrewPool") -> AnalysisResponse:
+            with crews.checkout() as crew:
+                with timed("crew"):
+                    result = crew.kickoff(inputs=inputs)
+                return parse_with_repair(result.tasks_output[0].raw, AnalysisResponse, crew.agents[0].llm)
+
+        llm_response = run_routed(
+            "findings", run_crew, findings_crews, fast_findings_crews, is_simple_case(len(novel_codes), context)
+        )
+        suggestion_kb.learn(
+            [finding_code for finding_code in novel_codes if finding_code in reusable_codes],
+            llm_response.suggestions
+        )
+        suggestions.extend(llm_response.suggestions)
+
+    return AnalysisResponse(suggestions=suggestions)
@@ -1,9 +1,92 @@
+import logging
+import operator
 import subprocess
 import tempfile
+import threading
 import os
 
 from crewai.tools import BaseTool
 
+from metrics import TOOL_LATENCY, timed
+
+
+NO_ISSUES_MESSAGE = "Nenhum problema de estilo de código encontrado pelo Flake8."
+
+
+class InProcessFlake8:
+    """
+    Executa o flake8 dentro do próprio processo sobre o código em memória.
+    Plugins, opções e o style guide são carregados uma única vez e reutilizados a cada chamada.
+    """
+
+    def __init__(self):
+        from flake8 import checker, processor, style_guide
+        from flake8.formatting.base import BaseFormatter
+        from flake8.options.parse_args import parse_args
+
+        class CollectingFormatter(BaseFormatter):
+            def after_init(self):
+                self.violations = []
+
+            def handle(self, error):
+                self.violations.append(error)
+
+        class InMemoryFileChecker(checker.FileChecker):
+            def __init__(self, *, source: str, **kwargs):
+                self._source_lines = source.splitlines(keepends=True)
+                super().__init__(**kwargs)
+
+            def _make_processor(self):
+                return processor.FileProcessor(self.filename, self.options, lines=self._source_lines)
+
+        self._checker_class = InMemoryFileChecker
+        self._plugins, self._options = parse_args([])
+        self._formatter = CollectingFormatter(self._options)
+        self._guide = style_guide.StyleGuideManager(self._options, self._formatter)
+        self._lock = threading.Lock()
+
+    def check(self, code: str, filename: str = "snippet.py") -> list[str]:
+        """
+        Retorna as violações no formato %(row)d:%(col)d:%(code)s:%(text)s, como na saída do comando flake8.
+        """
+        source_lines = code.splitlines()
+        with self._lock:
+            self._formatter.violations = []
+            file_checker = self._checker_class(
+                source=code, filename=filename, plugins=self._plugins.checkers, options=self._options
+            )
+            _, results, _ = file_checker.run_checks()
+            results.sort(key=operator.itemgetter(1, 2))
+
+            with self._guide.processing_file(filename):
+                for error_code, line_number, column, text, physical_line in results:
+                    if physical_line is None and 0 < line_number <= len(source_lines):
+                        physical_line = source_lines[line_number - 1]
+                    self._guide.handle_error(
+                        code=error_code,
+                        filename=filename,
+                        line_number=line_number,
+                        column_number=column,
+                        text=text,
+                        physical_line=physical_line,
+                    )
+
+            return [
+                f"{violation.line_number}:{violation.column_number}:{violation.code}:{violation.text}"
+                for violation in self._formatter.violations
+            ]
+
+
+def _build_flake8_engine() -> InProcessFlake8 | None:
+    try:
+        return InProcessFlake8()
+    except Exception as e:
+        logging.warning(f"Não foi possível inicializar o flake8 em processo, será usado o subprocess: {e}")
+        return None
+
+
+flake8_engine = _build_flake8_engine()
+
 
 class Flake8AnalysisTool(BaseTool):
     name: str = "Analisador de Estilo de Código Python com Flake8"
@@ -13,7 +96,21 @@ class Flake8AnalysisTool(BaseTool):
         "Ela retorna a saída bruta do flake8 como uma string de texto."
     )
 
+    @timed("flake8", TOOL_LATENCY, tool="flake8")
     def _run(self, code: str) -> str:
+        """
+        Executa o flake8 em processo sobre o código em memória, recorrendo ao subprocess em caso de falha.
+        """
+        if flake8_engine is not None:
+            try:
+                violations = flake8_engine.check(code)
+                return "\n".join(violations) if violations else NO_ISSUES_MESSAGE
+            except Exception as e:
+                logging.warning(f"Falha no flake8 em processo, usando o subprocess: {e}")
+
+        return self._run_subprocess(code)
+
+    def _run_subprocess(self, code: str) -> str:
         """
         Executa o flake8 em um arquivo temporário contendo o código fornecido.
         """
@@ -33,6 +130,58 @@ class Flake8AnalysisTool(BaseTool):
                 os.remove(temp_filename)
 
         if not result.stdout:
-            return "Nenhum problema de estilo de código encontrado pelo Flake8."
+            return NO_ISSUES_MESSAGE
 
         return result.stdout
+
+    @timed("flake8_batch", TOOL_LATENCY, tool="flake8_batch")
+    def run_batch(self, files: dict[str, str]) -> dict[str, str]:
+        """
+        Executa o flake8 sobre todos os arquivos do lote. O caminho em processo reutiliza o mesmo
+        style guide para todos os arquivos; o subprocess é usado apenas como fallback.
+        """
+        if flake8_engine is not None:
+            try:
+                reports = {}
+                for path, code in files.items():
+                    violations = flake8_engine.check(code)
+                    reports[path] = "\n".join(violations) if violations else NO_ISSUES_MESSAGE
+                return reports
+            except Exception as e:
+                logging.warning(f"Falha no flake8 em processo para o lote, usando o subprocess: {e}")
+
+        return self._run_batch_subprocess(files)
+
+    def _run_batch_subprocess(self, files: dict[str, str]) -> dict[str, str]:
+        """
+        Executa o flake8 uma única vez sobre todos os arquivos e agrupa a saída por arquivo,
+        mantendo o formato %(row)d:%(col)d:%(code)s:%(text)s de cada linha.
+        """
+        paths = list(files)
+        lines_by_path = {path: [] for path in paths}
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_to_path = {}
+            for index, path in enumerate(paths):
+                temp_filename = os.path.join(temp_dir, f"file_{index:05d}.py")
+                with open(temp_filename, "w", encoding="utf-8") as temp_file:
+                    temp_file.write(files[path])
+                temp_to_path[temp_filename] = path
+
+            result = subprocess.run(
+                ["flake8", "--format=%(path)s:%(row)d:%(col)d:%(code)s:%(text)s", temp_dir],
+                capture_output=True,
+                text=True,
+                check=False
+            )
+
+        for line in result.stdout.splitlines():
+            temp_filename, _, violation = line.partition(":")
+            path = temp_to_path.get(temp_filename)
+            if path is not None:
+                lines_by_path[path].append(violation)
+
+        return {
+            path: "\n".join(lines) if lines else NO_ISSUES_MESSAGE
+            for path, lines in lines_by_path.items()
+        }
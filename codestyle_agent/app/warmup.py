@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from fastapi.concurrency import run_in_threadpool
+
+
+def process_age_seconds() -> float | None:
+    """
+    Tempo desde o início do processo, lido de /proc (Linux). Retorna None se indisponível.
+    """
+    try:
+        with open("/proc/self/stat") as stat_file:
+            start_ticks = int(stat_file.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as uptime_file:
+            uptime = float(uptime_file.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _rounded(seconds: float | None) -> float | None:
+    return round(seconds, 4) if seconds is not None else None
+
+
+class Warmup:
+    """
+    Executa uma única vez as etapas de aquecimento do serviço (imports pesados, construção dos crews),
+    medindo o tempo de cada uma. As etapas rodam em segundo plano na inicialização e, se uma requisição
+    chegar antes, na primeira chamada de result().
+    """
+
+    def __init__(self, steps: list[tuple[str, Callable]]):
+        self._steps = steps
+        self._results: dict[str, object] = {}
+        self._timings: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._error: str | None = None
+        self._task: asyncio.Task | None = None
+        self.app_loaded_seconds: float | None = None
+        self.cold_start_seconds: float | None = None
+        self.first_request_seconds: float | None = None
+
+    def mark_app_loaded(self):
+        """
+        Registra quanto tempo o processo levou até a aplicação FastAPI estar importada.
+        """
+        self.app_loaded_seconds = process_age_seconds()
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def run(self):
+        if self._ready.is_set():
+            return
+        with self._lock:
+            if self._ready.is_set():
+                return
+            started = time.perf_counter()
+            try:
+                for name, step in self._steps:
+                    step_started = time.perf_counter()
+                    self._results[name] = step()
+                    self._timings[name] = round(time.perf_counter() - step_started, 4)
+            except Exception as e:
+                self._error = str(e)
+                raise
+            self._error = None
+            self._timings["total"] = round(time.perf_counter() - started, 4)
+            self.cold_start_seconds = process_age_seconds()
+            self._ready.set()
+            logging.info(f"Aquecimento concluído em {self._timings['total']}s: {self._timings}")
+
+    def result(self, name: str):
+        self.run()
+        return self._results[name]
+
+    async def start_in_background(self):
+        async def runner():
+            try:
+                await run_in_threadpool(self.run)
+            except Exception as e:
+                logging.error(f"Falha no aquecimento do serviço: {e}")
+
+        self._task = asyncio.create_task(runner())
+
+    def record_request(self, seconds: float):
+        if self.first_request_seconds is None:
+            self.first_request_seconds = round(seconds, 4)
+            logging.info(f"Primeira requisição atendida em {self.first_request_seconds}s.")
+
+    def profile(self) -> dict:
+        return {
+            "ready": self.is_ready(),
+            "app_loaded_seconds": _rounded(self.app_loaded_seconds),
+            "warmup_seconds": dict(self._timings),
+            "cold_start_seconds": _rounded(self.cold_start_seconds),
+            "first_request_seconds": self.first_request_seconds,
+            "error": self._error,
+        }
@@ -1,4 +1,3 @@
-
 CREATE TABLE IF NOT EXISTS analysis_history (
     id SERIAL PRIMARY KEY,
     code_snippet TEXT NOT NULL,
@@ -6,4 +5,7 @@ CREATE TABLE IF NOT EXISTS analysis_history (
     created_at TIMESTAMPTZ DEFAULT NOW()
 );
 
-COMMENT ON TABLE analysis_history IS 'Tabela para armazenar o histórico de análises de código realizadas pelo sistema multiagente.';
\ No newline at end of file
+COMMENT ON TABLE analysis_history IS 'Tabela para armazenar o histórico de análises de código realizadas pelo sistema multiagente.';
+
+-- As demais colunas e os índices são definidos no modelo do orquestrador (orchestrator/app/schemas.py)
+-- e adicionados por ele na inicialização (orchestrator/app/migrations.py), também em bancos já existentes.
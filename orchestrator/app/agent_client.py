@@ -0,0 +1,319 @@
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+
+import httpx
+from opentelemetry.trace import SpanKind
+
+import config
+from tracing import inject_trace_headers, span
+
+
+# 429 indica que o agente recusou a requisição por excesso de carga; a nova tentativa respeita o Retry-After.
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Erros em que a requisição não chegou a ser processada pelo agente. Timeouts de leitura
+# não são repetidos: o agente pode estar apenas lento e uma nova tentativa dobraria a espera.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.PoolTimeout)
+
+
+def analyze_url(base_url: str, path: str = "/analyze") -> str:
+    """
+    Monta a URL de um endpoint de análise (/analyze ou /analyze/batch) a partir da URL base do agente.
+    """
+    base_url = base_url.rstrip("/")
+    if base_url.endswith("/analyze"):
+        base_url = base_url[:-len("/analyze")]
+    return f"{base_url}{path}"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por agente: após 'failure_threshold' falhas consecutivas o circuito abre
+    e as chamadas falham imediatamente por 'reset_seconds'. Depois disso uma única chamada
+    de teste é liberada (meio-aberto); se ela tiver sucesso o circuito fecha novamente.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    def acquire(self) -> tuple[bool, bool]:
+        """
+        Retorna (liberada, chamada_de_teste). Quem recebe a chamada de teste deve encerrá-la com
+        record_success(), record_failure() ou release_trial().
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True, False
+            if time.monotonic() - self._opened_at < self.reset_seconds or self._trial_in_progress:
+                return False, False
+            self._trial_in_progress = True
+            return True, True
+
+    def allow_request(self) -> bool:
+        return self.acquire()[0]
+
+    def release_trial(self):
+        """
+        Libera a vaga da chamada de teste sem mudar o estado do circuito, quando ela termina sem
+        resultado (cancelada ou interrompida por um erro inesperado). A próxima chamada vira o novo teste.
+        """
+        with self._lock:
+            self._trial_in_progress = False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_seconds - (time.monotonic() - self._opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> bool:
+        """
+        Registra uma falha e retorna True se o circuito acabou de abrir.
+        """
+        with self._lock:
+            self._failures += 1
+            reopened = self._trial_in_progress
+            self._trial_in_progress = False
+            if reopened or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_seconds:
+                return "open"
+            return "half-open"
+
+
+class AgentClient:
+    """
+    Cliente HTTP de um agente especialista, com pool de conexões keep-alive, timeouts de conexão
+    e leitura separados, novas tentativas com jitter e circuit breaker.
+    Mantém um cliente síncrono (usado pelas ferramentas do crew, que rodam em threads)
+    e um assíncrono (usado pelo fan-out), ambos compartilhando o mesmo circuit breaker.
+    """
+
+    def __init__(
+        self,
+        agent_name: str,
+        base_url: str,
+        pool_size: int,
+        connect_timeout: float,
+        read_timeout: float,
+    ):
+        self.agent_name = agent_name
+        self.base_url = base_url or ""
+        self.max_retries = config.AGENT_MAX_RETRIES
+        self.backoff_seconds = config.AGENT_RETRY_BACKOFF_SECONDS
+        self.breaker = CircuitBreaker(config.AGENT_CIRCUIT_FAILURE_THRESHOLD, config.AGENT_CIRCUIT_RESET_SECONDS)
+        self._client_options = {
+            "timeout": httpx.Timeout(read_timeout, connect=connect_timeout),
+            "limits": httpx.Limits(
+                max_connections=pool_size,
+                max_keepalive_connections=pool_size,
+                keepalive_expiry=config.AGENT_KEEPALIVE_EXPIRY,
+            ),
+            "http2": config.AGENT_HTTP2 and _http2_available(),
+        }
+        self._sync_client: httpx.Client | None = None
+        self._async_client: httpx.AsyncClient | None = None
+        self._lock = threading.Lock()
+
+    def _get_sync_client(self) -> httpx.Client:
+        with self._lock:
+            if self._sync_client is None:
+                self._sync_client = httpx.Client(**self._client_options)
+            return self._sync_client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(**self._client_options)
+        return self._async_client
+
+    def _backoff(self, attempt: int, response: httpx.Response | None = None) -> float:
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), config.AGENT_MAX_RETRY_AFTER_SECONDS)
+            except ValueError:
+                pass
+        return random.uniform(0, self.backoff_seconds * (2 ** attempt))
+
+    def _circuit_open_error(self) -> str:
+        return json.dumps({
+            "error": f"Circuito aberto para o {self.agent_name}",
+            "details": f"O agente falhou repetidamente. Nova tentativa em {self.breaker.retry_after():.0f} segundos."
+        })
+
+    def _should_retry(self, response: httpx.Response | None, error: Exception | None, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if error is not None:
+            return isinstance(error, RETRYABLE_ERRORS)
+        return response.status_code in RETRYABLE_STATUS_CODES
+
+    def _finish(self, response: httpx.Response | None, error: Exception | None) -> str:
+        """
+        Atualiza o circuit breaker e converte o resultado final na resposta do agente
+        ou em um JSON de erro.
+        """
+        failed = error is not None or response.status_code >= 500
+        if failed:
+            if self.breaker.record_failure():
+                logging.warning(f"Circuito aberto para o {self.agent_name} após falhas consecutivas.")
+        else:
+            self.breaker.record_success()
+
+        if error is not None:
+            return json.dumps({"error": f"Erro de conexão com o {self.agent_name}", "details": str(error)})
+        if response.is_error:
+            error_details = f"Erro HTTP: {response.status_code} - {response.text}"
+            return json.dumps({"error": f"Falha ao comunicar com o {self.agent_name}", "details": error_details})
+        return response.text
+
+    def post(self, path: str, payload: dict) -> str:
+        """
+        Executa a chamada síncrona para o endpoint do agente. Falhas retornam um JSON de erro.
+        """
+        allowed, trial = self.breaker.acquire()
+        if not allowed:
+            return self._circuit_open_error()
+        finished = False
+        try:
+            response = self._post(path, payload)
+            finished = True
+            return response
+        finally:
+            if trial and not finished:
+                self.breaker.release_trial()
+
+    def _post(self, path: str, payload: dict) -> str:
+        url = analyze_url(self.base_url, path)
+        attempt = 0
+        with span(f"POST {path}", kind=SpanKind.CLIENT, agent=self.agent_name, url=url) as current:
+            headers = inject_trace_headers()
+            while True:
+                response, error = None, None
+                try:
+                    response = self._get_sync_client().post(url, json=payload, headers=headers)
+                except httpx.HTTPError as e:
+                    error = e
+                if not self._should_retry(response, error, attempt):
+                    current.set_attribute("retries", attempt)
+                    return self._finish(response, error)
+                time.sleep(self._backoff(attempt, response))
+                attempt += 1
+
+    async def apost(self, path: str, payload: dict) -> str:
+        """
+        Versão assíncrona de post(), usada pelo fan-out paralelo. Se a chamada de teste do
+        circuito for cancelada, sua vaga é liberada para a próxima chamada.
+        """
+        allowed, trial = self.breaker.acquire()
+        if not allowed:
+            return self._circuit_open_error()
+        finished = False
+        try:
+            response = await self._apost(path, payload)
+            finished = True
+            return response
+        finally:
+            if trial and not finished:
+                self.breaker.release_trial()
+
+    async def _apost(self, path: str, payload: dict) -> str:
+        url = analyze_url(self.base_url, path)
+        attempt = 0
+        with span(f"POST {path}", kind=SpanKind.CLIENT, agent=self.agent_name, url=url) as current:
+            headers = inject_trace_headers()
+            while True:
+                response, error = None, None
+                try:
+                    response = await self._get_async_client().post(url, json=payload, headers=headers)
+                except httpx.HTTPError as e:
+                    error = e
+                if not self._should_retry(response, error, attempt):
+                    current.set_attribute("retries", attempt)
+                    return self._finish(response, error)
+                await asyncio.sleep(self._backoff(attempt, response))
+                attempt += 1
+
+    def state(self) -> str:
+        return self.breaker.state()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        with self._lock:
+            if self._sync_client is not None:
+                self._sync_client.close()
+                self._sync_client = None
+
+
+def build_http_clients() -> dict[str, AgentClient]:
+    return {
+        "security": AgentClient(
+            "Security Agent",
+            config.SECURITY_AGENT_URL,
+            pool_size=config.SECURITY_AGENT_POOL_SIZE,
+            connect_timeout=config.SECURITY_AGENT_CONNECT_TIMEOUT,
+            read_timeout=config.SECURITY_AGENT_READ_TIMEOUT,
+        ),
+        "performance": AgentClient(
+            "Performance Agent",
+            config.PERFORMANCE_AGENT_URL,
+            pool_size=config.PERFORMANCE_AGENT_POOL_SIZE,
+            connect_timeout=config.PERFORMANCE_AGENT_CONNECT_TIMEOUT,
+            read_timeout=config.PERFORMANCE_AGENT_READ_TIMEOUT,
+        ),
+        "codestyle": AgentClient(
+            "Code Style Agent",
+            config.CODESTYLE_AGENT_URL,
+            pool_size=config.CODESTYLE_AGENT_POOL_SIZE,
+            connect_timeout=config.CODESTYLE_AGENT_CONNECT_TIMEOUT,
+            read_timeout=config.CODESTYLE_AGENT_READ_TIMEOUT,
+        ),
+    }
+
+
+if config.AGENT_DEPLOYMENT_MODE == "inprocess":
+    from inprocess import build_inprocess_clients
+    agent_clients = build_inprocess_clients()
+else:
+    agent_clients = build_http_clients()
+
+
+async def close_agent_clients():
+    for client in agent_clients.values():
+        await client.aclose()
+
+
+def circuit_states() -> dict[str, str]:
+    return {key: client.state() for key, client in agent_clients.items()}
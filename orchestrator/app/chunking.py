@@ -0,0 +1,81 @@
+import re
+
+from code_units import render_units, split_units
+
+
+# Referências a linhas no texto das sugestões: "linha 12", "linhas: 3, 7 e 9", "lines 4-6".
+LINE_REFERENCE_PATTERN = re.compile(
+    r"\b(linhas?|lines?)(\s*:?\s*)(\d+(?:(?:\s*,\s*|\s+e\s+|\s+and\s+|\s*-\s*)\d+)*)",
+    re.IGNORECASE
+)
+NUMBER_PATTERN = re.compile(r"\d+")
+
+
+def plan_chunks(code: str, max_lines: int) -> list[dict] | None:
+    """
+    Divide um código maior que 'max_lines' linhas em blocos alinhados às unidades de nível superior
+    (funções, classes e o código de módulo, na ordem do código), cada um com os imports, as atribuições
+    de módulo e os stubs das definições de outros blocos de que depende. Unidades consecutivas
+    são agrupadas enquanto o bloco não passa de 'max_lines'; uma unidade maior forma um bloco sozinha.
+    Cada bloco traz 'code' e 'line_map' (linha do bloco -> linha original). Retorna None quando o
+    código não precisa (ou não pode, por erro de sintaxe) ser dividido.
+    """
+    if max_lines <= 0 or code.count("\n") + 1 <= max_lines:
+        return None
+    try:
+        units = split_units(code)
+    except SyntaxError:
+        return None
+
+    groups = []
+    current, current_lines = [], 0
+    for unit in units:
+        # Cada unidade ocupa o corpo mais as duas linhas em branco que a separam da anterior.
+        unit_lines = len(unit["body"]) + 2
+        if current and current_lines + unit_lines > max_lines:
+            groups.append(current)
+            current, current_lines = [], 0
+        current.append(unit)
+        current_lines += unit_lines
+    if current:
+        groups.append(current)
+    if len(groups) <= 1:
+        return None
+
+    chunks = []
+    for group in groups:
+        chunk_code, line_map = render_units(group)
+        chunks.append({"code": chunk_code, "line_map": line_map})
+    return chunks
+
+
+def remap_line_references(text: str, line_map: list[int]) -> str:
+    """
+    Troca os números de linha citados no texto (relativos ao bloco) pelas linhas do código original.
+    """
+    def remap_number(match: re.Match) -> str:
+        number = int(match.group())
+        original = line_map[number - 1] if 1 <= number <= len(line_map) else 0
+        return str(original) if original else match.group()
+
+    def remap_reference(match: re.Match) -> str:
+        return match.group(1) + match.group(2) + NUMBER_PATTERN.sub(remap_number, match.group(3))
+
+    return LINE_REFERENCE_PATTERN.sub(remap_reference, text)
+
+
+def remap_report(report: dict, line_map: list[int]) -> dict:
+    """
+    Aplica remap_line_references aos títulos e explicações de um ConsolidatedResponse serializado.
+    """
+    return {
+        agent_key: {"suggestions": [
+            {
+                **suggestion,
+                "title": remap_line_references(suggestion["title"], line_map),
+                "explanation": remap_line_references(suggestion["explanation"], line_map),
+            }
+            for suggestion in agent_report["suggestions"]
+        ]}
+        for agent_key, agent_report in report.items()
+    }
@@ -0,0 +1,173 @@
+import ast
+
+
+MODULE_UNIT = "<module>"
+DEFINITION_TYPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+ASSIGNMENT_TYPES = (ast.Assign, ast.AnnAssign, ast.AugAssign)
+
+
+def _import_lines(tree: ast.Module) -> tuple[list[tuple[str, int]], dict[str, tuple[str, int]]]:
+    """
+    Separa os imports de nível superior em um por nome importado, cada um com a linha original.
+    Retorna os imports de __future__, que acompanham todas as unidades, e os demais indexados
+    pelo nome que cada um define.
+    """
+    future_imports = []
+    imports_by_name = {}
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            future_imports.append((ast.unparse(node), node.lineno))
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                line = ast.unparse(ast.Import(names=[alias]))
+                imports_by_name[alias.asname or alias.name.split(".")[0]] = (line, node.lineno)
+        elif isinstance(node, ast.ImportFrom):
+            for alias in node.names:
+                line = ast.unparse(ast.ImportFrom(module=node.module, names=[alias], level=node.level))
+                imports_by_name[alias.asname or alias.name] = (line, node.lineno)
+    return future_imports, imports_by_name
+
+
+def _used_names(nodes: list[ast.AST]) -> set[str]:
+    return {node.id for root in nodes for node in ast.walk(root) if isinstance(node, ast.Name)}
+
+
+def _assigned_names(node: ast.stmt) -> set[str]:
+    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+    return {
+        name.id for target in targets for name in ast.walk(target)
+        if isinstance(name, ast.Name) and isinstance(name.ctx, ast.Store)
+    }
+
+
+def _body_lines(lines: list[str], node: ast.stmt) -> list[tuple[str, int]]:
+    start = min([decorator.lineno for decorator in getattr(node, "decorator_list", [])] + [node.lineno])
+    return [(lines[number - 1], number) for number in range(start, node.end_lineno + 1)]
+
+
+def _stub(node: ast.stmt) -> tuple[str, int]:
+    """
+    Declaração vazia de uma função ou classe definida em outra unidade, para que o trecho não acuse
+    nomes indefinidos (F821) nem falhe com NameError ao ser executado pelo profiler. Tem a linha original 0.
+    """
+    if isinstance(node, ast.ClassDef):
+        return f"class {node.name}: ...  # noqa", 0
+    return f"def {node.name}(*args, **kwargs): ...  # noqa", 0
+
+
+def _module_runs(tree: ast.Module) -> list[list[ast.stmt]]:
+    """
+    Agrupa as instruções de módulo (nem imports nem definições) em sequências contíguas do código.
+    Uma função ou classe entre duas instruções inicia uma nova sequência.
+    """
+    runs = [[]]
+    for node in tree.body:
+        if isinstance(node, DEFINITION_TYPES):
+            if runs[-1]:
+                runs.append([])
+        elif not isinstance(node, (ast.Import, ast.ImportFrom)):
+            runs[-1].append(node)
+    return [run for run in runs if run]
+
+
+def split_units(code: str) -> list[dict]:
+    """
+    Divide o código em unidades de nível superior, na ordem do código: uma por função ou classe
+    (com os decoradores) e uma unidade '<module>' para cada sequência contígua das demais instruções.
+    Cada unidade tem 'name', 'body' (pares texto, linha original), 'defines' (nomes que o corpo
+    define), 'header' e 'stubs'. O cabeçalho traz os imports e as atribuições de módulo de outras
+    unidades de que o corpo depende; 'stubs' traz, por nome, declarações vazias das funções e
+    classes de outras unidades que ele referencia. Imports sem uso em todo o arquivo ficam na
+    primeira unidade '<module>', para que o flake8 ainda os aponte. Lança SyntaxError para código inválido.
+    """
+    tree = ast.parse(code)
+    lines = code.splitlines()
+    future_imports, imports_by_name = _import_lines(tree)
+
+    definitions = {node.name: node for node in tree.body if isinstance(node, DEFINITION_TYPES)}
+    assignments = [node for node in tree.body if isinstance(node, ASSIGNMENT_TYPES)]
+    assignments_by_name = {}
+    for node in assignments:
+        for name in _assigned_names(node):
+            assignments_by_name.setdefault(name, []).append(node)
+
+    def dependencies(nodes: list[ast.stmt]) -> tuple[set[str], list[ast.stmt]]:
+        """Nomes usados pelas instruções e atribuições de módulo das quais elas dependem, transitivamente."""
+        used = _used_names(nodes)
+        own = {id(node) for node in nodes}
+        required = {}
+        pending = list(used)
+        while pending:
+            for node in assignments_by_name.get(pending.pop(), []):
+                if id(node) in own or id(node) in required:
+                    continue
+                required[id(node)] = node
+                new_names = _used_names([node]) - used
+                used |= new_names
+                pending.extend(new_names)
+        return used, sorted(required.values(), key=lambda node: node.lineno)
+
+    def make_unit(name: str, nodes: list[ast.stmt]) -> dict:
+        used, required_assignments = dependencies(nodes)
+        defines = set().union(*(
+            {node.name} if isinstance(node, DEFINITION_TYPES)
+            else _assigned_names(node) if isinstance(node, ASSIGNMENT_TYPES) else set()
+            for node in nodes
+        ))
+        header = future_imports + [line for import_name, line in imports_by_name.items() if import_name in used]
+        header += [line for node in required_assignments for line in _body_lines(lines, node)]
+        return {
+            "name": name,
+            "header": header,
+            "stubs": {
+                definition: _stub(definitions[definition])
+                for definition in sorted((used & definitions.keys()) - defines)
+            },
+            "defines": defines,
+            "body": [line for node in nodes for line in _body_lines(lines, node)],
+            "used": used,
+        }
+
+    units = [
+        make_unit(f"{'class' if isinstance(node, ast.ClassDef) else 'def'} {node.name}", [node])
+        for node in definitions.values()
+    ]
+    module_units = [make_unit(MODULE_UNIT, run) for run in _module_runs(tree)]
+
+    names_used_anywhere = set().union(*(unit["used"] for unit in units + module_units))
+    unused_imports = [line for name, line in imports_by_name.items() if name not in names_used_anywhere]
+    if unused_imports:
+        if module_units:
+            module_units[0]["header"] = sorted(module_units[0]["header"] + unused_imports, key=lambda line: line[1])
+        else:
+            module_units.append({
+                "name": MODULE_UNIT, "header": [], "stubs": {}, "defines": set(),
+                "body": future_imports + unused_imports, "used": set(),
+            })
+
+    units = sorted(units + module_units, key=lambda unit: unit["body"][0][1])
+    for unit in units:
+        del unit["used"]
+    return units
+
+
+def render_units(units: list[dict]) -> tuple[str, list[int]]:
+    """
+    Monta o trecho enviado aos agentes para uma ou mais unidades: as linhas dos cabeçalhos, sem
+    repetição e sem as que já estão nos corpos, os stubs das funções e classes que nenhuma das
+    unidades define, e então os corpos, separados por duas linhas em branco. Retorna o trecho e,
+    para cada linha dele, a linha correspondente no código original (0 para as linhas inseridas).
+    """
+    body_lines = {number for unit in units for _, number in unit["body"]}
+    defined = set().union(*(unit["defines"] for unit in units))
+    header = sorted(
+        dict.fromkeys(line for unit in units for line in unit["header"] if line[1] not in body_lines),
+        key=lambda line: line[1]
+    )
+    stubs = {name: stub for unit in units for name, stub in unit["stubs"].items() if name not in defined}
+    rendered = header + [stubs[name] for name in sorted(stubs)]
+    for unit in units:
+        if rendered:
+            rendered += [("", 0), ("", 0)]
+        rendered += unit["body"]
+    return "\n".join(text for text, _ in rendered) + "\n", [number for _, number in rendered]
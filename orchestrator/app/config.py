@@ -1,8 +1,7 @@
 import os
 import logging
 
-from crewai import LLM
-from models import AnalysisResponse, ConsolidatedResponse
+from models import AnalysisResponse
 
 
 GOOGLE_API_KEY = os.environ.get("GOOGLE_API_KEY")
@@ -12,16 +11,119 @@ if not GOOGLE_API_KEY or not MODEL_NAME:
     logging.error("A GOOGLE_API_KEY and MODEL_NAME não estão configurada.")
     raise ValueError("GOOGLE_API_KEY and MODEL_NAME must be set in the environment variables.")
 
-llm_for_review = LLM(
-    model=f"gemini/{MODEL_NAME}",
-    api_key=GOOGLE_API_KEY,
-    temperature=0.3,
-    response_format=AnalysisResponse,
-)
+PROMPT_VERSION = os.environ.get("PROMPT_VERSION", "1")
+MODEL_VERSION = f"{MODEL_NAME}:{PROMPT_VERSION}"
+# Endereço alternativo da API do Gemini (proxy ou servidor simulado dos benchmarks).
+LLM_API_BASE = os.environ.get("LLM_API_BASE") or None
+
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "orchestrator")
+# Prefixo fixo dos nomes das métricas: não vem do ambiente, para continuar único quando os
+# agentes são carregados no processo do orquestrador, que compartilha com eles o SERVICE_NAME.
+METRICS_PREFIX = "orchestrator"
+
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "none").lower()
+TRACING_FILE_PATH = os.environ.get("TRACING_FILE_PATH", f"/tmp/{SERVICE_NAME}-traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.environ.get("TRACING_OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+
+HISTORY_FRESHNESS_SECONDS = int(os.environ.get("HISTORY_FRESHNESS_SECONDS", "604800"))
+INCREMENTAL_MAX_CONCURRENT_UNITS = int(os.environ.get("INCREMENTAL_MAX_CONCURRENT_UNITS", "4"))
+
+# Códigos com mais linhas que CHUNK_MAX_LINES são divididos em blocos por função/classe (0 desabilita).
+CHUNK_MAX_LINES = int(os.environ.get("CHUNK_MAX_LINES", "400"))
+CHUNK_MAX_CONCURRENCY = int(os.environ.get("CHUNK_MAX_CONCURRENCY", "4"))
 
-llm_for_report = LLM(
-    model=f"gemini/{MODEL_NAME}",
-    api_key=GOOGLE_API_KEY,
-    temperature=0.3,
-    response_format=ConsolidatedResponse,
+BATCH_MAX_FILES = int(os.environ.get("BATCH_MAX_FILES", "1000"))
+BATCH_MAX_FILE_BYTES = int(os.environ.get("BATCH_MAX_FILE_BYTES", "1000000"))
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "4"))
+JOB_QUEUE_MAX_SIZE = int(os.environ.get("JOB_QUEUE_MAX_SIZE", "1000"))
+JOB_WEBHOOK_TIMEOUT = float(os.environ.get("JOB_WEBHOOK_TIMEOUT", "10"))
+
+ORCHESTRATION_CREW_POOL_SIZE = int(os.environ.get("ORCHESTRATION_CREW_POOL_SIZE", "2"))
+
+CACHE_ENABLED = os.environ.get("CACHE_ENABLED", "true").lower() == "true"
+CACHE_MAX_ENTRIES = int(os.environ.get("CACHE_MAX_ENTRIES", "1024"))
+CACHE_TTL_SECONDS = int(os.environ.get("CACHE_TTL_SECONDS", "86400"))
+CACHE_SQLITE_PATH = os.environ.get("CACHE_SQLITE_PATH")
+CACHE_SQLITE_MAX_ENTRIES = int(os.environ.get("CACHE_SQLITE_MAX_ENTRIES", "10000"))
+
+SECURITY_AGENT_URL = os.environ.get("SECURITY_AGENT_URL")
+PERFORMANCE_AGENT_URL = os.environ.get("PERFORMANCE_AGENT_URL")
+CODESTYLE_AGENT_URL = os.environ.get("CODESTYLE_AGENT_URL")
+# "http": cada agente é um microsserviço; "inprocess": os agentes são importados e executados no orquestrador.
+AGENT_DEPLOYMENT_MODE = os.environ.get("AGENT_DEPLOYMENT_MODE", "http").lower()
+INPROCESS_AGENTS_DIR = os.environ.get(
+    "INPROCESS_AGENTS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..")
 )
+AGENT_REQUEST_TIMEOUT = float(os.environ.get("AGENT_REQUEST_TIMEOUT", "90"))
+AGENT_CONNECT_TIMEOUT = float(os.environ.get("AGENT_CONNECT_TIMEOUT", "5"))
+AGENT_POOL_SIZE = int(os.environ.get("AGENT_POOL_SIZE", "20"))
+AGENT_KEEPALIVE_EXPIRY = float(os.environ.get("AGENT_KEEPALIVE_EXPIRY", "60"))
+AGENT_HTTP2 = os.environ.get("AGENT_HTTP2", "false").lower() == "true"
+AGENT_MAX_RETRIES = int(os.environ.get("AGENT_MAX_RETRIES", "2"))
+AGENT_RETRY_BACKOFF_SECONDS = float(os.environ.get("AGENT_RETRY_BACKOFF_SECONDS", "0.5"))
+AGENT_MAX_RETRY_AFTER_SECONDS = float(os.environ.get("AGENT_MAX_RETRY_AFTER_SECONDS", "10"))
+AGENT_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("AGENT_CIRCUIT_FAILURE_THRESHOLD", "5"))
+AGENT_CIRCUIT_RESET_SECONDS = float(os.environ.get("AGENT_CIRCUIT_RESET_SECONDS", "30"))
+
+SECURITY_AGENT_POOL_SIZE = int(os.environ.get("SECURITY_AGENT_POOL_SIZE", str(AGENT_POOL_SIZE)))
+SECURITY_AGENT_CONNECT_TIMEOUT = float(os.environ.get("SECURITY_AGENT_CONNECT_TIMEOUT", str(AGENT_CONNECT_TIMEOUT)))
+SECURITY_AGENT_READ_TIMEOUT = float(os.environ.get("SECURITY_AGENT_READ_TIMEOUT", str(AGENT_REQUEST_TIMEOUT)))
+PERFORMANCE_AGENT_POOL_SIZE = int(os.environ.get("PERFORMANCE_AGENT_POOL_SIZE", str(AGENT_POOL_SIZE)))
+PERFORMANCE_AGENT_CONNECT_TIMEOUT = float(os.environ.get("PERFORMANCE_AGENT_CONNECT_TIMEOUT", str(AGENT_CONNECT_TIMEOUT)))
+PERFORMANCE_AGENT_READ_TIMEOUT = float(os.environ.get("PERFORMANCE_AGENT_READ_TIMEOUT", str(AGENT_REQUEST_TIMEOUT)))
+CODESTYLE_AGENT_POOL_SIZE = int(os.environ.get("CODESTYLE_AGENT_POOL_SIZE", str(AGENT_POOL_SIZE)))
+CODESTYLE_AGENT_CONNECT_TIMEOUT = float(os.environ.get("CODESTYLE_AGENT_CONNECT_TIMEOUT", str(AGENT_CONNECT_TIMEOUT)))
+CODESTYLE_AGENT_READ_TIMEOUT = float(os.environ.get("CODESTYLE_AGENT_READ_TIMEOUT", str(AGENT_REQUEST_TIMEOUT)))
+
+DEDUP_SHINGLE_SIZE = int(os.environ.get("DEDUP_SHINGLE_SIZE", "4"))
+DEDUP_SIMILARITY_THRESHOLD = float(os.environ.get("DEDUP_SIMILARITY_THRESHOLD", "0.8"))
+
+# O coordenador apenas delega para as ferramentas, por isso pode usar um modelo mais rápido que o dos agentes.
+COORDINATOR_MODEL_NAME = os.environ.get("COORDINATOR_MODEL_NAME") or MODEL_NAME
+
+LLM_RATE_LIMIT_PER_MINUTE = float(os.environ.get("LLM_RATE_LIMIT_PER_MINUTE", "60"))
+LLM_RATE_LIMIT_BURST = int(os.environ.get("LLM_RATE_LIMIT_BURST", "10"))
+LLM_RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get("LLM_RATE_LIMIT_MAX_WAIT_SECONDS", "30"))
+
+# Correção das saídas do coordenador que não validam no schema: apenas a última etapa é repetida, com o erro de validação.
+STRUCTURED_OUTPUT_MAX_REPAIRS = int(os.environ.get("STRUCTURED_OUTPUT_MAX_REPAIRS", "2"))
+
+_LLM_RESPONSE_FORMATS = {
+    "llm_for_review": AnalysisResponse,
+}
+_LLM_MODELS = {
+    "llm_for_review": COORDINATOR_MODEL_NAME,
+}
+_llms = {}
+
+
+def __getattr__(name: str):
+    """
+    Cria os objetos LLM sob demanda. Importar o crewai leva alguns segundos, por isso ele só é
+    carregado no aquecimento do serviço (ou no primeiro uso), e não ao importar a configuração.
+    Cada chamada ao LLM consome uma ficha do token bucket compartilhado pela chave de API
+    e tem sua latência e uso de tokens registrados nas métricas.
+    """
+    if name not in _LLM_RESPONSE_FORMATS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name not in _llms:
+        from crewai import LLM
+        from limits import llm_token_bucket, rate_limited
+        from metrics import instrumented_llm_call
+
+        model_name = _LLM_MODELS.get(name, MODEL_NAME)
+
+        llm_instance = LLM(
+            model=f"gemini/{model_name}",
+            api_key=GOOGLE_API_KEY,
+            api_base=LLM_API_BASE,
+            temperature=0.3,
+            response_format=_LLM_RESPONSE_FORMATS[name],
+        )
+        bucket = llm_token_bucket(
+            GOOGLE_API_KEY, LLM_RATE_LIMIT_PER_MINUTE, LLM_RATE_LIMIT_BURST, LLM_RATE_LIMIT_MAX_WAIT_SECONDS
+        )
+        llm_instance.call = rate_limited(instrumented_llm_call(llm_instance.call, model_name), bucket)
+        _llms[name] = llm_instance
+    return _llms[name]
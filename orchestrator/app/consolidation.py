@@ -0,0 +1,171 @@
+import logging
+import re
+import unicodedata
+import zlib
+
+import config
+from models import AnalysisResponse, ConsolidatedResponse, EnrichedSuggestion
+from structured_output import STRUCTURED_OUTPUT_ERRORS, extract_json
+
+
+AGENT_KEYS = ("security", "performance", "codestyle")
+# O bandit e o flake8 analisam o código estaticamente, então os relatórios de segurança e de estilo
+# podem ser calculados por trecho (blocos de arquivos grandes, unidades da análise incremental).
+# O agente de performance executa o código no profiler: um trecho com stubs no lugar das outras
+# funções não mede nada útil, então ele sempre recebe o arquivo inteiro.
+PER_UNIT_AGENT_KEYS = ("security", "codestyle")
+WHOLE_FILE_AGENT_KEYS = ("performance",)
+
+# Título normalizado das sugestões que apenas informam que não houve achados
+# (ex: 'Nenhuma vulnerabilidade encontrada', 'Nenhuma problema de performance encontrada').
+NO_FINDINGS_TITLE_PATTERN = re.compile(r"^nenhuma? (vulnerabilidade|problema)s?( .*)? encontrad[ao]s?$")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza um texto para comparação: remove acentos, pontuação e espaços redundantes.
+    """
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def shingle_hashes(text: str, size: int = config.DEDUP_SHINGLE_SIZE) -> frozenset[int]:
+    """
+    Gera o conjunto de hashes dos shingles (janelas de caracteres) do texto normalizado.
+    """
+    normalized = normalize_text(text)
+    if len(normalized) <= size:
+        return frozenset({zlib.crc32(normalized.encode())}) if normalized else frozenset()
+    return frozenset(
+        zlib.crc32(normalized[i:i + size].encode())
+        for i in range(len(normalized) - size + 1)
+    )
+
+
+def jaccard(first: frozenset[int], second: frozenset[int]) -> float:
+    if not first and not second:
+        return 1.0
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def _is_duplicate(fingerprint: tuple[frozenset, frozenset], seen: list[tuple[frozenset, frozenset]]) -> bool:
+    title, code = fingerprint
+    threshold = config.DEDUP_SIMILARITY_THRESHOLD
+    return any(
+        jaccard(title, seen_title) >= threshold and jaccard(code, seen_code) >= threshold
+        for seen_title, seen_code in seen
+    )
+
+
+def _error_response(agent_key: str, details: str) -> AnalysisResponse:
+    return AnalysisResponse(suggestions=[
+        EnrichedSuggestion(
+            title=f"Falha na análise do agente '{agent_key}'",
+            explanation=details,
+            code_example=""
+        )
+    ])
+
+
+def parse_agent_report(agent_key: str, raw) -> AnalysisResponse:
+    """
+    Converte a resposta bruta de um agente em AnalysisResponse.
+    Respostas de erro ou inválidas viram uma sugestão descrevendo a falha, nunca uma exceção.
+    """
+    try:
+        data = extract_json(raw) if isinstance(raw, str) else raw
+        if isinstance(data, dict) and "error" in data:
+            details = data.get("details")
+            return _error_response(agent_key, f"{data['error']}: {details}" if details else data["error"])
+        return AnalysisResponse.model_validate(data)
+    except STRUCTURED_OUTPUT_ERRORS as e:
+        logging.warning(f"Resposta inválida do agente '{agent_key}': {e}")
+        return _error_response(agent_key, "A resposta do agente não pôde ser processada como um JSON válido.")
+
+
+def parse_agent_reports(agent_reports: dict, agent_keys: tuple[str, ...] = AGENT_KEYS) -> dict:
+    """
+    Converte as respostas brutas dos agentes informados em um relatório parcial serializado
+    ({agente: {"suggestions": [...]}}), que pode ser juntado a outras partes com merge_reports.
+    """
+    return {
+        agent_key: parse_agent_report(agent_key, agent_reports.get(agent_key, "")).model_dump()
+        for agent_key in agent_keys
+    }
+
+
+def find_failed_agents(agent_reports: dict, agent_keys: tuple[str, ...] = AGENT_KEYS) -> list[str]:
+    """
+    Lista os agentes (dentre 'agent_keys') cuja resposta é um erro ou não pôde ser validada como AnalysisResponse.
+    """
+    failed = []
+    for agent_key in agent_keys:
+        raw = agent_reports.get(agent_key, "")
+        try:
+            data = extract_json(raw) if isinstance(raw, str) else raw
+            if isinstance(data, dict) and "error" in data:
+                failed.append(agent_key)
+            else:
+                AnalysisResponse.model_validate(data)
+        except STRUCTURED_OUTPUT_ERRORS:
+            failed.append(agent_key)
+    return failed
+
+
+def consolidate_reports(agent_reports: dict) -> ConsolidatedResponse:
+    """
+    Consolida as respostas dos agentes em um ConsolidatedResponse, removendo
+    sugestões duplicadas (dentro do mesmo agente ou entre agentes) por similaridade
+    de título e exemplo de código. A primeira ocorrência, na ordem de AGENT_KEYS, é mantida.
+    """
+    seen = []
+    consolidated = {}
+
+    for agent_key in AGENT_KEYS:
+        report = parse_agent_report(agent_key, agent_reports.get(agent_key, ""))
+        unique_suggestions = []
+
+        for suggestion in report.suggestions:
+            fingerprint = (shingle_hashes(suggestion.title), shingle_hashes(suggestion.code_example))
+            if _is_duplicate(fingerprint, seen):
+                logging.debug(f"Sugestão duplicada removida ({agent_key}): {suggestion.title}")
+                continue
+            seen.append(fingerprint)
+            unique_suggestions.append(suggestion)
+
+        consolidated[agent_key] = AnalysisResponse(suggestions=unique_suggestions)
+
+    return ConsolidatedResponse(**consolidated)
+
+
+def is_no_findings_suggestion(suggestion: dict) -> bool:
+    return not suggestion["code_example"].strip() and bool(NO_FINDINGS_TITLE_PATTERN.match(normalize_text(suggestion["title"])))
+
+
+def _merge_agent_suggestions(suggestions: list[dict]) -> list[dict]:
+    """
+    Descarta as sugestões de "nenhum achado" das partes limpas quando outra parte tem achados;
+    se todas as partes estiverem limpas, mantém uma única sugestão desse tipo.
+    """
+    findings = [suggestion for suggestion in suggestions if not is_no_findings_suggestion(suggestion)]
+    if findings or not suggestions:
+        return findings
+    return suggestions[:1]
+
+
+def merge_reports(reports: list[dict]) -> ConsolidatedResponse:
+    """
+    Junta relatórios consolidados de partes do mesmo código (unidades ou blocos), na ordem
+    recebida, em um único ConsolidatedResponse, passando pela mesma deduplicação. Uma parte pode
+    trazer apenas alguns agentes (ex: o de performance, calculado sobre o arquivo inteiro).
+    """
+    return consolidate_reports({
+        agent_key: {"suggestions": _merge_agent_suggestions(
+            [suggestion for report in reports for suggestion in report.get(agent_key, {"suggestions": []})["suggestions"]]
+        )}
+        for agent_key in AGENT_KEYS
+    })
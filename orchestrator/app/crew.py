@@ -1,90 +1,150 @@
+import queue
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
 from crewai import Agent, Task, Crew, Process
 
 import config
+from consolidation import AGENT_KEYS, PER_UNIT_AGENT_KEYS, WHOLE_FILE_AGENT_KEYS
+from models import AnalysisResponse
+from structured_output import STRUCTURED_OUTPUT_ERRORS, extract_json, parse_with_repair
 from tools import SecurityAgentTool, CodeStyleAgentTool, PerformanceAgentTool
-from models import ConsolidatedResponse
 
 
-security_tool = SecurityAgentTool()
-style_tool = CodeStyleAgentTool()
-performance_tool = PerformanceAgentTool()
+def build_coordinator() -> Agent:
+    """
+    Cria o agente coordenador e as suas ferramentas. Durante o kickoff o crewai grava no agente e nas
+    ferramentas o estado da execução (crew, executor, contagem de uso), então cada equipe do pool
+    tem o seu próprio coordenador.
+    """
+    return Agent(
+        role="Coordenador de Revisão de Código",
+        goal="Orquestrar eficientemente a análise de um trecho de código delegando as tarefas para os agentes especialistas apropriados usando as ferramentas disponíveis.",
+        backstory=(
+            "Você é um gerente de projetos técnico. Sua função não é analisar o código, mas garantir que cada especialista "
+            "(Segurança, Estilo, Performance) receba a tarefa e que o trabalho seja feito. Você apenas invoca as ferramentas e passa os resultados adiante."
+        ),
+        tools=[SecurityAgentTool(), CodeStyleAgentTool(), PerformanceAgentTool()],
+        llm=config.llm_for_review,
+        verbose=True,
+        allow_delegation=False
+    )
 
 
-code_review_coordinator = Agent(
-    role="Coordenador de Revisão de Código",
-    goal="Orquestrar eficientemente a análise de um trecho de código delegando as tarefas para os agentes especialistas apropriados usando as ferramentas disponíveis.",
-    backstory=(
-        "Você é um gerente de projetos técnico. Sua função não é analisar o código, mas garantir que cada especialista "
-        "(Segurança, Estilo, Performance) receba a tarefa e que o trabalho seja feito. Você apenas invoca as ferramentas e passa os resultados adiante."
+# Modelos das tarefas de delegação: o código é interpolado pelo crewai a cada kickoff
+# (inputs={"code": ...}), o que permite reutilizar os mesmos objetos Task e Crew.
+DELEGATION_TASKS = [
+    (
+        "security",
+        "Use a ferramenta 'Analisador de Segurança de Código' para analisar o seguinte trecho de código: ```{code}```. Retorne o resultado JSON bruto da ferramenta.",
+        "A saída JSON completa, como uma string, retornada pelo agente de segurança.",
+    ),
+    (
+        "codestyle",
+        "Use a ferramenta 'Analisador de Estilo de Código' para analisar o seguinte trecho de código: ```{code}```. Retorne o resultado JSON bruto da ferramenta.",
+        "A saída JSON completa, como uma string, retornada pelo agente de estilo.",
     ),
-    tools=[security_tool, style_tool, performance_tool],
-    llm=config.llm_for_review,
-    verbose=True,
-    allow_delegation=False
-)
-
-report_consolidator = Agent(
-    role="Consolidador de Relatórios Técnicos",
-    goal=f"""
-        Coletar os relatórios JSON individuais de cada análise (segurança, estilo, performance)
-        e compilá-los em um único relatório JSON final. O relatório final deve ser coeso, bem estruturado
-        e seguir estritamente o schema Pydantic(ConsolidatedResponse) a seguir apontando as sugestões de cada um dos agents com as chaves 'security', 'performance' e 'codestyle':
-        {ConsolidatedResponse.model_json_schema()}
-    """,
-    backstory=(
-        "Você é um especialista em formatação de dados. Sua função é pegar múltiplos fragmentos de dados estruturados "
-        "e montá-los em um documento final unificado, garantindo consistência e aderência ao formato exigido."
+    (
+        "performance",
+        "Use a ferramenta 'Analisador de Performance de Código' para analisar o seguinte trecho de código: ```{code}```. Retorne o resultado JSON bruto da ferramenta.",
+        "A saída JSON completa, como uma string, retornada pelo agente de performance.",
     ),
-    tools=[],
-    llm=config.llm_for_report,
-    verbose=True
-)
+]
 
-def create_orchestration_crew(code_snippet: str) -> Crew:
+
+def validate_task_output(raw: str) -> str:
     """
-    Cria e configura a equipe de orquestração dinamicamente com o código fornecido.
+    Valida a saída de uma tarefa de delegação como AnalysisResponse. Com result_as_answer ela já é
+    a resposta do agente; se o coordenador a tiver reescrita de forma inválida, o próprio LLM do
+    coordenador corrige o JSON (parse_with_repair). Respostas de erro dos agentes, e saídas que não
+    puderam ser corrigidas, seguem como estão para a consolidação, que as registra como falha.
     """
+    try:
+        data = extract_json(raw)
+    except STRUCTURED_OUTPUT_ERRORS:
+        data = None
+    if isinstance(data, dict) and "error" in data:
+        return raw
+    try:
+        return parse_with_repair(raw, AnalysisResponse, config.llm_for_review).model_dump_json()
+    except STRUCTURED_OUTPUT_ERRORS:
+        return raw
 
-    delegate_security_task = Task(
-        description=f"Use a ferramenta 'Analisador de Segurança de Código' para analisar o seguinte trecho de código: ```{code_snippet}```. Retorne o resultado JSON bruto da ferramenta.",
-        expected_output="A saída JSON completa, como uma string, retornada pelo agente de segurança.",
-        agent=code_review_coordinator
-    )
 
-    delegate_style_task = Task(
-        description=f"Use a ferramenta 'Analisador de Estilo de Código' para analisar o seguinte trecho de código: ```{code_snippet}```. Retorne o resultado JSON bruto da ferramenta.",
-        expected_output="A saída JSON completa, como uma string, retornada pelo agente de estilo.",
-        agent=code_review_coordinator
-    )
+class PrebuiltCrew:
+    """
+    Equipe de orquestração montada uma única vez a partir dos modelos de tarefa, com um coordenador exclusivo.
+    Tem apenas as tarefas dos agentes de 'agent_keys'. O callback por tarefa é lido de 'on_task_output', definido a cada uso, e recebe a saída já validada.
+    A consolidação dos relatórios é feita de forma determinística em 'consolidation.py'.
+    """
 
-    delegate_performance_task = Task(
-        description=f"Use a ferramenta 'Analisador de Performance de Código' para analisar o seguinte trecho de código: ```{code_snippet}```. Retorne o resultado JSON bruto da ferramenta.",
-        expected_output="A saída JSON completa, como uma string, retornada pelo agente de performance.",
-        agent=code_review_coordinator
-    )
+    def __init__(self, agent_keys: tuple[str, ...] = AGENT_KEYS):
+        self.on_task_output: Callable[[str, str], None] | None = None
+        coordinator = build_coordinator()
+        self.crew = Crew(
+            agents=[coordinator],
+            tasks=[
+                Task(
+                    description=description,
+                    expected_output=expected_output,
+                    agent=coordinator,
+                    callback=self._task_callback(agent_key)
+                )
+                for agent_key, description, expected_output in DELEGATION_TASKS
+                if agent_key in agent_keys
+            ],
+            process=Process.sequential,
+            verbose=True
+        )
 
-    consolidate_report_task = Task(
-        description=(
-            "Analise os relatórios JSON das tarefas de segurança, estilo e performance. "
-            "Extraia a lista de 'suggestions' de cada um deles. "
-            "Combine todas as sugestões em uma única lista. "
-            "Finalmente, construa o objeto JSON final com a chave 'suggestions' contendo a lista consolidada. "
-            "Garanta que a saída seja apenas o JSON, sem nenhum texto ou comentário adicional. "
-            "Garanta que sugestões duplicadas que vem de diferentes agentes sejam removidas, mantendo apenas uma instância de cada sugestão única."
-        ),
-        expected_output="Uma única string JSON que valida com o schema 'ConsolidatedResponse'.",
-        agent=report_consolidator,
-        context=[delegate_security_task, delegate_style_task, delegate_performance_task]
-    )
+    def _task_callback(self, agent_key: str) -> Callable:
+        def callback(task_output):
+            if self.on_task_output is not None:
+                self.on_task_output(agent_key, validate_task_output(task_output.raw))
+        return callback
 
-    return Crew(
-        agents=[code_review_coordinator, report_consolidator],
-        tasks=[
-            delegate_security_task,
-            delegate_style_task,
-            delegate_performance_task,
-            consolidate_report_task,
-        ],
-        process=Process.sequential,
-        verbose=True
-    )
+
+class OrchestrationCrewPool:
+    """
+    Pool de equipes de orquestração pré-montadas. Um Crew guarda estado durante o kickoff,
+    então cada requisição usa uma equipe exclusiva; se todas estiverem em uso, uma nova é criada
+    e devolvida ao pool ao final (até 'size' equipes ociosas).
+    """
+
+    def __init__(self, size: int, agent_keys: tuple[str, ...] = AGENT_KEYS):
+        self.size = size
+        self.agent_keys = agent_keys
+        self._idle: queue.LifoQueue[PrebuiltCrew] = queue.LifoQueue(maxsize=size)
+
+    def warm(self):
+        while not self._idle.full():
+            self._idle.put_nowait(PrebuiltCrew(self.agent_keys))
+
+    @contextmanager
+    def checkout(self, on_task_output: Callable[[str, str], None] | None = None) -> Iterator[Crew]:
+        """
+        Empresta uma equipe. Se informado, 'on_task_output' é chamado com a chave do agente
+        e a saída bruta ao fim de cada tarefa.
+        """
+        try:
+            prebuilt = self._idle.get_nowait()
+        except queue.Empty:
+            prebuilt = PrebuiltCrew(self.agent_keys)
+        prebuilt.on_task_output = on_task_output
+        try:
+            yield prebuilt.crew
+        finally:
+            prebuilt.on_task_output = None
+            try:
+                self._idle.put_nowait(prebuilt)
+            except queue.Full:
+                pass
+
+
+# Pools por conjunto de agentes: o completo e os parciais usados nos blocos de arquivos grandes e
+# na análise incremental (segurança e estilo por trecho, performance sobre o arquivo inteiro).
+orchestration_crews_by_agents = {
+    frozenset(agent_keys): OrchestrationCrewPool(config.ORCHESTRATION_CREW_POOL_SIZE, agent_keys)
+    for agent_keys in (AGENT_KEYS, PER_UNIT_AGENT_KEYS, WHOLE_FILE_AGENT_KEYS)
+}
+orchestration_crews = orchestration_crews_by_agents[frozenset(AGENT_KEYS)]
@@ -1,16 +1,119 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 import schemas
 
 
-def create_analysis_record(db: Session, code_snippet: str, suggestions: dict):
+def create_analysis_record(db: Session, code_snippet: str, suggestions: dict, code_sha256: str = None, model_version: str = None, mode: str = None, units: dict = None, base_analysis_id: int = None):
     """
-    Cria e salva um novo registro de análise no banco de dados.
+    Cria e salva um novo registro de análise no banco de dados. Análises incrementais guardam
+    também o relatório de cada unidade do código ('units') e o registro usado como base.
     """
     db_record = schemas.AnalysisHistory(
         code_snippet=code_snippet,
-        suggestions=suggestions
+        code_sha256=code_sha256,
+        model_version=model_version,
+        mode=mode,
+        status="completed",
+        suggestions=suggestions,
+        units=units,
+        base_analysis_id=base_analysis_id
     )
     db.add(db_record)
     db.commit()
     db.refresh(db_record)
     return db_record
+
+
+def get_latest_analysis_by_hash(db: Session, code_sha256: str, model_version: str, mode: str, max_age_seconds: int):
+    """
+    Retorna o registro mais recente com o mesmo hash de código, versão de modelo e modo de orquestração,
+    desde que tenha sido criado dentro da janela de validade.
+    """
+    query = db.query(schemas.AnalysisHistory).filter(
+        schemas.AnalysisHistory.code_sha256 == code_sha256,
+        schemas.AnalysisHistory.model_version == model_version,
+        schemas.AnalysisHistory.mode == mode,
+        schemas.AnalysisHistory.status == "completed",
+    )
+    if max_age_seconds > 0:
+        oldest_allowed = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+        query = query.filter(schemas.AnalysisHistory.created_at >= oldest_allowed)
+    return query.order_by(schemas.AnalysisHistory.created_at.desc()).first()
+
+
+def bulk_create_analysis_records(db: Session, records: list[dict]):
+    """
+    Insere vários registros de análise com um único INSERT em lote e um único commit.
+    """
+    if not records:
+        return
+    db.execute(insert(schemas.AnalysisHistory), [{"status": "completed", **record} for record in records])
+    db.commit()
+
+
+def get_latest_analyses_by_hashes(db: Session, code_hashes: list[str], model_version: str, mode: str, max_age_seconds: int) -> dict:
+    """
+    Versão em lote de get_latest_analysis_by_hash: retorna o registro mais recente de cada hash em uma única consulta.
+    """
+    query = db.query(schemas.AnalysisHistory).filter(
+        schemas.AnalysisHistory.code_sha256.in_(code_hashes),
+        schemas.AnalysisHistory.model_version == model_version,
+        schemas.AnalysisHistory.mode == mode,
+        schemas.AnalysisHistory.status == "completed",
+    )
+    if max_age_seconds > 0:
+        oldest_allowed = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+        query = query.filter(schemas.AnalysisHistory.created_at >= oldest_allowed)
+
+    latest = {}
+    for record in query.order_by(schemas.AnalysisHistory.created_at.desc()):
+        latest.setdefault(record.code_sha256, record)
+    return latest
+
+
+def create_job_record(db: Session, code_snippet: str, mode: str, webhook_url: str = None, force_refresh: bool = False):
+    """
+    Cria um registro de análise com status 'pending', que servirá como job assíncrono.
+    """
+    db_record = schemas.AnalysisHistory(
+        code_snippet=code_snippet,
+        mode=mode,
+        status="pending",
+        webhook_url=webhook_url,
+        force_refresh=force_refresh
+    )
+    db.add(db_record)
+    db.commit()
+    db.refresh(db_record)
+    return db_record
+
+
+def get_analysis_record(db: Session, record_id: int):
+    return db.get(schemas.AnalysisHistory, record_id)
+
+
+def update_job_record(db: Session, record_id: int, status: str, **fields):
+    """
+    Atualiza o status de um job e, opcionalmente, os demais campos (suggestions, error, hash...).
+    """
+    db_record = db.get(schemas.AnalysisHistory, record_id)
+    if db_record is None:
+        return None
+    db_record.status = status
+    for field, value in fields.items():
+        setattr(db_record, field, value)
+    db.commit()
+    db.refresh(db_record)
+    return db_record
+
+
+def get_unfinished_jobs(db: Session) -> list[tuple[int, bool]]:
+    """
+    Retorna o id e o 'force_refresh' dos jobs que não chegaram ao fim (ex.: interrompidos por um restart).
+    """
+    rows = db.query(schemas.AnalysisHistory.id, schemas.AnalysisHistory.force_refresh).filter(
+        schemas.AnalysisHistory.status.in_(["pending", "running"])
+    ).order_by(schemas.AnalysisHistory.id).all()
+    return [(row.id, bool(row.force_refresh)) for row in rows]
@@ -18,3 +18,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def run_in_session(operation, *args, **kwargs):
+    """
+    Executa uma operação do crud em uma sessão própria, para código que não tem uma requisição
+    associada (workers de jobs, respostas em streaming).
+    """
+    db = SessionLocal()
+    try:
+        return operation(db, *args, **kwargs)
+    finally:
+        db.close()
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator
+
+from agent_client import agent_clients
+from metrics import timed
+
+
+async def call_agent(agent_key: str, code: str) -> str:
+    with timed(f"agent_{agent_key}"):
+        return await agent_clients[agent_key].apost("/analyze", {"code": code})
+
+
+async def call_agent_batch(agent_key: str, files: list[dict]) -> dict:
+    """
+    Envia um lote de arquivos para o endpoint /analyze/batch do agente e retorna
+    as sugestões indexadas por caminho. Em caso de falha, todos os arquivos recebem o JSON de erro.
+    """
+    agent_client = agent_clients[agent_key]
+    with timed(f"agent_{agent_key}_batch"):
+        raw = await agent_client.apost("/analyze/batch", {"files": files})
+    try:
+        data = json.loads(raw)
+        if "error" not in data:
+            return {item["path"]: {"suggestions": item["suggestions"]} for item in data["results"]}
+    except (json.JSONDecodeError, KeyError, TypeError) as e:
+        raw = json.dumps({"error": f"Resposta inválida do {agent_client.agent_name}", "details": str(e)})
+    return {file["path"]: raw for file in files}
+
+
+async def fan_out_analysis(code: str, agent_keys: tuple[str, ...] | None = None) -> dict[str, str]:
+    """
+    Envia o código para os agentes especialistas em paralelo (todos, ou apenas os de 'agent_keys') e
+    retorna as respostas brutas indexadas por 'security', 'performance' e 'codestyle'.
+    """
+    logging.info("Disparando análise em paralelo para os agentes especialistas...")
+    keys = list(agent_keys or agent_clients)
+    results = await asyncio.gather(*(call_agent(key, code) for key in keys))
+    return dict(zip(keys, results))
+
+
+async def iter_fan_out_analysis(code: str) -> AsyncIterator[tuple[str, str]]:
+    """
+    Envia o código para os três agentes em paralelo e produz cada resposta bruta,
+    junto com a chave do agente, assim que ela chega.
+    """
+    async def tagged_call(key: str) -> tuple[str, str]:
+        return key, await call_agent(key, code)
+
+    logging.info("Disparando análise em paralelo (streaming) para os agentes especialistas...")
+    for next_result in asyncio.as_completed([tagged_call(key) for key in agent_clients]):
+        yield await next_result
+
+
+async def fan_out_batch_analysis(files: list[dict]) -> dict[str, dict]:
+    """
+    Envia o lote de arquivos para os três agentes em paralelo e retorna,
+    para cada agente, as respostas indexadas pelo caminho do arquivo.
+    """
+    logging.info(f"Disparando análise em lote de {len(files)} arquivos para os agentes especialistas...")
+    keys = list(agent_clients)
+    results = await asyncio.gather(*(call_agent_batch(key, files) for key in keys))
+    return dict(zip(keys, results))
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+
+import config
+import models
+import schemas
+from cache import code_sha256, make_cache_key, result_cache
+from chunking import remap_report
+from code_units import render_units, split_units
+from consolidation import PER_UNIT_AGENT_KEYS, WHOLE_FILE_AGENT_KEYS, merge_reports
+from pipeline import analyze_with_agents, run_analysis
+from tracing import set_span_attributes
+
+
+def unit_cache_key(unit_code: str, mode: models.OrchestrationMode) -> str:
+    """
+    Chave do relatório parcial de uma unidade no cache, separada da chave do resultado
+    consolidado, que tem também o relatório de performance.
+    """
+    return make_cache_key(unit_code, f"orchestrator:{mode.value}:unit")
+
+
+def _unit_report(report: dict) -> dict:
+    """
+    Apenas os agentes calculados por unidade. Registros salvos antes dessa separação também
+    trazem um relatório de performance da unidade, que é descartado.
+    """
+    return {agent_key: report[agent_key] for agent_key in PER_UNIT_AGENT_KEYS}
+
+
+def split_code_units(code: str) -> list[dict]:
+    """
+    Divide o código em unidades (funções, classes e o código de módulo) e calcula o hash de cada uma
+    sobre o trecho completo enviado aos agentes, com o mesmo cabeçalho dos blocos de arquivos grandes
+    (imports, atribuições de módulo e stubs). Assim, mudar um import ou uma constante só invalida as
+    unidades que dependem dele. Cada unidade traz o 'line_map' (linha do trecho -> linha do arquivo).
+    Lança SyntaxError para código inválido.
+    """
+    units = []
+    for unit in split_units(code):
+        unit_code, line_map = render_units([unit])
+        units.append({"name": unit["name"], "code": unit_code, "sha256": code_sha256(unit_code), "line_map": line_map})
+    return units
+
+
+async def run_incremental_analysis(
+    base_record: schemas.AnalysisHistory,
+    code: str,
+    mode: models.OrchestrationMode
+) -> tuple[models.ConsolidatedResponse, list[str], dict | None]:
+    """
+    Analisa apenas as unidades (funções, classes e o código de módulo) que mudaram em relação à
+    análise base: unidades com o mesmo hash reaproveitam o relatório salvo na análise base (ou no
+    cache), e as demais são enviadas aos agentes de segurança e de estilo, até
+    INCREMENTAL_MAX_CONCURRENT_UNITS por vez. Os relatórios são guardados com as linhas do trecho de
+    cada unidade, que não mudam quando o resto do arquivo muda, e convertidos para as linhas do
+    arquivo atual ao serem juntados. O agente de performance sempre recebe o arquivo inteiro: uma
+    unidade só com definições, e com stubs no lugar das funções que ela chama, não tem o que medir.
+    Retorna a resposta consolidada, os agentes que falharam e o mapa de unidades a ser salvo
+    (None quando o código não pôde ser dividido e foi analisado por inteiro).
+    """
+    try:
+        units = split_code_units(code)
+    except SyntaxError as e:
+        logging.warning(f"Código inválido para a análise incremental ({e}). Analisando o arquivo inteiro.")
+        units = []
+    if not units:
+        final_response, failed_agents = await run_analysis(code, mode)
+        return final_response, failed_agents, None
+
+    stored_units = {}
+    if base_record.model_version == config.MODEL_VERSION and base_record.units:
+        stored_units = base_record.units
+
+    reports_by_hash = {}
+    pending_units = {}
+    for unit in units:
+        if unit["sha256"] in stored_units:
+            reports_by_hash[unit["sha256"]] = _unit_report(stored_units[unit["sha256"]]["report"])
+            continue
+        cached_report = result_cache.get(unit_cache_key(unit["code"], mode))
+        if cached_report is not None:
+            reports_by_hash[unit["sha256"]] = cached_report
+        else:
+            pending_units[unit["sha256"]] = unit
+
+    logging.info(
+        f"Análise incremental sobre o registro {base_record.id}: {len(units) - len(pending_units)} unidades "
+        f"reaproveitadas, {len(pending_units)} enviadas aos agentes: {[unit['name'] for unit in pending_units.values()]}"
+    )
+    set_span_attributes(units_total=len(units), units_analyzed=len(pending_units))
+
+    semaphore = asyncio.Semaphore(config.INCREMENTAL_MAX_CONCURRENT_UNITS)
+
+    async def analyze_unit(unit: dict) -> tuple[dict, dict, list[str]]:
+        async with semaphore:
+            return unit, *await analyze_with_agents(unit["code"], mode, PER_UNIT_AGENT_KEYS)
+
+    (whole_file_report, failed_agents), *unit_results = await asyncio.gather(
+        analyze_with_agents(code, mode, WHOLE_FILE_AGENT_KEYS),
+        *(analyze_unit(unit) for unit in pending_units.values())
+    )
+    failed_agents = set(failed_agents)
+    failed_units = set()
+    for unit, unit_report, unit_failed_agents in unit_results:
+        reports_by_hash[unit["sha256"]] = unit_report
+        if unit_failed_agents:
+            failed_agents.update(unit_failed_agents)
+            failed_units.add(unit["sha256"])
+        else:
+            result_cache.set(unit_cache_key(unit["code"], mode), unit_report)
+
+    saved_units = {
+        unit["sha256"]: {"name": unit["name"], "report": reports_by_hash[unit["sha256"]], "line_map": unit["line_map"]}
+        for unit in units if unit["sha256"] not in failed_units
+    }
+    final_response = merge_reports(
+        [remap_report(reports_by_hash[unit["sha256"]], unit["line_map"]) for unit in units] + [whole_file_report]
+    )
+    return final_response, sorted(failed_agents), saved_units
@@ -0,0 +1,108 @@
+import importlib
+import json
+import logging
+import os
+import sys
+from types import ModuleType
+
+from fastapi.concurrency import run_in_threadpool
+
+import config
+from metrics import include_registry
+
+
+AGENT_DIRECTORIES = {
+    "security": ("Security Agent", "security_agent"),
+    "performance": ("Performance Agent", "performance_agent"),
+    "codestyle": ("Code Style Agent", "codestyle_agent"),
+}
+
+
+def _module_names(app_dir: str) -> set[str]:
+    return {name[:-3] for name in os.listdir(app_dir) if name.endswith(".py")}
+
+
+def load_agent_analysis(app_dir: str, shared_names: set[str]) -> ModuleType:
+    """
+    Importa o módulo 'analysis' de um agente a partir do seu diretório. Os agentes usam módulos
+    planos com os mesmos nomes do orquestrador (config, models, crew...), por isso os módulos do
+    orquestrador são retirados de sys.modules durante a importação e restaurados ao final.
+    Os módulos do agente continuam referenciados entre si; apenas os que não colidem com nenhum
+    outro serviço (como o 'sandbox' do agente de performance, usado pelos processos filhos)
+    permanecem registrados globalmente. As métricas do agente passam a ser expostas no /metrics do orquestrador.
+    """
+    agent_names = _module_names(app_dir)
+    saved_modules = {name: sys.modules.pop(name) for name in agent_names if name in sys.modules}
+    sys.path.insert(0, app_dir)
+    try:
+        analysis = importlib.import_module("analysis")
+        agent_metrics = sys.modules.get("metrics")
+        if agent_metrics is not None:
+            include_registry(agent_metrics.REGISTRY)
+    finally:
+        sys.path.remove(app_dir)
+        for name in agent_names:
+            module = sys.modules.get(name)
+            if module is not None and name in shared_names:
+                del sys.modules[name]
+        sys.modules.update(saved_modules)
+
+    if agent_names - shared_names:
+        # Mantém importáveis os módulos exclusivos do agente (necessário para os processos filhos).
+        sys.path.append(app_dir)
+    return analysis
+
+
+class InProcessAgentClient:
+    """
+    Cliente com a mesma interface do AgentClient que executa a análise do agente
+    dentro do processo do orquestrador, sem HTTP, mantendo o contrato de AnalysisResponse.
+    """
+
+    def __init__(self, agent_name: str, analysis: ModuleType):
+        self.agent_name = agent_name
+        self.analysis = analysis
+
+    def post(self, path: str, payload: dict) -> str:
+        try:
+            if path == "/analyze/batch":
+                files = [self.analysis.models.FileInput(**file) for file in payload["files"]]
+                return self.analysis.analyze_files(files).model_dump_json()
+            return self.analysis.analyze(payload["code"]).model_dump_json()
+        except Exception as e:
+            logging.error(f"Erro na análise em processo do {self.agent_name}: {e}")
+            return json.dumps({"error": f"Falha na análise em processo do {self.agent_name}", "details": str(e)})
+
+    async def apost(self, path: str, payload: dict) -> str:
+        return await run_in_threadpool(self.post, path, payload)
+
+    def state(self) -> str:
+        return "inprocess"
+
+    async def aclose(self):
+        shutdown = getattr(self.analysis, "shutdown", None)
+        if shutdown is not None:
+            shutdown()
+
+
+def build_inprocess_clients() -> dict[str, InProcessAgentClient]:
+    """
+    Carrega os três agentes como bibliotecas a partir de INPROCESS_AGENTS_DIR.
+    """
+    app_dirs = {
+        key: os.path.join(config.INPROCESS_AGENTS_DIR, directory, "app")
+        for key, (_, directory) in AGENT_DIRECTORIES.items()
+    }
+    orchestrator_dir = os.path.dirname(os.path.abspath(__file__))
+    all_names = [_module_names(orchestrator_dir)] + [_module_names(app_dir) for app_dir in app_dirs.values()]
+
+    clients = {}
+    for index, (key, (agent_name, _)) in enumerate(AGENT_DIRECTORIES.items()):
+        other_names = set().union(*(names for position, names in enumerate(all_names) if position != index + 1))
+        analysis = load_agent_analysis(app_dirs[key], shared_names=all_names[index + 1] & other_names)
+        startup = getattr(analysis, "startup", None)
+        if startup is not None:
+            startup()
+        clients[key] = InProcessAgentClient(agent_name, analysis)
+        logging.info(f"{agent_name} carregado em processo a partir de {app_dirs[key]}.")
+    return clients
@@ -0,0 +1,136 @@
+import asyncio
+import logging
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+import config
+import crud
+import models
+from cache import code_sha256
+from database import run_in_session
+from pipeline import find_stored_result, remember_record, run_analysis
+from tracing import span
+
+
+def build_job_response(record) -> models.JobResponse:
+    return models.JobResponse(
+        job_id=record.id,
+        status=record.status,
+        created_at=record.created_at,
+        updated_at=record.updated_at,
+        result=record.suggestions if record.status == models.JobStatus.COMPLETED.value else None,
+        error=record.error,
+    )
+
+
+class JobRunner:
+    """
+    Pool limitado de workers assíncronos que consome os jobs de orquestração de uma fila.
+    O estado de cada job é persistido na tabela analysis_history.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks: list[asyncio.Task] = []
+        self._client: httpx.AsyncClient | None = None
+
+    def is_full(self) -> bool:
+        return self._queue.full()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    async def start(self, client: httpx.AsyncClient):
+        self._client = client
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+
+        # A fila não é aguardada aqui para não travar a inicialização: os jobs que não couberem
+        # nela são marcados como falhos e podem ser submetidos novamente pelo cliente.
+        unfinished_jobs = await run_in_threadpool(run_in_session, crud.get_unfinished_jobs)
+        for job_id, force_refresh in unfinished_jobs:
+            try:
+                self._queue.put_nowait((job_id, force_refresh))
+            except asyncio.QueueFull:
+                logging.warning(f"Fila de jobs cheia: job {job_id} interrompido anteriormente marcado como falho.")
+                await run_in_threadpool(
+                    run_in_session, crud.update_job_record, job_id, models.JobStatus.FAILED.value,
+                    error="Fila de jobs cheia ao retomar o job após o reinício do serviço."
+                )
+                continue
+            logging.info(f"Reenfileirando job {job_id} interrompido anteriormente.")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id: int, force_refresh: bool = False):
+        self._queue.put_nowait((job_id, force_refresh))
+
+    async def _worker(self, index: int):
+        while True:
+            job_id, force_refresh = await self._queue.get()
+            try:
+                with span("job", job_id=job_id):
+                    await self._process(job_id, force_refresh)
+            except Exception as e:
+                logging.error(f"Worker {index}: erro inesperado ao processar o job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job_id: int, force_refresh: bool):
+        record = await run_in_threadpool(run_in_session, crud.update_job_record, job_id, models.JobStatus.RUNNING.value)
+        if record is None:
+            logging.warning(f"Job {job_id} não encontrado.")
+            return
+
+        logging.info(f"Processando job {job_id} (modo: {record.mode}).")
+        try:
+            mode = models.OrchestrationMode(record.mode or models.OrchestrationMode.CREW.value)
+            stored_result = None
+            if not force_refresh:
+                stored_result = await run_in_threadpool(run_in_session, find_stored_result, record.code_snippet, mode)
+
+            if stored_result is not None:
+                final_response, failed_agents = stored_result[0], []
+            else:
+                final_response, failed_agents = await run_analysis(record.code_snippet, mode)
+
+            record = await run_in_threadpool(
+                run_in_session,
+                crud.update_job_record,
+                job_id,
+                models.JobStatus.COMPLETED.value,
+                suggestions=final_response.model_dump(),
+                code_sha256=None if failed_agents else code_sha256(record.code_snippet),
+                model_version=config.MODEL_VERSION
+            )
+            if not failed_agents:
+                remember_record(record.code_snippet, mode, record.id)
+            logging.info(f"Job {job_id} concluído com sucesso.")
+        except Exception as e:
+            logging.error(f"Job {job_id} falhou: {e}")
+            record = await run_in_threadpool(
+                run_in_session, crud.update_job_record, job_id, models.JobStatus.FAILED.value, error=str(e)
+            )
+
+        if record.webhook_url:
+            await self._notify_webhook(record)
+
+    async def _notify_webhook(self, record):
+        try:
+            response = await self._client.post(
+                record.webhook_url,
+                content=build_job_response(record).model_dump_json(),
+                headers={"Content-Type": "application/json"},
+                timeout=config.JOB_WEBHOOK_TIMEOUT
+            )
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logging.warning(f"Falha ao notificar o webhook do job {record.id}: {e}")
+
+
+job_runner = JobRunner(workers=config.JOB_WORKERS, queue_size=config.JOB_QUEUE_MAX_SIZE)
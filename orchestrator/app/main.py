@@ -1,65 +1,149 @@
-import logging
+import asyncio
+import binascii
+import importlib
 import json
+import logging
+import tarfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from http import HTTPStatus
 
-from fastapi import FastAPI, Depends, HTTPException
+import httpx
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
+import config
 import crud
 import models
-import schemas
+from agent_client import circuit_states, close_agent_clients
+from cache import result_cache
+from incremental import run_incremental_analysis
 from database import engine, get_db
-from crew import create_orchestration_crew
+from jobs import build_job_response, job_runner
+from limits import RateLimitExceeded, llm_bucket_stats
+from migrations import upgrade_schema
+from metrics import metrics_response, record_error, record_request_metrics
+from tracing import install_log_correlation, trace_request
+from pipeline import (
+    extract_tarball_files,
+    find_stored_result,
+    run_analysis,
+    run_batch_analysis,
+    save_analysis,
+    stream_analysis,
+)
+from warmup import Warmup
+
+
+install_log_correlation()
+# force=True: no modo em processo os agentes são carregados (e registram logs) antes desta linha.
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - [trace_id=%(trace_id)s] %(message)s', force=True)
 
+upgrade_schema(engine)
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Etapas executadas uma única vez: o import do crewai domina o tempo de inicialização,
+# seguido da criação do LLM do coordenador e das equipes de orquestração pré-montadas.
+warmup = Warmup([
+    ("crewai", lambda: importlib.import_module("crewai")),
+    ("llm", lambda: config.llm_for_review),
+    ("orchestration_crews", lambda: importlib.import_module("crew").orchestration_crews.warm()),
+])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Inicia o aquecimento em segundo plano, cria o cliente HTTP usado nas notificações de webhook,
+    inicia os workers de jobs e, ao finalizar a aplicação, encerra ambos junto com os pools
+    de conexão dos agentes.
+    """
+    await warmup.start_in_background()
+    app.state.http_client = httpx.AsyncClient(timeout=config.JOB_WEBHOOK_TIMEOUT)
+    await job_runner.start(app.state.http_client)
+    yield
+    await job_runner.stop()
+    await app.state.http_client.aclose()
+    await close_agent_clients()
 
-schemas.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Code Analysis Orchestrator",
     description="Orquestra a análise de código Python chamando agentes especializados (Segurança, Performance, Estilo de Código), consolida os resultados e os armazena.",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
+app.middleware("http")(record_request_metrics)
+app.middleware("http")(trace_request)
+warmup.mark_app_loaded()
+
 
 @app.post("/orchestrate-analysis", response_model=models.ConsolidatedResponse)
-async def orchestrate_analysis(payload: models.CodeInput, db: Session = Depends(get_db)):
+async def orchestrate_analysis(
+    payload: models.IncrementalOrchestrationInput,
+    response: Response,
+    db: Session = Depends(get_db)
+):
     """
     Orquestra a análise de código:
     1. Recebe um trecho de código.
-    2. Envia o código para todos os agentes especializados em paralelo.
+    2. Envia o código para todos os agentes especializados (via crew ou em paralelo, conforme o 'mode').
+       Com 'base_analysis_id', envia apenas as funções/classes alteradas em relação àquela análise.
     3. Coleta, consolida e retorna as sugestões.
-    4. Salva o resultado no banco de dados.
+    4. Salva o resultado no banco de dados e devolve o id do registro no cabeçalho X-Analysis-Id.
     """
-    logging.info("Iniciando orquestração da análise de código.")
-    try:
-        logging.info("Iniciando a orquestração da análise de código...")
+    logging.info(f"Iniciando orquestração da análise de código (modo: {payload.mode.value}).")
+    started = time.perf_counter()
 
-        orchestration_crew = create_orchestration_crew(payload.code)
-        result_string = orchestration_crew.kickoff()
-
-        logging.info("Orquestração concluída. Processando o resultado...")
+    base_record = None
+    if payload.base_analysis_id is not None:
+        base_record = await run_in_threadpool(crud.get_analysis_record, db, payload.base_analysis_id)
+        if base_record is None or base_record.status != models.JobStatus.COMPLETED.value:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail=f"Análise base {payload.base_analysis_id} não encontrada ou não concluída."
+            )
 
-        try:
-            result_data = json.loads(result_string.tasks_output[-1].raw)
+    try:
+        if not payload.force_refresh:
+            stored_result = await run_in_threadpool(find_stored_result, db, payload.code, payload.mode)
+            if stored_result is not None:
+                stored_response, analysis_id = stored_result
+                if analysis_id is not None:
+                    response.headers["X-Analysis-Id"] = str(analysis_id)
+                warmup.record_request(time.perf_counter() - started)
+                return stored_response
 
-            final_response = models.ConsolidatedResponse(**result_data)
-        except (json.JSONDecodeError, TypeError) as e:
-            print(f"Erro ao processar a resposta da IA: {e}\nResposta recebida: {result_string}")
-            raise HTTPException(
-                status_code=500,
-                detail="A resposta final da equipe de IA não é um JSON válido."
+        units = None
+        if base_record is not None:
+            final_response, failed_agents, units = await run_incremental_analysis(
+                base_record, payload.code, payload.mode
             )
+        else:
+            final_response, failed_agents = await run_analysis(payload.code, payload.mode)
 
         logging.debug("Salvando o resultado no banco de dados...")
-        crud.create_analysis_record(
-            db=db,
-            code_snippet=payload.code,
-            suggestions=final_response.model_dump()
+        record = await run_in_threadpool(
+            save_analysis, db, payload.code, final_response, failed_agents, payload.mode,
+            units, payload.base_analysis_id
         )
         logging.info("Análise salva com sucesso.")
+        response.headers["X-Analysis-Id"] = str(record.id)
+        warmup.record_request(time.perf_counter() - started)
         return final_response
 
+    except RateLimitExceeded as e:
+        record_error(e)
+        logging.warning(str(e))
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except Exception as e:
+        record_error(e)
         logging.error(f"Ocorreu um erro crítico durante a orquestração: {e}")
         raise HTTPException(
             status_code=500,
@@ -67,7 +151,148 @@ async def orchestrate_analysis(payload: models.CodeInput, db: Session = Depends(
         )
 
 
+@app.post("/orchestrate-analysis/stream")
+async def orchestrate_analysis_stream(payload: models.OrchestrationInput, request: Request):
+    """
+    Variante em streaming do /orchestrate-analysis: envia o AnalysisResponse de cada agente
+    assim que ele responde e, por fim, o ConsolidatedResponse. O resultado é salvo ao final.
+    Usa Server-Sent Events por padrão, ou NDJSON se o cliente aceitar 'application/x-ndjson'.
+    """
+    logging.info(f"Iniciando orquestração em streaming da análise de código (modo: {payload.mode.value}).")
+    use_ndjson = "application/x-ndjson" in request.headers.get("accept", "")
+
+    async def event_stream():
+        async for event, data in stream_analysis(payload.code, payload.mode, payload.force_refresh):
+            if use_ndjson:
+                yield json.dumps({"event": event, "data": data}) + "\n"
+            else:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson" if use_ndjson else "text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/orchestrate-analysis/batch", response_model=models.BatchConsolidatedResponse)
+async def orchestrate_analysis_batch(
+    payload: models.BatchOrchestrationInput,
+    db: Session = Depends(get_db)
+):
+    """
+    Analisa vários arquivos (ou um tarball) de uma vez: cada agente executa sua ferramenta
+    uma única vez sobre o lote e agrupa vários arquivos por chamada ao LLM.
+    """
+    files = list(payload.files)
+    if payload.tarball:
+        try:
+            files.extend(extract_tarball_files(payload.tarball))
+        except (binascii.Error, tarfile.TarError) as e:
+            raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail=f"Tarball inválido: {e}")
+
+    if not files:
+        raise HTTPException(status_code=HTTPStatus.UNPROCESSABLE_ENTITY, detail="Nenhum arquivo Python foi enviado para análise.")
+    if len(files) > config.BATCH_MAX_FILES:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=f"O lote excede o limite de {config.BATCH_MAX_FILES} arquivos."
+        )
+    # Os agentes e o orquestrador identificam cada arquivo do lote pelo caminho.
+    duplicated_paths = sorted(path for path, count in Counter(file.path for file in files).items() if count > 1)
+    if duplicated_paths:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=f"Caminhos repetidos no lote: {', '.join(duplicated_paths)}."
+        )
+
+    logging.info(f"Iniciando orquestração da análise em lote de {len(files)} arquivos.")
+    try:
+        return await run_batch_analysis(db, files, payload.force_refresh)
+    except Exception as e:
+        record_error(e)
+        logging.error(f"Ocorreu um erro crítico durante a orquestração em lote: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ocorreu um erro interno inesperado no orquestrador: {str(e)}"
+        )
+
+
+@app.post("/jobs", response_model=models.JobResponse, status_code=HTTPStatus.ACCEPTED)
+async def submit_job(payload: models.JobInput, db: Session = Depends(get_db)):
+    """
+    Submete uma análise para execução em segundo plano e retorna imediatamente o id do job.
+    O resultado pode ser consultado em GET /jobs/{job_id} ou recebido via webhook.
+    """
+    if job_runner.is_full():
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="A fila de jobs está cheia. Tente novamente em instantes."
+        )
+
+    record = await run_in_threadpool(
+        crud.create_job_record,
+        db=db,
+        code_snippet=payload.code,
+        mode=payload.mode.value,
+        webhook_url=payload.webhook_url,
+        force_refresh=payload.force_refresh
+    )
+    try:
+        job_runner.submit(record.id, force_refresh=payload.force_refresh)
+    except asyncio.QueueFull:
+        await run_in_threadpool(
+            crud.update_job_record, db, record.id, models.JobStatus.FAILED.value, error="Fila de jobs cheia."
+        )
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail="A fila de jobs está cheia. Tente novamente em instantes."
+        )
+    logging.info(f"Job {record.id} enfileirado (fila: {job_runner.queue_depth()}).")
+    return build_job_response(record)
+
+
+@app.get("/jobs/{job_id}", response_model=models.JobResponse)
+async def get_job(job_id: int, db: Session = Depends(get_db)):
+    """Retorna o status de um job e, quando concluído, o relatório consolidado."""
+    record = await run_in_threadpool(crud.get_analysis_record, db, job_id)
+    if record is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=f"Job {job_id} não encontrado.")
+    return build_job_response(record)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Retorna os contadores de acertos e falhas do cache de resultados."""
+    return result_cache.stats()
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Expõe as métricas do serviço no formato do Prometheus."""
+    return metrics_response()
+
+
+@app.get("/limits/stats")
+def limits_stats():
+    """Retorna o estado do token bucket das chamadas ao LLM do coordenador."""
+    return {"llm": llm_bucket_stats()}
+
+
+@app.get("/ready")
+def readiness_check():
+    """
+    Endpoint de prontidão: responde 503 enquanto o aquecimento (crewai, LLM do coordenador
+    e equipes de orquestração) não termina. Inclui o perfil de inicialização e a latência
+    da primeira requisição.
+    """
+    profile = warmup.profile()
+    if not profile["ready"]:
+        return JSONResponse(status_code=HTTPStatus.SERVICE_UNAVAILABLE, content={"status": "warming", **profile})
+    return {"status": "ready", **profile}
+
+
 @app.get("/health")
 def health_check():
-    """Endpoint de verificação de saúde para o orquestrador."""
-    return {"status": "ok"}
+    """Endpoint de verificação de saúde para o orquestrador, com o estado do circuit breaker de cada agente."""
+    return {"status": "ok", "agents": circuit_states()}
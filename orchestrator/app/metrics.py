@@ -0,0 +1,195 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+from fastapi import Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY as PROCESS_REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+
+import config
+from tracing import set_span_attributes, span
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000)
+
+
+# Registro próprio do serviço. No modo em processo cada agente carrega sua própria cópia deste
+# módulo, e o orquestrador inclui os registros deles no seu /metrics (include_registry).
+REGISTRY = CollectorRegistry()
+_included_registries: list[CollectorRegistry] = []
+
+
+def _metric(metric_class, name: str, documentation: str, labelnames: list[str], **kwargs):
+    """
+    Cria a métrica no registro do serviço, com o nome prefixado por METRICS_PREFIX, para que as
+    métricas dos agentes carregados em processo não colidam com as do orquestrador.
+    """
+    return metric_class(f"{config.METRICS_PREFIX}_{name}", documentation, labelnames, registry=REGISTRY, **kwargs)
+
+
+def include_registry(registry: CollectorRegistry):
+    """
+    Expõe no /metrics deste serviço as métricas de outro registro (o de um agente carregado em processo).
+    """
+    _included_registries.append(registry)
+
+
+REQUEST_LATENCY = _metric(
+    Histogram, "http_request_duration_seconds", "Latência das requisições HTTP.",
+    ["service", "method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+STAGE_LATENCY = _metric(
+    Histogram, "pipeline_stage_duration_seconds", "Duração de cada etapa do pipeline de análise.",
+    ["service", "stage"], buckets=LATENCY_BUCKETS
+)
+TOOL_LATENCY = _metric(
+    Histogram, "tool_duration_seconds", "Tempo de execução das ferramentas de análise (bandit, flake8, cProfile).",
+    ["service", "tool"], buckets=LATENCY_BUCKETS
+)
+LLM_LATENCY = _metric(
+    Histogram, "llm_request_duration_seconds", "Latência das chamadas ao LLM.",
+    ["service", "model"], buckets=LATENCY_BUCKETS
+)
+LLM_TOKENS = _metric(
+    Histogram, "llm_tokens", "Tokens por chamada ao LLM, separados em prompt e completion.",
+    ["service", "model", "kind"], buckets=TOKEN_BUCKETS
+)
+CACHE_LOOKUPS = _metric(
+    Counter, "cache_lookups_total", "Consultas ao cache de resultados por resultado (memory_hit, shared_hit, miss).",
+    ["service", "result"]
+)
+DB_LATENCY = _metric(
+    Histogram, "db_operation_duration_seconds", "Latência das operações no banco de dados.",
+    ["service", "operation"], buckets=LATENCY_BUCKETS
+)
+ERRORS = _metric(
+    Counter, "errors_total", "Erros por tipo de exceção.",
+    ["service", "type"]
+)
+ROUTING_DECISIONS = _metric(
+    Counter, "llm_routing_decisions_total", "Decisões do roteamento entre o modelo rápido e o principal.",
+    ["service", "task", "model", "outcome"]
+)
+STRUCTURED_OUTPUT_REPAIRS = _metric(
+    Counter, "llm_output_repairs_total", "Respostas do LLM corrigidas (repaired) ou descartadas (failed) após falhar na validação.",
+    ["service", "schema", "outcome"]
+)
+
+
+_request_timings: ContextVar[dict[str, float] | None] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str, histogram: Histogram | None = None, **labels):
+    """
+    Mede a duração de uma etapa, registrando-a no histograma informado (ou no de etapas do pipeline)
+    e nos tempos da requisição corrente, devolvidos no cabeçalho Server-Timing. A etapa também
+    vira um span do trace, com os rótulos como atributos. Também pode ser usado como decorador.
+    """
+    started = time.perf_counter()
+    try:
+        with span(stage, **labels):
+            yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if histogram is None:
+            STAGE_LATENCY.labels(service=config.SERVICE_NAME, stage=stage).observe(elapsed)
+        else:
+            histogram.labels(service=config.SERVICE_NAME, **labels).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def record_error(error: BaseException):
+    ERRORS.labels(service=config.SERVICE_NAME, type=type(error).__name__).inc()
+
+
+def record_cache_lookup(result: str):
+    CACHE_LOOKUPS.labels(service=config.SERVICE_NAME, result=result).inc()
+
+
+class _UsageRecorder:
+    """
+    Callback no formato esperado pelo crewai (log_success_event) que guarda o uso de tokens da chamada.
+    """
+
+    def __init__(self):
+        self.usage = None
+
+    def log_success_event(self, kwargs, response_obj, start_time, end_time):
+        self.usage = response_obj.get("usage")
+
+
+def _usage_value(usage, field: str) -> int | None:
+    value = usage.get(field) if isinstance(usage, dict) else getattr(usage, field, None)
+    return value if isinstance(value, int) else None
+
+
+def instrumented_llm_call(call: Callable, model: str) -> Callable:
+    """
+    Envolve o método 'call' de um LLM para medir a latência e os tokens de prompt/completion de cada chamada.
+    """
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        recorder = _UsageRecorder()
+        if len(args) < 3:
+            kwargs["callbacks"] = [*(kwargs.get("callbacks") or []), recorder]
+        with timed("llm", LLM_LATENCY, model=model):
+            try:
+                return call(*args, **kwargs)
+            finally:
+                if recorder.usage is not None:
+                    for kind in ("prompt", "completion"):
+                        tokens = _usage_value(recorder.usage, f"{kind}_tokens")
+                        if tokens is not None:
+                            LLM_TOKENS.labels(service=config.SERVICE_NAME, model=model, kind=kind).observe(tokens)
+                            set_span_attributes(**{f"llm.{kind}_tokens": tokens})
+    return wrapper
+
+
+def _format_server_timing(timings: dict[str, float]) -> str:
+    return ", ".join(
+        f"{name.replace(' ', '_')};dur={seconds * 1000:.1f}" for name, seconds in timings.items()
+    )
+
+
+async def record_request_metrics(request: Request, call_next) -> Response:
+    """
+    Middleware HTTP: mede a latência de cada requisição, conta exceções não tratadas e devolve
+    os tempos das etapas da requisição no cabeçalho Server-Timing (em milissegundos).
+    """
+    timings: dict[str, float] = {}
+    token = _request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    except Exception as e:
+        record_error(e)
+        raise
+    finally:
+        _request_timings.reset(token)
+
+    elapsed = time.perf_counter() - started
+    route = request.scope.get("route")
+    REQUEST_LATENCY.labels(
+        service=config.SERVICE_NAME,
+        method=request.method,
+        route=route.path if route is not None else "unmatched",
+        status=response.status_code,
+    ).observe(elapsed)
+    timings["total"] = elapsed
+    response.headers["Server-Timing"] = _format_server_timing(timings)
+    return response
+
+
+def metrics_response() -> Response:
+    """
+    Métricas do processo (CPU, memória, GC), as do serviço e as dos registros incluídos.
+    """
+    content = b"".join(
+        generate_latest(registry) for registry in (PROCESS_REGISTRY, REGISTRY, *_included_registries)
+    )
+    return Response(content=content, media_type=CONTENT_TYPE_LATEST)
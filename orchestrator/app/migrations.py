@@ -0,0 +1,51 @@
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import Column, CreateColumn, SetColumnComment
+
+import schemas
+
+
+# Índices de versões anteriores, substituídos por índices do modelo.
+OBSOLETE_INDEXES = ("idx_analysis_history_hash_lookup",)
+
+
+def add_column_ddl(connection: Connection, table_name: str, column: Column) -> str:
+    # No PostgreSQL o IF NOT EXISTS evita erro quando duas réplicas migram o banco ao mesmo tempo.
+    if_not_exists = " IF NOT EXISTS" if connection.dialect.name == "postgresql" else ""
+    column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+    return f"ALTER TABLE {table_name} ADD COLUMN{if_not_exists} {column_ddl}"
+
+
+def upgrade_schema(engine: Engine):
+    """
+    Cria as tabelas que faltam e adiciona às existentes as colunas e os índices do modelo (schemas.py)
+    que ainda não existem. O modelo é a única definição das colunas: bancos criados por uma versão
+    anterior (pelo database/init.sql, que só roda em um volume vazio, ou pelo create_all, que nunca
+    altera uma tabela existente) são atualizados na inicialização do orquestrador.
+    Todas as operações são idempotentes.
+    """
+    schemas.Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        inspector = inspect(connection)
+        for table in schemas.Base.metadata.sorted_tables:
+            existing_columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                existing_column = existing_columns.get(column.name)
+                if existing_column is None:
+                    logging.info(f"Migração: adicionando a coluna {table.name}.{column.name}.")
+                    connection.execute(text(add_column_ddl(connection, table.name, column)))
+                    if column.comment and connection.dialect.supports_comments:
+                        connection.execute(SetColumnComment(column))
+                elif column.nullable and not existing_column["nullable"] and connection.dialect.name == "postgresql":
+                    logging.info(f"Migração: removendo o NOT NULL de {table.name}.{column.name}.")
+                    connection.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} DROP NOT NULL"))
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index_name in OBSOLETE_INDEXES:
+                if index_name in existing_indexes:
+                    logging.info(f"Migração: removendo o índice {index_name}.")
+                    connection.execute(text(f"DROP INDEX IF EXISTS {index_name}"))
+            for index in table.indexes:
+                index.create(bind=connection, checkfirst=True)
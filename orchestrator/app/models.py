@@ -1,3 +1,7 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -5,6 +9,29 @@ class CodeInput(BaseModel):
     """Modelo de entrada para a requisição de análise."""
     code: str
 
+class OrchestrationMode(str, Enum):
+    """Estratégias disponíveis para acionar os agentes especialistas."""
+    CREW = "crew"
+    FANOUT = "fanout"
+
+class OrchestrationInput(CodeInput):
+    """Modelo de entrada do orquestrador, permitindo escolher o modo de orquestração por requisição."""
+    mode: OrchestrationMode = Field(
+        default=OrchestrationMode.CREW,
+        description="'crew' delega via agente coordenador (LLM); 'fanout' chama os três agentes em paralelo diretamente."
+    )
+    force_refresh: bool = Field(
+        default=False,
+        description="Ignora os resultados em cache e no histórico, forçando uma nova análise."
+    )
+
+class IncrementalOrchestrationInput(OrchestrationInput):
+    """Modelo de entrada do /orchestrate-analysis, que aceita uma análise anterior como base do modo incremental."""
+    base_analysis_id: Optional[int] = Field(
+        default=None,
+        description="Id de um registro de analysis_history; apenas as funções/classes alteradas em relação a ele são reanalisadas."
+    )
+
 class EnrichedSuggestion(BaseModel):
     """Modelo para uma única sugestão enriquecida pela IA."""
     title: str = Field(..., description="Um título curto e descritivo para a vulnerabilidade encontrada.")
@@ -23,3 +50,49 @@ class ConsolidatedResponse(BaseModel):
     security: AnalysisResponse
     performance: AnalysisResponse
     codestyle: AnalysisResponse
+
+class FileInput(BaseModel):
+    """Modelo para um arquivo de uma análise em lote."""
+    path: str
+    code: str
+
+class BatchOrchestrationInput(BaseModel):
+    """
+    Modelo de entrada para a análise em lote. Os arquivos podem ser enviados diretamente em 'files'
+    ou como um tarball (.tar ou .tar.gz) codificado em base64 em 'tarball'.
+    """
+    files: list[FileInput] = Field(default_factory=list)
+    tarball: Optional[str] = Field(default=None, description="Tarball codificado em base64; apenas arquivos .py são analisados.")
+    force_refresh: bool = False
+
+class FileConsolidatedResponse(BaseModel):
+    """Modelo com o relatório consolidado de um arquivo da análise em lote."""
+    path: str
+    report: ConsolidatedResponse
+
+class BatchConsolidatedResponse(BaseModel):
+    """Modelo da resposta da análise em lote, com um relatório consolidado por arquivo."""
+    results: list[FileConsolidatedResponse]
+
+class JobStatus(str, Enum):
+    """Estados possíveis de um job de orquestração."""
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class JobInput(OrchestrationInput):
+    """Modelo de entrada para a submissão assíncrona de uma análise."""
+    webhook_url: Optional[str] = Field(
+        default=None,
+        description="URL opcional que receberá um POST com o resultado quando o job terminar."
+    )
+
+class JobResponse(BaseModel):
+    """Modelo de status de um job de orquestração, com o resultado quando concluído."""
+    job_id: int
+    status: JobStatus
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    result: Optional[ConsolidatedResponse] = None
+    error: Optional[str] = None
@@ -0,0 +1,435 @@
+import asyncio
+import base64
+import io
+import logging
+import tarfile
+from typing import AsyncIterator
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+import config
+import crud
+import models
+from cache import code_sha256, make_cache_key, result_cache
+from chunking import plan_chunks, remap_report
+from consolidation import (
+    AGENT_KEYS,
+    PER_UNIT_AGENT_KEYS,
+    WHOLE_FILE_AGENT_KEYS,
+    consolidate_reports,
+    find_failed_agents,
+    merge_reports,
+    parse_agent_report,
+    parse_agent_reports,
+)
+from database import run_in_session
+from fanout import fan_out_analysis, fan_out_batch_analysis, iter_fan_out_analysis
+from metrics import DB_LATENCY, timed
+
+
+def orchestration_cache_key(code: str, mode: models.OrchestrationMode) -> str:
+    """
+    Chave do resultado consolidado no cache. O modo faz parte da chave para que os resultados
+    do crew e do fan-out não sejam servidos um no lugar do outro.
+    """
+    return make_cache_key(code, f"orchestrator:{mode.value}")
+
+
+def _record_cache_key(code: str, mode: models.OrchestrationMode) -> str:
+    return make_cache_key(code, f"orchestrator:{mode.value}:record")
+
+
+def remember_record(code: str, mode: models.OrchestrationMode, analysis_id: int):
+    """
+    Guarda no cache o id do registro do histórico com o resultado do código, devolvido no
+    cabeçalho X-Analysis-Id quando o resultado é servido pelo cache.
+    """
+    result_cache.set(_record_cache_key(code, mode), {"analysis_id": analysis_id})
+
+
+def find_stored_result(
+    db: Session,
+    code: str,
+    mode: models.OrchestrationMode
+) -> tuple[models.ConsolidatedResponse, int | None] | None:
+    """
+    Procura um resultado já calculado para o código no mesmo modo, primeiro no cache e depois no histórico do banco.
+    Retorna o resultado e o id do registro do histórico correspondente (None se o resultado em cache
+    ainda não tiver um registro salvo), ou None se não houver resultado.
+    """
+    cache_key = orchestration_cache_key(code, mode)
+    cached_response = result_cache.get(cache_key)
+    if cached_response is not None:
+        logging.info("Resultado encontrado no cache. Retornando sem acionar os agentes.")
+        cached_record = result_cache.get(_record_cache_key(code, mode))
+        return models.ConsolidatedResponse(**cached_response), cached_record and cached_record["analysis_id"]
+
+    with timed("db_read", DB_LATENCY, operation="get_latest_analysis_by_hash"):
+        history_record = crud.get_latest_analysis_by_hash(
+            db,
+            code_sha256=code_sha256(code),
+            model_version=config.MODEL_VERSION,
+            mode=mode.value,
+            max_age_seconds=config.HISTORY_FRESHNESS_SECONDS
+        )
+    if history_record is not None:
+        logging.info(f"Resultado encontrado no histórico (registro {history_record.id}). Retornando sem acionar os agentes.")
+        result_cache.set(cache_key, history_record.suggestions)
+        remember_record(code, mode, history_record.id)
+        return models.ConsolidatedResponse(**history_record.suggestions), history_record.id
+
+    return None
+
+
+def _collect_reports_with_crew(
+    code: str,
+    on_task_output=None,
+    agent_keys: tuple[str, ...] = AGENT_KEYS
+) -> dict[str, str]:
+    """
+    Modo 'crew': o agente coordenador delega sequencialmente para cada especialista de 'agent_keys'.
+    A saída de cada tarefa é validada (e, se preciso, corrigida) ao fim da tarefa.
+    O módulo 'crew' (e com ele o crewai) é importado apenas aqui ou no aquecimento do serviço.
+    """
+    from crew import orchestration_crews_by_agents
+
+    orchestration_crews = orchestration_crews_by_agents[frozenset(agent_keys)]
+
+    reports = {}
+
+    def collect(agent_key: str, raw: str):
+        reports[agent_key] = raw
+        if on_task_output is not None:
+            on_task_output(agent_key, raw)
+
+    with orchestration_crews.checkout(collect) as orchestration_crew, timed("crew"):
+        orchestration_crew.kickoff(inputs={"code": code})
+    return reports
+
+
+async def _iter_crew_reports(code: str) -> AsyncIterator[tuple[str, str]]:
+    """
+    Executa o crew em uma thread e produz a saída de cada tarefa assim que ela termina.
+    """
+    loop = asyncio.get_running_loop()
+    outputs: asyncio.Queue = asyncio.Queue()
+
+    def on_task_output(agent_key: str, raw: str):
+        loop.call_soon_threadsafe(outputs.put_nowait, (agent_key, raw))
+
+    kickoff = asyncio.ensure_future(run_in_threadpool(_collect_reports_with_crew, code, on_task_output))
+    emitted = set()
+    while not kickoff.done() or not outputs.empty():
+        next_output = asyncio.ensure_future(outputs.get())
+        await asyncio.wait({next_output, kickoff}, return_when=asyncio.FIRST_COMPLETED)
+        if not next_output.done():
+            next_output.cancel()
+            continue
+        agent_key, raw = next_output.result()
+        emitted.add(agent_key)
+        yield agent_key, raw
+
+    for agent_key, raw in kickoff.result().items():
+        if agent_key not in emitted:
+            yield agent_key, raw
+
+
+def _cache_result(
+    code: str,
+    mode: models.OrchestrationMode,
+    final_response: models.ConsolidatedResponse,
+    failed_agents: list[str]
+):
+    if failed_agents:
+        logging.warning(f"Resultado não armazenado em cache devido a falhas nos agentes: {failed_agents}")
+    else:
+        result_cache.set(orchestration_cache_key(code, mode), final_response.model_dump())
+
+
+def _finish_analysis(
+    code: str,
+    mode: models.OrchestrationMode,
+    agent_reports: dict[str, str]
+) -> tuple[models.ConsolidatedResponse, list[str]]:
+    logging.info("Orquestração concluída. Consolidando o resultado...")
+    with timed("consolidation"):
+        final_response = consolidate_reports(agent_reports)
+
+    failed_agents = find_failed_agents(agent_reports)
+    _cache_result(code, mode, final_response, failed_agents)
+    return final_response, failed_agents
+
+
+async def _collect_reports(
+    code: str,
+    mode: models.OrchestrationMode,
+    agent_keys: tuple[str, ...] = AGENT_KEYS
+) -> dict[str, str]:
+    """
+    Aciona os agentes de 'agent_keys' conforme o modo escolhido. O crew bloqueante é executado
+    em uma thread para não travar o event loop.
+    """
+    if mode == models.OrchestrationMode.FANOUT:
+        # Modo 'fanout': chama os agentes em paralelo, sem nenhuma chamada ao LLM no orquestrador.
+        return await fan_out_analysis(code, agent_keys)
+    return await run_in_threadpool(_collect_reports_with_crew, code, None, agent_keys)
+
+
+async def analyze_with_agents(
+    code: str,
+    mode: models.OrchestrationMode,
+    agent_keys: tuple[str, ...]
+) -> tuple[dict, list[str]]:
+    """
+    Aciona apenas os agentes de 'agent_keys' e retorna o relatório parcial desses agentes
+    (ver parse_agent_reports) e os que falharam.
+    """
+    agent_reports = await _collect_reports(code, mode, agent_keys)
+    return parse_agent_reports(agent_reports, agent_keys), find_failed_agents(agent_reports, agent_keys)
+
+
+async def _run_chunked_analysis(
+    code: str,
+    chunks: list[dict],
+    mode: models.OrchestrationMode
+) -> tuple[models.ConsolidatedResponse, list[str]]:
+    """
+    Analisa os blocos de um código grande em paralelo (até CHUNK_MAX_CONCURRENCY por vez) nos agentes
+    de segurança e de estilo, converte as linhas citadas nas sugestões para as linhas do arquivo
+    original e junta os relatórios. O agente de performance recebe o arquivo inteiro uma única vez,
+    em paralelo aos blocos: nos blocos, as funções dos outros blocos são apenas stubs.
+    """
+    semaphore = asyncio.Semaphore(config.CHUNK_MAX_CONCURRENCY)
+
+    async def analyze_chunk(chunk: dict) -> tuple[dict, list[str]]:
+        async with semaphore:
+            report, failed_agents = await analyze_with_agents(chunk["code"], mode, PER_UNIT_AGENT_KEYS)
+        return remap_report(report, chunk["line_map"]), failed_agents
+
+    results = await asyncio.gather(
+        analyze_with_agents(code, mode, WHOLE_FILE_AGENT_KEYS),
+        *(analyze_chunk(chunk) for chunk in chunks)
+    )
+    with timed("consolidation"):
+        final_response = merge_reports([report for report, _ in results])
+    failed_agents = sorted({agent_key for _, chunk_failed_agents in results for agent_key in chunk_failed_agents})
+    return final_response, failed_agents
+
+
+async def run_analysis(
+    code: str,
+    mode: models.OrchestrationMode
+) -> tuple[models.ConsolidatedResponse, list[str]]:
+    """
+    Aciona os agentes conforme o modo escolhido e consolida o resultado.
+    Códigos com mais de CHUNK_MAX_LINES linhas são divididos em blocos analisados em paralelo
+    (ver _run_chunked_analysis). Retorna a resposta consolidada e a lista de agentes que falharam.
+    """
+    chunks = plan_chunks(code, config.CHUNK_MAX_LINES)
+    if chunks is not None:
+        logging.info(f"Código dividido em {len(chunks)} blocos para a análise.")
+        final_response, failed_agents = await _run_chunked_analysis(code, chunks, mode)
+        _cache_result(code, mode, final_response, failed_agents)
+        return final_response, failed_agents
+
+    agent_reports = await _collect_reports(code, mode)
+    return _finish_analysis(code, mode, agent_reports)
+
+
+def save_analysis(
+    db: Session,
+    code: str,
+    final_response: models.ConsolidatedResponse,
+    failed_agents: list[str],
+    mode: models.OrchestrationMode,
+    units: dict | None = None,
+    base_analysis_id: int | None = None
+):
+    """
+    Salva o resultado no histórico. Registros com falhas em algum agente ficam sem hash
+    para não serem reaproveitados.
+    """
+    with timed("db_write", DB_LATENCY, operation="create_analysis_record"):
+        record = crud.create_analysis_record(
+            db=db,
+            code_snippet=code,
+            suggestions=final_response.model_dump(),
+            code_sha256=None if failed_agents else code_sha256(code),
+            model_version=config.MODEL_VERSION,
+            mode=mode.value,
+            units=units,
+            base_analysis_id=base_analysis_id
+        )
+    if not failed_agents:
+        remember_record(code, mode, record.id)
+    return record
+
+
+# Referências às tarefas de streaming em andamento, para que não sejam coletadas pelo GC
+# caso o cliente se desconecte antes do fim.
+_streaming_tasks: set[asyncio.Task] = set()
+
+
+def _put_agent_events(events: asyncio.Queue, response: models.ConsolidatedResponse):
+    for agent_key in AGENT_KEYS:
+        report = getattr(response, agent_key)
+        events.put_nowait(("agent", {"agent": agent_key, "report": report.model_dump()}))
+
+
+async def _produce_stream_events(
+    code: str,
+    mode: models.OrchestrationMode,
+    force_refresh: bool,
+    events: asyncio.Queue
+):
+    try:
+        stored_result = None
+        if not force_refresh:
+            stored_result = await run_in_threadpool(run_in_session, find_stored_result, code, mode)
+
+        if stored_result is not None:
+            stored_response, _ = stored_result
+            _put_agent_events(events, stored_response)
+            events.put_nowait(("result", stored_response.model_dump()))
+            return
+
+        chunks = plan_chunks(code, config.CHUNK_MAX_LINES)
+        if chunks is not None:
+            # Arquivos grandes seguem a mesma divisão em blocos do /orchestrate-analysis; o relatório
+            # de cada agente só fica completo depois de todos os blocos, então os eventos 'agent'
+            # são enviados juntos ao final.
+            logging.info(f"Código dividido em {len(chunks)} blocos para a análise em streaming.")
+            final_response, failed_agents = await _run_chunked_analysis(code, chunks, mode)
+            _cache_result(code, mode, final_response, failed_agents)
+            _put_agent_events(events, final_response)
+        else:
+            if mode == models.OrchestrationMode.FANOUT:
+                agent_iterator = iter_fan_out_analysis(code)
+            else:
+                agent_iterator = _iter_crew_reports(code)
+
+            agent_reports = {}
+            async for agent_key, raw in agent_iterator:
+                agent_reports[agent_key] = raw
+                report = parse_agent_report(agent_key, raw)
+                events.put_nowait(("agent", {"agent": agent_key, "report": report.model_dump()}))
+
+            final_response, failed_agents = _finish_analysis(code, mode, agent_reports)
+        events.put_nowait(("result", final_response.model_dump()))
+
+        logging.debug("Salvando o resultado no banco de dados...")
+        await run_in_threadpool(run_in_session, save_analysis, code, final_response, failed_agents, mode)
+        logging.info("Análise salva com sucesso.")
+    except Exception as e:
+        logging.error(f"Ocorreu um erro crítico durante a orquestração em streaming: {e}")
+        events.put_nowait(("error", {"detail": f"Ocorreu um erro interno inesperado no orquestrador: {str(e)}"}))
+    finally:
+        events.put_nowait(None)
+
+
+async def stream_analysis(
+    code: str,
+    mode: models.OrchestrationMode,
+    force_refresh: bool
+) -> AsyncIterator[tuple[str, dict]]:
+    """
+    Produz os eventos da análise em streaming: um evento 'agent' com o AnalysisResponse de cada agente
+    assim que ele responde (ou, para códigos divididos em blocos, ao fim de todos os blocos), seguido do
+    evento 'result' com o ConsolidatedResponse (ou 'error').
+    A análise roda em uma tarefa própria, de modo que o resultado é salvo mesmo se o cliente se desconectar.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(_produce_stream_events(code, mode, force_refresh, events))
+    _streaming_tasks.add(task)
+    task.add_done_callback(_streaming_tasks.discard)
+
+    while (event := await events.get()) is not None:
+        yield event
+
+
+def extract_tarball_files(tarball_b64: str) -> list[models.FileInput]:
+    """
+    Extrai em memória os arquivos .py de um tarball codificado em base64,
+    respeitando os limites de quantidade e tamanho configurados.
+    """
+    files = []
+    archive_bytes = base64.b64decode(tarball_b64, validate=True)
+    with tarfile.open(fileobj=io.BytesIO(archive_bytes), mode="r:*") as archive:
+        for member in archive:
+            if not member.isfile() or not member.name.endswith(".py"):
+                continue
+            if member.size > config.BATCH_MAX_FILE_BYTES:
+                logging.warning(f"Arquivo ignorado por exceder o tamanho máximo: {member.name}")
+                continue
+            content = archive.extractfile(member).read().decode("utf-8", errors="replace")
+            files.append(models.FileInput(path=member.name, code=content))
+            if len(files) >= config.BATCH_MAX_FILES:
+                break
+    return files
+
+
+async def run_batch_analysis(
+    db: Session,
+    files: list[models.FileInput],
+    force_refresh: bool
+) -> models.BatchConsolidatedResponse:
+    """
+    Analisa um lote de arquivos: reaproveita resultados em cache/histórico, envia apenas os arquivos
+    restantes para o /analyze/batch de cada agente em paralelo e salva todos os registros com um único insert.
+    Os caminhos dos arquivos devem ser únicos no lote: os resultados são indexados por eles.
+    """
+    reports_by_path: dict[str, models.ConsolidatedResponse] = {}
+    hash_by_path = {file.path: code_sha256(file.code) for file in files}
+
+    if not force_refresh:
+        for file in files:
+            cached_response = result_cache.get(orchestration_cache_key(file.code, models.OrchestrationMode.FANOUT))
+            if cached_response is not None:
+                reports_by_path[file.path] = models.ConsolidatedResponse(**cached_response)
+
+        pending_hashes = [hash_by_path[file.path] for file in files if file.path not in reports_by_path]
+        history = await run_in_threadpool(
+            crud.get_latest_analyses_by_hashes,
+            db,
+            pending_hashes,
+            config.MODEL_VERSION,
+            models.OrchestrationMode.FANOUT.value,
+            config.HISTORY_FRESHNESS_SECONDS
+        ) if pending_hashes else {}
+        for file in files:
+            record = history.get(hash_by_path[file.path])
+            if file.path not in reports_by_path and record is not None:
+                reports_by_path[file.path] = models.ConsolidatedResponse(**record.suggestions)
+
+    pending_files = [file for file in files if file.path not in reports_by_path]
+    logging.info(f"Análise em lote: {len(files) - len(pending_files)} arquivos reaproveitados, {len(pending_files)} a analisar.")
+
+    new_records = []
+    if pending_files:
+        agent_reports = await fan_out_batch_analysis(
+            [{"path": file.path, "code": file.code} for file in pending_files]
+        )
+        for file in pending_files:
+            file_reports = {agent_key: reports.get(file.path, "") for agent_key, reports in agent_reports.items()}
+            final_response = consolidate_reports(file_reports)
+            failed_agents = find_failed_agents(file_reports)
+            if not failed_agents:
+                result_cache.set(orchestration_cache_key(file.code, models.OrchestrationMode.FANOUT), final_response.model_dump())
+
+            reports_by_path[file.path] = final_response
+            new_records.append({
+                "code_snippet": file.code,
+                "suggestions": final_response.model_dump(),
+                "code_sha256": None if failed_agents else hash_by_path[file.path],
+                "model_version": config.MODEL_VERSION,
+                "mode": models.OrchestrationMode.FANOUT.value,
+            })
+
+    with timed("db_write", DB_LATENCY, operation="bulk_create_analysis_records"):
+        await run_in_threadpool(crud.bulk_create_analysis_records, db, new_records)
+
+    return models.BatchConsolidatedResponse(results=[
+        models.FileConsolidatedResponse(path=file.path, report=reports_by_path[file.path])
+        for file in files
+    ])
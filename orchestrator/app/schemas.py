@@ -1,11 +1,41 @@
-from sqlalchemy import Column, Integer, String, JSON, DateTime, func
+from sqlalchemy import Boolean, Column, Integer, String, JSON, DateTime, Index, false, func
+from sqlalchemy.dialects.postgresql import JSONB
+
 from database import Base
 
 
+# JSONB no PostgreSQL, como no database/init.sql; JSON nos demais bancos (SQLite nos testes).
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+
+# As colunas são definidas apenas aqui: migrations.upgrade_schema adiciona as que faltarem em bancos existentes.
 class AnalysisHistory(Base):
     __tablename__ = "analysis_history"
 
     id = Column(Integer, primary_key=True, index=True)
     code_snippet = Column(String, nullable=False)
-    suggestions = Column(JSON, nullable=False)
+    code_sha256 = Column(
+        String(64), comment="SHA-256 do código normalizado, usado para servir análises repetidas a partir do histórico."
+    )
+    model_version = Column(String)
+    mode = Column(String)
+    status = Column(
+        String, nullable=False, default="completed", server_default="completed",
+        comment="Status do job de orquestração: pending, running, completed ou failed."
+    )
+    error = Column(String)
+    webhook_url = Column(String)
+    force_refresh = Column(Boolean, nullable=False, default=False, server_default=false())
+    suggestions = Column(JSONDocument)
+    units = Column(
+        JSONDocument,
+        comment="Relatório de cada função/classe, indexado pelo hash da unidade, reaproveitado pelas análises incrementais."
+    )
+    base_analysis_id = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("idx_analysis_history_mode_lookup", "code_sha256", "model_version", "mode", "created_at"),
+        Index("idx_analysis_history_status", "status"),
+    )
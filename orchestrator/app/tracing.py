@@ -0,0 +1,126 @@
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Sequence
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+import config
+
+
+propagator = TraceContextTextMapPropagator()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Grava cada span finalizado como uma linha JSON no arquivo informado,
+    para análise local sem um coletor.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [json.dumps(json.loads(span.to_json()), separators=(",", ":")) for span in spans]
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as trace_file:
+                trace_file.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logging.warning(f"Falha ao gravar spans em {self.path}: {e}")
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+
+def _build_tracer() -> trace.Tracer:
+    """
+    Cria um TracerProvider próprio do serviço (sem registrá-lo como global, pois o crewai
+    registra o seu para telemetria) com o exportador escolhido em TRACING_EXPORTER.
+    """
+    if config.TRACING_EXPORTER == "file":
+        exporter = FileSpanExporter(config.TRACING_FILE_PATH)
+    elif config.TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter(endpoint=config.TRACING_OTLP_ENDPOINT)
+    else:
+        return trace.NoOpTracer()
+
+    provider = TracerProvider(resource=Resource.create({"service.name": config.SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider.get_tracer(config.SERVICE_NAME)
+
+
+tracer = _build_tracer()
+
+
+@contextmanager
+def span(name: str, kind: trace.SpanKind = trace.SpanKind.INTERNAL, context=None, **attributes):
+    """
+    Abre um span filho do span corrente (ou do contexto informado). Exceções são registradas
+    no span antes de serem propagadas.
+    """
+    with tracer.start_as_current_span(name, context=context, kind=kind, attributes=attributes) as current:
+        yield current
+
+
+def set_span_attributes(**attributes):
+    trace.get_current_span().set_attributes(attributes)
+
+
+def inject_trace_headers(headers: dict | None = None) -> dict:
+    """
+    Retorna os cabeçalhos HTTP (traceparent) que propagam o contexto do span corrente.
+    """
+    headers = dict(headers or {})
+    propagator.inject(headers)
+    return headers
+
+
+def extract_trace_context(headers):
+    return propagator.extract(headers)
+
+
+def current_trace_id() -> str:
+    span_context = trace.get_current_span().get_span_context()
+    return format(span_context.trace_id, "032x") if span_context.is_valid else "-"
+
+
+def install_log_correlation():
+    """
+    Acrescenta o atributo 'trace_id' a todos os registros de log, permitindo correlacionar
+    as mensagens dos serviços de uma mesma análise.
+    """
+    previous_factory = logging.getLogRecordFactory()
+    if getattr(previous_factory, "adds_trace_id", False):
+        return
+
+    def record_factory(*args, **kwargs):
+        record = previous_factory(*args, **kwargs)
+        record.trace_id = current_trace_id()
+        return record
+
+    record_factory.adds_trace_id = True
+    logging.setLogRecordFactory(record_factory)
+
+
+async def trace_request(request, call_next):
+    """
+    Middleware HTTP: abre o span de servidor da requisição, continuando o trace recebido
+    no cabeçalho traceparent, e devolve o identificador do trace em X-Trace-Id.
+    """
+    attributes = {"http.method": request.method, "http.target": request.url.path}
+    with span(
+        f"{request.method} {request.url.path}",
+        kind=trace.SpanKind.SERVER,
+        context=extract_trace_context(request.headers),
+        **attributes
+    ) as current:
+        response = await call_next(request)
+        current.set_attribute("http.status_code", response.status_code)
+        response.headers["X-Trace-Id"] = current_trace_id()
+        return response
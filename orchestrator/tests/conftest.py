@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# A configuração do serviço exige estas variáveis ao ser importada; os testes não chamam o LLM
+# e usam um banco SQLite temporário e nenhum cache compartilhado entre os testes.
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("MODEL_NAME", "gemini-test")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/tests.db")
+os.environ.setdefault("CACHE_ENABLED", "false")
@@ -0,0 +1,61 @@
+import asyncio
+import json
+
+import pytest
+
+import cache
+import models
+import pipeline
+
+
+MODE = models.OrchestrationMode.FANOUT
+
+LARGE_CODE = "\n\n".join(f"def step_{index}():\n    return {index}\n" for index in range(6)) + "\nprint(step_0())\n"
+
+
+@pytest.fixture
+def agent_calls(monkeypatch):
+    """Simula os agentes: cada um responde com uma sugestão citando o seu nome."""
+    calls = []
+
+    async def fan_out_analysis(code: str, agent_keys=None):
+        calls.append((code, tuple(agent_keys)))
+        return {
+            agent_key: json.dumps({"suggestions": [
+                {"title": f"{agent_key}: {code.splitlines()[-1]}", "explanation": "Revisar.", "code_example": code}
+            ]})
+            for agent_key in agent_keys
+        }
+
+    monkeypatch.setattr(pipeline, "fan_out_analysis", fan_out_analysis)
+    monkeypatch.setattr(pipeline, "result_cache", cache.ResultCache(max_entries=16, ttl_seconds=60))
+    monkeypatch.setattr(pipeline.config, "CHUNK_MAX_LINES", 10)
+    return calls
+
+
+def test_performance_agent_receives_the_whole_file_once(agent_calls):
+    response, failed_agents = asyncio.run(pipeline.run_analysis(LARGE_CODE, MODE))
+
+    assert failed_agents == []
+    whole_file_calls = [code for code, agent_keys in agent_calls if agent_keys == ("performance",)]
+    chunk_calls = [code for code, agent_keys in agent_calls if agent_keys == ("security", "codestyle")]
+    assert whole_file_calls == [LARGE_CODE]
+    assert len(chunk_calls) > 1
+    assert len(agent_calls) == len(chunk_calls) + 1
+    assert len(response.performance.suggestions) == 1
+    assert len(response.security.suggestions) == len(chunk_calls)
+
+
+def test_stream_splits_large_files_like_the_regular_endpoint(agent_calls, monkeypatch):
+    saved = []
+    monkeypatch.setattr(pipeline, "run_in_session", lambda function, *args: saved.append(args))
+
+    async def collect_events():
+        return [event async for event in pipeline.stream_analysis(LARGE_CODE, MODE, force_refresh=True)]
+
+    events = asyncio.run(collect_events())
+
+    assert [kind for kind, _ in events] == ["agent"] * 3 + ["result"]
+    assert sum(agent_keys == ("performance",) for _, agent_keys in agent_calls) == 1
+    assert len(agent_calls) > 2
+    assert len(saved) == 1
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from agent_client import AgentClient, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr("agent_client.time.monotonic", fake)
+    return fake
+
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    assert not breaker.record_failure()
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.state() == "open"
+    assert not breaker.allow_request()
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    assert not breaker.record_failure()
+    assert breaker.state() == "closed"
+
+
+def test_half_open_allows_a_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    open_breaker(breaker)
+    clock.now += 31
+    assert breaker.state() == "half-open"
+    assert breaker.acquire() == (True, True)
+    assert breaker.acquire() == (False, False)
+
+
+def test_trial_success_closes_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    open_breaker(breaker)
+    clock.now += 31
+    breaker.acquire()
+    breaker.record_success()
+    assert breaker.state() == "closed"
+    assert breaker.acquire() == (True, False)
+
+
+def test_trial_failure_reopens_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    open_breaker(breaker)
+    clock.now += 31
+    breaker.acquire()
+    assert breaker.record_failure()
+    assert breaker.state() == "open"
+    assert breaker.retry_after() == pytest.approx(30)
+
+
+def test_release_trial_frees_slot_without_changing_state(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    open_breaker(breaker)
+    clock.now += 31
+    breaker.acquire()
+    breaker.release_trial()
+    assert breaker.state() == "half-open"
+    assert breaker.acquire() == (True, True)
+
+
+def make_client() -> AgentClient:
+    return AgentClient("Test Agent", "http://agent.invalid", pool_size=1, connect_timeout=1, read_timeout=1)
+
+
+def test_cancelled_trial_releases_slot(clock):
+    client = make_client()
+    open_breaker(client.breaker)
+    clock.now += client.breaker.reset_seconds + 1
+
+    async def never_returns(path, payload):
+        await asyncio.Event().wait()
+
+    client._apost = never_returns
+
+    async def cancel_trial():
+        task = asyncio.create_task(client.apost("/analyze", {}))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert client.breaker.acquire() == (True, True)
+
+
+def test_unexpected_error_in_trial_releases_slot(clock):
+    client = make_client()
+    open_breaker(client.breaker)
+    clock.now += client.breaker.reset_seconds + 1
+
+    def broken(path, payload):
+        raise RuntimeError("falha inesperada")
+
+    client._post = broken
+    with pytest.raises(RuntimeError):
+        client.post("/analyze", {})
+    assert client.breaker.acquire() == (True, True)
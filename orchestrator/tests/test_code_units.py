@@ -0,0 +1,140 @@
+import ast
+import builtins
+
+from chunking import plan_chunks, remap_line_references, remap_report
+from code_units import MODULE_UNIT, render_units, split_units
+
+
+CODE = '''import os
+import sys
+import json
+
+LIMIT = 10
+PATHS = [os.path.join("a", str(i)) for i in range(LIMIT)]
+
+
+def scale(x):
+    return x * LIMIT
+
+
+class Base:
+    def run(self):
+        return scale(1)
+
+
+def collect(items):
+    return [scale(i) for i in items] + PATHS
+
+
+CACHE = {}
+
+
+class Child(Base):
+    def run(self):
+        return collect([1, 2]) + [sys.argv]
+
+
+if __name__ == "__main__":
+    print(Child().run(), CACHE)
+'''
+
+
+def undefined_names(code: str) -> set[str]:
+    """Nomes lidos no trecho que não são definidos nem importados em nenhum lugar dele."""
+    tree = ast.parse(code)
+    bound = set(dir(builtins))
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            bound.add(node.name)
+        elif isinstance(node, ast.arg):
+            bound.add(node.arg)
+        elif isinstance(node, ast.alias):
+            bound.add(node.asname or node.name.split(".")[0])
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            bound.add(node.id)
+    return {node.id for node in ast.walk(tree) if isinstance(node, ast.Name) and node.id not in bound}
+
+
+def unit_named(units: list[dict], name: str) -> dict:
+    return next(unit for unit in units if unit["name"] == name)
+
+
+def test_units_follow_source_order():
+    units = split_units(CODE)
+    assert [(unit["name"], unit["body"][0][1]) for unit in units] == [
+        (MODULE_UNIT, 5),
+        ("def scale", 9),
+        ("class Base", 13),
+        ("def collect", 18),
+        (MODULE_UNIT, 22),
+        ("class Child", 25),
+        (MODULE_UNIT, 30),
+    ]
+
+
+def test_each_unit_renders_without_undefined_names():
+    for unit in split_units(CODE):
+        unit_code, line_map = render_units([unit])
+        assert undefined_names(unit_code) == set(), unit["name"]
+        assert len(line_map) == unit_code.count("\n")
+
+
+def test_header_has_module_assignments_transitively():
+    unit_code, _ = render_units([unit_named(split_units(CODE), "def collect")])
+    assert "LIMIT = 10" in unit_code
+    assert "PATHS = [" in unit_code
+    assert "import os" in unit_code
+    assert "def scale(*args, **kwargs): ...  # noqa" in unit_code
+
+
+def test_stub_is_dropped_when_group_defines_the_name():
+    units = split_units(CODE)
+    unit_code, _ = render_units([unit_named(units, "def scale"), unit_named(units, "class Base")])
+    assert "def scale(*args" not in unit_code
+    assert unit_code.count("LIMIT = 10") == 1
+
+
+def test_unused_imports_stay_in_first_module_unit():
+    units = split_units(CODE)
+    assert ("import json", 3) in units[0]["header"]
+    assert all(("import json", 3) not in unit["header"] for unit in units[1:])
+
+
+def test_line_map_points_to_original_lines():
+    lines = CODE.splitlines()
+    unit_code, line_map = render_units([unit_named(split_units(CODE), "class Child")])
+    for text, original in zip(unit_code.splitlines(), line_map):
+        if original:
+            assert text == lines[original - 1]
+
+
+def test_chunks_keep_main_block_after_definitions():
+    chunks = plan_chunks(CODE, 12)
+    assert chunks is not None and len(chunks) > 1
+    last = chunks[-1]["code"]
+    assert last.index("class Child(Base):") < last.index('if __name__ == "__main__":')
+    for chunk in chunks:
+        assert undefined_names(chunk["code"]) == set()
+        compile(chunk["code"], "<chunk>", "exec")
+
+
+def test_small_code_is_not_chunked():
+    assert plan_chunks(CODE, 1000) is None
+    assert plan_chunks("def broken(:\n" * 500, 10) is None
+
+
+def test_remap_line_references():
+    line_map = [0, 0, 5, 6, 7]
+    assert remap_line_references("Problema na linha 3", line_map) == "Problema na linha 5"
+    assert remap_line_references("lines 3-5 e linha 1", line_map) == "lines 5-7 e linha 1"
+
+
+def test_remap_report():
+    report = {"security": {"suggestions": [
+        {"title": "Linha 2", "explanation": "Ocorrências nas linhas: 1, 2.", "code_example": "x = 1  # linha 2"}
+    ]}}
+    remapped = remap_report(report, [10, 20])
+    suggestion = remapped["security"]["suggestions"][0]
+    assert suggestion["title"] == "Linha 20"
+    assert suggestion["explanation"] == "Ocorrências nas linhas: 10, 20."
+    assert suggestion["code_example"] == "x = 1  # linha 2"
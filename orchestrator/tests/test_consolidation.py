@@ -0,0 +1,48 @@
+from consolidation import AGENT_KEYS, merge_reports
+
+
+def suggestion(title: str, code_example: str = "", explanation: str = "") -> dict:
+    return {"title": title, "explanation": explanation or title, "code_example": code_example}
+
+
+def report(**suggestions_by_agent: list[dict]) -> dict:
+    return {agent_key: {"suggestions": suggestions_by_agent.get(agent_key, [])} for agent_key in AGENT_KEYS}
+
+
+CLEAN_PART = report(
+    security=[suggestion("Nenhuma vulnerabilidade encontrada")],
+    performance=[suggestion("Nenhuma problema de performance encontrada")],
+    codestyle=[suggestion("Nenhuma problema encontrada")],
+)
+
+
+def titles(response, agent_key: str) -> list[str]:
+    return [item.title for item in getattr(response, agent_key).suggestions]
+
+
+def test_placeholders_are_dropped_when_another_part_has_findings():
+    findings_part = report(
+        security=[suggestion("B602: subprocess com shell=True", "subprocess.run(args)")],
+        codestyle=[suggestion("E501: linha longa", "x = (\n    1\n)")],
+    )
+    merged = merge_reports([CLEAN_PART, findings_part, CLEAN_PART])
+    assert titles(merged, "security") == ["B602: subprocess com shell=True"]
+    assert titles(merged, "codestyle") == ["E501: linha longa"]
+    assert titles(merged, "performance") == ["Nenhuma problema de performance encontrada"]
+
+
+def test_single_placeholder_when_every_part_is_clean():
+    merged = merge_reports([CLEAN_PART, CLEAN_PART, CLEAN_PART])
+    for agent_key in AGENT_KEYS:
+        assert len(getattr(merged, agent_key).suggestions) == 1
+
+
+def test_real_findings_with_similar_wording_are_kept():
+    part = report(security=[suggestion("Nenhuma validação de entrada encontrada")])
+    merged = merge_reports([CLEAN_PART, part])
+    assert titles(merged, "security") == ["Nenhuma validação de entrada encontrada"]
+
+
+def test_empty_parts_stay_empty():
+    merged = merge_reports([report(), report()])
+    assert all(not getattr(merged, agent_key).suggestions for agent_key in AGENT_KEYS)
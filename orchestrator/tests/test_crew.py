@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+import crew
+
+
+VALID = {"suggestions": [{"title": "Use with", "explanation": "Fecha o arquivo.", "code_example": "with open(p) as f: ..."}]}
+
+
+class FakeLLM:
+    def __init__(self, *responses: str):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def call(self, messages: list[dict]) -> str:
+        self.calls += 1
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    fake = FakeLLM(json.dumps(VALID))
+    monkeypatch.setattr(crew.config, "llm_for_review", fake)
+    monkeypatch.setattr(crew.config, "STRUCTURED_OUTPUT_MAX_REPAIRS", 1)
+    return fake
+
+
+def test_agent_output_rewritten_by_the_coordinator_is_normalized(llm):
+    raw = f"Aqui está o resultado da ferramenta:\n```json\n{json.dumps(VALID)[:-1]},}}\n```"
+    assert json.loads(crew.validate_task_output(raw)) == VALID
+    assert llm.calls == 0
+
+
+def test_invalid_output_is_repaired_by_the_coordinator_llm(llm):
+    assert json.loads(crew.validate_task_output('{"suggestions": [{"title": "Use with"}]}')) == VALID
+    assert llm.calls == 1
+
+
+def test_agent_errors_are_kept_for_the_consolidation(llm):
+    raw = '{"error": "Serviço indisponível"}'
+    assert crew.validate_task_output(raw) == raw
+    assert llm.calls == 0
+
+
+def test_unrepairable_output_is_kept_as_is(llm):
+    llm.responses = ["continua sem JSON"]
+    assert crew.validate_task_output("Não consegui usar a ferramenta.") == "Não consegui usar a ferramenta."
+    assert llm.calls == 1
+
+
+def test_pooled_crews_do_not_share_the_coordinator():
+    pool = crew.OrchestrationCrewPool(size=2)
+    with pool.checkout() as first, pool.checkout() as second:
+        assert first is not second
+        assert first.agents[0] is not second.agents[0]
+        assert all(task.agent is first.agents[0] for task in first.tasks)
+        assert not {id(tool) for tool in first.agents[0].tools} & {id(tool) for tool in second.agents[0].tools}
+
+
+def test_partial_pools_only_delegate_to_their_agents():
+    pool = crew.orchestration_crews_by_agents[frozenset(crew.WHOLE_FILE_AGENT_KEYS)]
+    with pool.checkout() as performance_crew:
+        assert [task.description for task in performance_crew.tasks] == [
+            description for agent_key, description, _ in crew.DELEGATION_TASKS if agent_key == "performance"
+        ]
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from consolidation import consolidate_reports, jaccard, normalize_text, parse_agent_report, shingle_hashes
+
+
+def test_normalize_text_ignores_accents_case_and_punctuation():
+    assert normalize_text("  Injeção de   SQL! ") == "injecao de sql"
+    assert normalize_text(None) == ""
+
+
+def test_shingles_of_equivalent_texts_match():
+    assert shingle_hashes("Uso de eval()") == shingle_hashes("uso de EVAL")
+    assert shingle_hashes("") == frozenset()
+    assert len(shingle_hashes("ab", size=4)) == 1
+
+
+def test_jaccard():
+    first, second = frozenset({1, 2, 3}), frozenset({2, 3, 4})
+    assert jaccard(first, second) == pytest.approx(0.5)
+    assert jaccard(frozenset(), frozenset()) == 1.0
+    assert jaccard(first, frozenset()) == 0.0
+
+
+def agent_report(*suggestions: tuple[str, str]) -> str:
+    return json.dumps({"suggestions": [
+        {"title": title, "explanation": "Detalhes.", "code_example": code_example}
+        for title, code_example in suggestions
+    ]})
+
+
+def test_near_duplicates_across_agents_keep_first_occurrence():
+    response = consolidate_reports({
+        "security": agent_report(("Uso de eval com entrada do usuário", "ast.literal_eval(data)")),
+        "performance": agent_report(("Uso de eval() com entrada do usuário.", "ast.literal_eval(data)")),
+        "codestyle": agent_report(("E501: linha longa", "x = (\n    1\n)")),
+    })
+    assert [item.title for item in response.security.suggestions] == ["Uso de eval com entrada do usuário"]
+    assert response.performance.suggestions == []
+    assert [item.title for item in response.codestyle.suggestions] == ["E501: linha longa"]
+
+
+def test_same_title_with_different_code_is_kept():
+    response = consolidate_reports({
+        "security": agent_report(
+            ("Uso de subprocess com shell=True", "subprocess.run(['ls'])"),
+            ("Uso de subprocess com shell=True", "os.scandir(path)"),
+        ),
+    })
+    assert len(response.security.suggestions) == 2
+
+
+def test_invalid_or_error_reports_become_a_failure_suggestion():
+    error = parse_agent_report("security", json.dumps({"error": "Timeout", "details": "90s"}))
+    assert error.suggestions[0].explanation == "Timeout: 90s"
+    invalid = parse_agent_report("codestyle", "não é JSON")
+    assert invalid.suggestions[0].title == "Falha na análise do agente 'codestyle'"
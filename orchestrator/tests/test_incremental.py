@@ -0,0 +1,110 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import config
+import incremental
+import models
+from incremental import run_incremental_analysis, split_code_units
+
+
+BASE_CODE = '''import os
+
+LIMIT = 3
+
+
+def first():
+    return os.getcwd() * LIMIT
+
+
+def second():
+    return eval(input())
+'''
+
+# Mesmas unidades, deslocadas por uma nova função no início do arquivo.
+SHIFTED_CODE = BASE_CODE.replace("LIMIT = 3\n", "LIMIT = 3\n\n\ndef added():\n    return 1\n")
+
+
+def line_of(code: str, text: str) -> int:
+    return next(number for number, line in enumerate(code.splitlines(), start=1) if text in line)
+
+
+def fake_analysis(calls: list[str], whole_file_calls: list[str] | None = None):
+    """
+    Simula os agentes: o de segurança aponta cada 'return', citando a linha dele no trecho recebido,
+    e o de performance registra o código recebido.
+    """
+    async def analyze_with_agents(code: str, mode, agent_keys):
+        if agent_keys == ("performance",):
+            if whole_file_calls is not None:
+                whole_file_calls.append(code)
+            return {"performance": {"suggestions": []}}, []
+        calls.append(code)
+        suggestions = [
+            {"title": f"Retorno na linha {number}", "explanation": "Retorno revisado.", "code_example": line.strip()}
+            for number, line in enumerate(code.splitlines(), start=1) if line.strip().startswith("return")
+        ]
+        return {"security": {"suggestions": suggestions}, "codestyle": {"suggestions": []}}, []
+    return analyze_with_agents
+
+
+def reported_lines(response: models.ConsolidatedResponse) -> list[int]:
+    return sorted(int(re.search(r"\d+", suggestion.title).group()) for suggestion in response.security.suggestions)
+
+
+def run(base_record, code: str):
+    return asyncio.run(run_incremental_analysis(base_record, code, models.OrchestrationMode.FANOUT))
+
+
+def test_units_carry_header_and_line_map():
+    units = {unit["name"]: unit for unit in split_code_units(BASE_CODE)}
+    first = units["def first"]
+    assert "import os" in first["code"] and "LIMIT = 3" in first["code"]
+    lines = BASE_CODE.splitlines()
+    for text, original in zip(first["code"].splitlines(), first["line_map"]):
+        if original:
+            assert text == lines[original - 1]
+
+
+def test_reports_are_remapped_to_file_lines(monkeypatch):
+    calls = []
+    monkeypatch.setattr(incremental, "analyze_with_agents", fake_analysis(calls))
+    base_record = SimpleNamespace(id=1, model_version=config.MODEL_VERSION, units=None)
+
+    response, failed_agents, saved_units = run(base_record, BASE_CODE)
+
+    assert failed_agents == []
+    assert reported_lines(response) == [line_of(BASE_CODE, "os.getcwd"), line_of(BASE_CODE, "eval(")]
+    assert all("line_map" in unit for unit in saved_units.values())
+
+
+def test_reused_units_are_remapped_to_new_positions(monkeypatch):
+    calls = []
+    monkeypatch.setattr(incremental, "analyze_with_agents", fake_analysis(calls))
+    _, _, saved_units = run(SimpleNamespace(id=1, model_version=config.MODEL_VERSION, units=None), BASE_CODE)
+    calls.clear()
+
+    base_record = SimpleNamespace(id=2, model_version=config.MODEL_VERSION, units=saved_units)
+    response, _, _ = run(base_record, SHIFTED_CODE)
+
+    assert len(calls) == 1 and "def added" in calls[0]
+    assert reported_lines(response) == [
+        line_of(SHIFTED_CODE, "return 1"), line_of(SHIFTED_CODE, "os.getcwd"), line_of(SHIFTED_CODE, "eval(")
+    ]
+
+
+def test_performance_agent_always_receives_the_whole_file(monkeypatch):
+    calls, whole_file_calls = [], []
+    monkeypatch.setattr(incremental, "analyze_with_agents", fake_analysis(calls, whole_file_calls))
+    _, _, saved_units = run(SimpleNamespace(id=1, model_version=config.MODEL_VERSION, units=None), BASE_CODE)
+    assert all(set(unit["report"]) == {"security", "codestyle"} for unit in saved_units.values())
+
+    # Registros antigos também guardavam um relatório de performance por unidade, que não é reaproveitado.
+    stale = {"suggestions": [{"title": "Perfil da unidade", "explanation": "Obsoleto.", "code_example": ""}]}
+    for unit in saved_units.values():
+        unit["report"]["performance"] = stale
+    base_record = SimpleNamespace(id=2, model_version=config.MODEL_VERSION, units=saved_units)
+    response, _, _ = run(base_record, SHIFTED_CODE)
+
+    assert whole_file_calls == [BASE_CODE, SHIFTED_CODE]
+    assert response.performance.suggestions == []
@@ -0,0 +1,58 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import schemas
+from migrations import upgrade_schema
+
+
+# Tabela criada pelo database/init.sql original. O updated_at já existe porque o SQLite, ao contrário
+# do PostgreSQL, não aceita adicionar uma coluna com DEFAULT CURRENT_TIMESTAMP.
+BASELINE_TABLE = """
+CREATE TABLE analysis_history (
+    id INTEGER PRIMARY KEY,
+    code_snippet TEXT NOT NULL,
+    suggestions JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+@pytest.fixture
+def old_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as connection:
+        connection.execute(text(BASELINE_TABLE))
+        connection.execute(text("CREATE INDEX idx_analysis_history_hash_lookup ON analysis_history (created_at)"))
+        connection.execute(text("INSERT INTO analysis_history (code_snippet, suggestions) VALUES ('x = 1', '{}')"))
+    yield engine
+    engine.dispose()
+
+
+def test_adds_missing_columns_and_indexes_to_an_existing_table(old_engine):
+    upgrade_schema(old_engine)
+    upgrade_schema(old_engine)
+
+    inspector = inspect(old_engine)
+    columns = {column["name"] for column in inspector.get_columns("analysis_history")}
+    assert columns == {column.name for column in schemas.AnalysisHistory.__table__.columns}
+    indexes = {index["name"] for index in inspector.get_indexes("analysis_history")}
+    assert "idx_analysis_history_mode_lookup" in indexes
+    assert "idx_analysis_history_hash_lookup" not in indexes
+
+
+def test_existing_rows_get_defaults_and_lookups_work(old_engine):
+    upgrade_schema(old_engine)
+    session = sessionmaker(bind=old_engine)()
+    try:
+        old_record = session.query(schemas.AnalysisHistory).one()
+        assert old_record.status == "completed"
+        assert old_record.force_refresh is False
+
+        assert crud.get_latest_analysis_by_hash(
+            session, code_sha256="abc", model_version="m", mode="fanout", max_age_seconds=60
+        ) is None
+    finally:
+        session.close()
@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.exc import OperationalError
+
+import main
+
+
+def test_history_lookup_errors_use_the_service_error_response(monkeypatch):
+    errors = []
+
+    def failing_lookup(db, code, mode):
+        raise OperationalError("SELECT", {}, Exception("column analysis_history.code_sha256 does not exist"))
+
+    monkeypatch.setattr(main, "find_stored_result", failing_lookup)
+    monkeypatch.setattr(main, "record_error", errors.append)
+
+    response = TestClient(main.app).post("/orchestrate-analysis", json={"code": "x = 1\n", "mode": "fanout"})
+
+    assert response.status_code == 500
+    assert response.json()["detail"].startswith("Ocorreu um erro interno inesperado no orquestrador")
+    assert len(errors) == 1
+
+
+def test_batch_with_repeated_paths_is_rejected(monkeypatch):
+    async def unexpected_batch(*args):
+        raise AssertionError("o lote não deveria ser analisado")
+
+    monkeypatch.setattr(main, "run_batch_analysis", unexpected_batch)
+    files = [{"path": "app/a.py", "code": "x = 1\n"}, {"path": "app/a.py", "code": "x = 2\n"}]
+
+    response = TestClient(main.app).post("/orchestrate-analysis/batch", json={"files": files})
+
+    assert response.status_code == 422
+    assert "app/a.py" in response.json()["detail"]
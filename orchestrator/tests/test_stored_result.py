@@ -0,0 +1,52 @@
+import pytest
+
+import cache
+import models
+import pipeline
+from database import Base, SessionLocal, engine
+
+
+MODE = models.OrchestrationMode.FANOUT
+CODE = "print('olá')\n"
+
+
+def empty_response() -> models.ConsolidatedResponse:
+    empty = models.AnalysisResponse(suggestions=[])
+    return models.ConsolidatedResponse(security=empty, performance=empty, codestyle=empty)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(pipeline, "result_cache", cache.ResultCache(max_entries=16, ttl_seconds=60))
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+
+
+def test_saved_analysis_is_served_with_its_id(db):
+    record = pipeline.save_analysis(db, CODE, empty_response(), [], MODE)
+    pipeline.result_cache.set(pipeline.orchestration_cache_key(CODE, MODE), empty_response().model_dump())
+    db.query = None  # o resultado e o id vêm do cache, sem consultar o banco
+
+    response, analysis_id = pipeline.find_stored_result(db, CODE, MODE)
+    assert response == empty_response()
+    assert analysis_id == record.id
+
+
+def test_history_hit_returns_record_id_and_fills_cache(db):
+    record = pipeline.save_analysis(db, CODE, empty_response(), [], MODE)
+
+    assert pipeline.find_stored_result(db, CODE, MODE) == (empty_response(), record.id)
+    assert pipeline.result_cache.get(pipeline.orchestration_cache_key(CODE, MODE)) == empty_response().model_dump()
+
+
+def test_failed_analysis_is_not_remembered(db):
+    pipeline.save_analysis(db, CODE, empty_response(), ["security"], MODE)
+    assert pipeline.find_stored_result(db, CODE, MODE) is None
+
+
+def test_other_mode_is_not_served(db):
+    pipeline.save_analysis(db, CODE, empty_response(), [], MODE)
+    assert pipeline.find_stored_result(db, CODE, models.OrchestrationMode.CREW) is None
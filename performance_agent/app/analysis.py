@@ -0,0 +1,52 @@
+import logging
+
+import models
+from cache import make_cache_key, result_cache
+from batching import analyze_batch
+from metrics import timed
+from crew import performance_crews, fast_performance_crews, batch_performance_crews, cprofile_tool
+from routing import is_simple_case, run_routed
+from structured_output import parse_with_repair
+from tools import profiling_pool
+
+
+def startup():
+    """Pré-cria os processos isolados do pool de profiling."""
+    profiling_pool.start()
+
+
+def shutdown():
+    """Encerra os processos do pool de profiling."""
+    profiling_pool.shutdown()
+
+
+def analyze(code: str) -> models.AnalysisResponse:
+    """
+    Executa a análise completa de um trecho de código: cache, ferramenta e crew.
+    Usada pelo endpoint /analyze e, no modo em processo, diretamente pelo orquestrador.
+    Códigos curtos vão primeiro ao modelo rápido, quando configurado (ver routing.run_routed).
+    Lança um dos STRUCTURED_OUTPUT_ERRORS se a resposta da IA não validar nem após as correções.
+    """
+    cache_key = make_cache_key(code, "performance")
+    cached_response = result_cache.get(cache_key)
+    if cached_response is not None:
+        logging.info("Resultado encontrado no cache. Retornando sem executar o crew.")
+        return models.AnalysisResponse(**cached_response)
+
+    def run_crew(crews) -> models.AnalysisResponse:
+        with crews.checkout() as crew:
+            with timed("crew"):
+                result = crew.kickoff(inputs={'code': code})
+            return parse_with_repair(result.tasks_output[0].raw, models.AnalysisResponse, crew.agents[0].llm)
+
+    response = run_routed("analyze", run_crew, performance_crews, fast_performance_crews, is_simple_case(0, code))
+
+    result_cache.set(cache_key, response.model_dump())
+    return response
+
+
+def analyze_files(files: list[models.FileInput]) -> models.BatchAnalysisResponse:
+    """
+    Executa a análise em lote: a ferramenta roda uma única vez e os arquivos são agrupados por chamada ao LLM.
+    """
+    return analyze_batch(files, cprofile_tool.run_batch, batch_performance_crews)
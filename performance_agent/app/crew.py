@@ -1,51 +1,143 @@
+import queue
+from contextlib import contextmanager
+from typing import Iterator
+
 from crewai import Agent, Task, Crew, Process
 
-from config import llm
+import config
+from config import llm, llm_for_batch
 from tools import CProfileAnalysisTool
-from models import AnalysisResponse
+from models import AnalysisResponse, BatchAnalysisResponse
+
+
+class CrewPool:
+    """
+    Pool de cópias de um crew. O kickoff interpola as entradas nas descrições das tarefas do
+    próprio crew, então requisições concorrentes não podem compartilhar o mesmo objeto: cada
+    uma empresta uma cópia exclusiva do crew de referência. Se todas estiverem em uso, uma nova cópia é
+    criada e devolvida ao pool ao final (até 'size' cópias ociosas).
+    """
+
+    def __init__(self, template: Crew, size: int):
+        self.template = template
+        self._idle: queue.LifoQueue[Crew] = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def checkout(self) -> Iterator[Crew]:
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            crew = self.template.copy()
+        try:
+            yield crew
+        finally:
+            try:
+                self._idle.put_nowait(crew)
+            except queue.Full:
+                pass
 
 
 cprofile_tool = CProfileAnalysisTool()
 
-performance_engineer_agent = Agent(
-    role="Engenheiro de Software Sênior especialista em Otimização de Performance",
+
+def build_performance_crew(agent_llm) -> Crew:
+    """
+    Crew que executa o cProfile e analisa o relatório, no modelo informado.
+    """
+    performance_engineer_agent = Agent(
+        role="Engenheiro de Software Sênior especialista em Otimização de Performance",
+        goal=f"""
+            Analisar o relatório de performance da ferramenta 'cProfile' para identificar os principais
+            gargalos de execução em um código Python e fornecer sugestões de otimização claras e eficazes.
+            Sua saída final DEVE ser um objeto JSON que valide estritamente com o seguinte schema Pydantic:
+            {AnalysisResponse.model_json_schema()}
+        """,
+        backstory=(
+            "Você é um engenheiro experiente obcecado por velocidade e eficiência. Você tem um talento especial para ler "
+            "relatórios de profiling complexos e identificar exatamente qual função ou linha de código está atrasando a aplicação. "
+            "Suas sugestões são sempre práticas e focadas em gerar o maior impacto de performance."
+        ),
+        tools=[cprofile_tool],
+        llm=agent_llm,
+        verbose=True,
+        allow_delegation=False
+    )
+
+    performance_analysis_task = Task(
+        description=(
+            "1. Receba o seguinte trecho de código Python: {code}\n"
+            "2. Utilize sua ferramenta 'CProfileAnalysisTool' para executar o código e obter o relatório de performance.\n"
+            "3. Analise o relatório JSON do cProfile. Foque nas listas 'top_by_tottime' (tempo total) e 'top_by_cumtime' (tempo cumulativo) "
+            "e use 'hot_functions' para entender quem chama e quem é chamado pelas funções mais custosas. "
+            "Baseie as conclusões sobre tempo total nas estatísticas de 'benchmark' (min/median/p95 de várias execuções sem o profiler) "
+            "e considere o pico e os pontos de alocação em 'memory', quando presentes.\n"
+            "4. Identifique o principal gargalo de performance. Crie uma sugestão detalhada contendo um 'title' (ex: 'Alto tempo de execução na função X'), "
+            "uma 'explanation' explicando por que a função é lenta (ex: loop ineficiente, muitas chamadas), e um 'code_example' mostrando uma versão otimizada do código.\n"
+            "5. Formate a sugestão em um único objeto JSON que corresponda exatamente ao schema Pydantic fornecido em seu objetivo.\n"
+            "6. Caso não haja problemas de performance, retorne um JSON vazio com uma lista de sugestões informando que nao foram encontradas correções necessárias seguindo o JSON esperado. "
+            "Onde o 'title' deve ser 'Nenhuma problema de performance encontrada', a 'explanation' deve ser 'Nenhuma problema foi identificada no código fornecido.' e o 'code_example' deve estar vazio."
+        ),
+        expected_output=(
+            "Uma string contendo um único objeto JSON válido. O JSON deve ter uma chave 'suggestions' contendo uma lista de objetos, "
+            "cada um com as chaves 'title', 'explanation' e 'code_example'."
+        ),
+        agent=performance_engineer_agent
+    )
+
+    return Crew(
+        agents=[performance_engineer_agent],
+        tasks=[performance_analysis_task],
+        process=Process.sequential
+    )
+
+
+performance_crew = build_performance_crew(llm)
+# Variante no modelo rápido, usada pelo roteamento nos casos simples.
+fast_performance_crew = build_performance_crew(config.fast_llm) if config.FAST_MODEL_NAME else None
+# O agente do lote reaproveita o papel e a história do agente principal.
+performance_engineer_agent = performance_crew.agents[0]
+
+batch_performance_engineer_agent = Agent(
+    role=performance_engineer_agent.role,
     goal=f"""
-        Analisar o relatório de performance da ferramenta 'cProfile' para identificar os principais
-        gargalos de execução em um código Python e fornecer sugestões de otimização claras e eficazes.
+        Analisar relatórios já gerados pela ferramenta 'cProfile' para vários arquivos de uma só vez, identificar
+        os principais gargalos de cada um e fornecer sugestões de otimização agrupadas pelo caminho de cada arquivo.
         Sua saída final DEVE ser um objeto JSON que valide estritamente com o seguinte schema Pydantic:
-        {AnalysisResponse.model_json_schema()}
+        {BatchAnalysisResponse.model_json_schema()}
     """,
-    backstory=(
-        "Você é um engenheiro experiente obcecado por velocidade e eficiência. Você tem um talento especial para ler "
-        "relatórios de profiling complexos e identificar exatamente qual função ou linha de código está atrasando a aplicação. "
-        "Suas sugestões são sempre práticas e focadas em gerar o maior impacto de performance."
-    ),
-    tools=[cprofile_tool],
-    llm=llm,
+    backstory=performance_engineer_agent.backstory,
+    tools=[],
+    llm=llm_for_batch,
     verbose=True,
     allow_delegation=False
 )
 
-performance_analysis_task = Task(
+batch_performance_analysis_task = Task(
     description=(
-        "1. Receba o seguinte trecho de código Python: {code}\n"
-        "2. Utilize sua ferramenta 'CProfileAnalysisTool' para executar o código e obter o relatório de performance.\n"
-        "3. Analise a saída de texto do cProfile. Foque nas funções com maior 'tottime' (tempo total) e 'cumtime' (tempo cumulativo).\n"
-        "4. Identifique o principal gargalo de performance. Crie uma sugestão detalhada contendo um 'title' (ex: 'Alto tempo de execução na função X'), "
-        "uma 'explanation' explicando por que a função é lenta (ex: loop ineficiente, muitas chamadas), e um 'code_example' mostrando uma versão otimizada do código.\n"
-        "5. Formate a sugestão em um único objeto JSON que corresponda exatamente ao schema Pydantic fornecido em seu objetivo.\n"
-        "6. Caso não haja problemas de performance, retorne um JSON vazio com uma lista de sugestões informando que nao foram encontradas correções necessárias seguindo o JSON esperado. "
-        "Onde o 'title' deve ser 'Nenhuma problema de performance encontrada', a 'explanation' deve ser 'Nenhuma problema foi identificada no código fornecido.' e o 'code_example' deve estar vazio."
+        "1. A seguir estão vários arquivos Python, cada um com o seu relatório do cProfile já executado:\n{files}\n"
+        "2. Para cada arquivo, foque nas funções com maior 'tottime' e 'cumtime' e identifique o principal gargalo. "
+        "Crie uma sugestão contendo um 'title', uma 'explanation' explicando por que a função é lenta "
+        "e um 'code_example' mostrando uma versão otimizada do código.\n"
+        "3. Retorne um item em 'results' para CADA arquivo, usando exatamente o mesmo 'path' informado. "
+        "Arquivos sem problemas de performance devem ter uma única sugestão com o 'title' 'Nenhuma problema de performance encontrada', "
+        "a 'explanation' 'Nenhuma problema foi identificada no código fornecido.' e o 'code_example' vazio.\n"
+        "4. Formate tudo em um único objeto JSON que corresponda exatamente ao schema Pydantic fornecido em seu objetivo."
     ),
     expected_output=(
-        "Uma string contendo um único objeto JSON válido. O JSON deve ter uma chave 'suggestions' contendo uma lista de objetos, "
-        "cada um com as chaves 'title', 'explanation' e 'code_example'."
+        "Uma string contendo um único objeto JSON válido com a chave 'results', uma lista de objetos com as chaves "
+        "'path' e 'suggestions'."
     ),
-    agent=performance_engineer_agent
+    agent=batch_performance_engineer_agent
 )
 
-performance_crew = Crew(
-    agents=[performance_engineer_agent],
-    tasks=[performance_analysis_task],
+batch_performance_crew = Crew(
+    agents=[batch_performance_engineer_agent],
+    tasks=[batch_performance_analysis_task],
     process=Process.sequential
 )
+
+
+# Cada requisição executa o kickoff em uma cópia exclusiva de cada crew (ver CrewPool).
+performance_crews = CrewPool(performance_crew, config.ANALYZE_MAX_CONCURRENCY)
+fast_performance_crews = CrewPool(fast_performance_crew, config.ANALYZE_MAX_CONCURRENCY) if config.FAST_MODEL_NAME else None
+batch_performance_crews = CrewPool(batch_performance_crew, config.ANALYZE_MAX_CONCURRENCY)
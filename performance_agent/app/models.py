@@ -14,3 +14,21 @@ class EnrichedSuggestion(BaseModel):
 class AnalysisResponse(BaseModel):
     """Modelo para a resposta final da análise, contendo uma lista de sugestões."""
     suggestions: list[EnrichedSuggestion, None]
+
+class FileInput(BaseModel):
+    """Modelo para um arquivo de uma análise em lote."""
+    path: str = Field(..., description="Caminho do arquivo, usado para agrupar as sugestões.")
+    code: str = Field(..., description="Conteúdo do arquivo Python.")
+
+class BatchCodeInput(BaseModel):
+    """Modelo para o payload de entrada de uma análise em lote."""
+    files: list[FileInput] = Field(..., min_length=1, description="Arquivos a serem analisados.")
+
+class FileAnalysis(BaseModel):
+    """Modelo com as sugestões de um único arquivo de uma análise em lote."""
+    path: str
+    suggestions: list[EnrichedSuggestion]
+
+class BatchAnalysisResponse(BaseModel):
+    """Modelo para a resposta de uma análise em lote, com as sugestões agrupadas por arquivo."""
+    results: list[FileAnalysis]
@@ -0,0 +1,118 @@
+import os
+import sysconfig
+from pstats import func_std_string
+
+
+USER_CODE_FILENAME = "<string>"
+
+_STDLIB_PATHS = tuple(
+    os.path.normpath(path)
+    for path in {sysconfig.get_paths().get("stdlib"), sysconfig.get_paths().get("platstdlib")}
+    if path
+)
+
+
+def classify_frame(func: tuple) -> str:
+    """
+    Classifica uma entrada do cProfile como 'user', 'builtin', 'stdlib' ou 'library'.
+    """
+    filename, _, _ = func
+    if filename == USER_CODE_FILENAME:
+        return "user"
+    if filename == "~":
+        return "builtin"
+    if filename.startswith("<frozen "):
+        return "stdlib"
+    normalized = os.path.normpath(filename)
+    if normalized.startswith(_STDLIB_PATHS) and "site-packages" not in normalized:
+        return "stdlib"
+    return "library"
+
+
+def function_label(func: tuple) -> str:
+    """
+    Nome legível da função no mesmo formato do pstats, sem o diretório do arquivo.
+    """
+    filename, line, name = func
+    return func_std_string((os.path.basename(filename), line, name))
+
+
+def _format_calls(primitive_calls: int, total_calls: int) -> str:
+    return str(total_calls) if primitive_calls == total_calls else f"{total_calls}/{primitive_calls}"
+
+
+def _function_entry(func: tuple, stat: tuple) -> dict:
+    primitive_calls, total_calls, tottime, cumtime, _ = stat
+    return {
+        "function": function_label(func),
+        "ncalls": _format_calls(primitive_calls, total_calls),
+        "tottime": round(tottime, 6),
+        "cumtime": round(cumtime, 6),
+        "percall_cumtime": round(cumtime / primitive_calls, 6) if primitive_calls else 0.0,
+    }
+
+
+def _edge_entry(func: tuple, edge: tuple) -> dict:
+    primitive_calls, total_calls, tottime, cumtime = edge
+    return {
+        "function": function_label(func),
+        "ncalls": _format_calls(primitive_calls, total_calls),
+        "tottime": round(tottime, 6),
+        "cumtime": round(cumtime, 6),
+    }
+
+
+def build_profile_report(
+    raw_stats: dict,
+    top_n: int,
+    hot_functions: int,
+    max_edges: int,
+    include_stdlib: bool = False,
+    include_builtins: bool = False,
+) -> dict:
+    """
+    Resume o dicionário de estatísticas do cProfile em um relatório compacto: as top-N funções por
+    tottime e por cumtime, e as arestas chamador/chamado das funções mais quentes.
+    Entradas da biblioteca padrão e funções embutidas são omitidas das listas (mas contabilizadas
+    no resumo e mantidas nas arestas), salvo se habilitadas.
+    """
+    hidden_kinds = set()
+    if not include_stdlib:
+        hidden_kinds.add("stdlib")
+    if not include_builtins:
+        hidden_kinds.add("builtin")
+
+    visible = {func: stat for func, stat in raw_stats.items() if classify_frame(func) not in hidden_kinds}
+
+    callees: dict[tuple, dict[tuple, tuple]] = {}
+    for func, (_, _, _, _, callers) in raw_stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+
+    by_tottime = sorted(visible, key=lambda func: visible[func][2], reverse=True)[:top_n]
+    by_cumtime = sorted(visible, key=lambda func: visible[func][3], reverse=True)[:top_n]
+
+    hot = []
+    for func in by_tottime[:hot_functions]:
+        callers = sorted(raw_stats[func][4].items(), key=lambda item: item[1][3], reverse=True)
+        func_callees = sorted(callees.get(func, {}).items(), key=lambda item: item[1][3], reverse=True)
+        hot.append({
+            "function": function_label(func),
+            "callers": [_edge_entry(caller, edge) for caller, edge in callers[:max_edges]],
+            "callees": [_edge_entry(callee, edge) for callee, edge in func_callees[:max_edges]],
+        })
+
+    hidden_time = sum(stat[2] for func, stat in raw_stats.items() if func not in visible)
+    return {
+        "summary": {
+            "total_calls": sum(stat[1] for stat in raw_stats.values()),
+            "primitive_calls": sum(stat[0] for stat in raw_stats.values()),
+            "total_time": round(sum(stat[2] for stat in raw_stats.values()), 6),
+            "functions_profiled": len(raw_stats),
+            "functions_hidden": len(raw_stats) - len(visible),
+            "hidden_tottime": round(hidden_time, 6),
+        },
+        "top_by_tottime": [_function_entry(func, visible[func]) for func in by_tottime],
+        "top_by_cumtime": [_function_entry(func, visible[func]) for func in by_cumtime],
+        "hot_functions": hot,
+    }
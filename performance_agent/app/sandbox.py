@@ -0,0 +1,383 @@
+# Este módulo é importado pelos processos do pool de profiling, portanto deve
+# depender apenas da biblioteca padrão (nada de crewai, config etc.).
+import builtins
+import contextlib
+import cProfile
+import io
+import logging
+import multiprocessing
+import queue
+import resource
+import statistics
+import threading
+import time
+import tracemalloc
+
+
+class ProfilingError(Exception):
+    """Erro ao executar um trecho de código no pool de profiling."""
+
+
+def _current_address_space_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _limit_memory(memory_mb: int):
+    """
+    Limita o espaço de endereçamento do processo ao tamanho atual mais o orçamento configurado.
+    """
+    if memory_mb <= 0:
+        return
+    limit = _current_address_space_bytes() + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _limit_cpu(cpu_seconds: int):
+    """
+    Define o limite de CPU para o próximo job, relativo ao tempo de CPU já consumido pelo processo.
+    Ao ultrapassá-lo o kernel envia SIGXCPU e o processo é encerrado.
+    """
+    if cpu_seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft_limit = int(usage.ru_utime + usage.ru_stime) + cpu_seconds
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard_limit != resource.RLIM_INFINITY:
+        soft_limit = min(soft_limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft_limit, hard_limit))
+
+
+USER_CODE_FILENAME = "<string>"
+
+
+def _fresh_namespace() -> dict:
+    """
+    Namespace de execução com uma cópia dos builtins: alterações feitas pelo trecho não
+    chegam aos builtins do processo.
+    """
+    return {"__name__": "__main__", "__builtins__": dict(builtins.__dict__)}
+
+
+def _silenced():
+    """
+    Descarta a saída padrão e de erro do trecho para não poluir os logs do serviço.
+    """
+    stack = contextlib.ExitStack()
+    stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+    stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+    return stack
+
+
+def _describe_error(error: BaseException) -> str:
+    if isinstance(error, MemoryError):
+        return "O código excedeu o limite de memória configurado para o profiling."
+    return f"{type(error).__name__}: {error}"
+
+
+def profile_code(code: str) -> tuple[str, object]:
+    """
+    Executa o código sob o cProfile em um namespace novo e retorna ("ok", stats) ou ("error", mensagem).
+    """
+    profiler = cProfile.Profile()
+    namespace = _fresh_namespace()
+    try:
+        with _silenced():
+            profiler.runctx(code, namespace, namespace)
+    except BaseException as e:
+        return "error", _describe_error(e)
+
+    profiler.create_stats()
+    return "ok", profiler.stats
+
+
+def _percentile(sorted_values: list[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def benchmark_code(code: str, runs: int, warmup_runs: int, max_seconds: float) -> dict:
+    """
+    Mede o tempo de parede de execuções repetidas do código, sem o profiler, no estilo do timeit:
+    o código é compilado uma vez, as execuções de aquecimento são descartadas e cada execução
+    usa um namespace novo. As execuções param ao atingir o orçamento de tempo.
+    """
+    compiled = compile(code, USER_CODE_FILENAME, "exec")
+    timings = []
+    deadline = time.perf_counter() + max_seconds
+    try:
+        with _silenced():
+            for run in range(warmup_runs + runs):
+                if run > 0 and time.perf_counter() > deadline:
+                    break
+                namespace = _fresh_namespace()
+                started = time.perf_counter()
+                exec(compiled, namespace, namespace)
+                if run >= warmup_runs:
+                    timings.append(time.perf_counter() - started)
+    except BaseException as e:
+        return {"error": _describe_error(e)}
+
+    if not timings:
+        return {"runs": 0, "warmup_runs": warmup_runs, "budget_exhausted": True}
+
+    ordered = sorted(timings)
+    return {
+        "runs": len(timings),
+        "warmup_runs": warmup_runs,
+        "budget_exhausted": len(timings) < runs,
+        "min": round(ordered[0], 6),
+        "median": round(statistics.median(ordered), 6),
+        "p95": round(_percentile(ordered, 0.95), 6),
+        "mean": round(statistics.fmean(ordered), 6),
+        "variance": statistics.variance(ordered) if len(ordered) > 1 else 0.0,
+    }
+
+
+def trace_memory(code: str, top_sites: int) -> dict:
+    """
+    Executa o código uma vez com o tracemalloc e retorna o pico de memória e as linhas
+    do trecho que mais alocaram memória ainda viva ao final da execução.
+    """
+    namespace = _fresh_namespace()
+    tracemalloc.start()
+    try:
+        with _silenced():
+            exec(compile(code, USER_CODE_FILENAME, "exec"), namespace, namespace)
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(True, USER_CODE_FILENAME)]
+        )
+    except BaseException as e:
+        return {"error": _describe_error(e)}
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "peak_kib": round(peak / 1024, 1),
+        "top_allocation_sites": [
+            {
+                "line": stat.traceback[0].lineno,
+                "size_kib": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[:top_sites]
+        ],
+    }
+
+
+def _requested_sections(job: dict) -> list[str]:
+    sections = []
+    if job.get("benchmark_runs", 0) > 0:
+        sections.append("benchmark")
+    if job.get("memory_top_sites", 0) > 0:
+        sections.append("memory")
+    return sections
+
+
+def run_extra(job: dict, section: str) -> dict:
+    """
+    Executa uma das medições opcionais de um job, depois do profiling: 'benchmark' ou 'memory'.
+    """
+    code = job["code"]
+    if section == "benchmark":
+        return benchmark_code(code, job["benchmark_runs"], job.get("warmup_runs", 0), job.get("benchmark_seconds", 0.0))
+    return trace_memory(code, job["memory_top_sites"])
+
+
+def _worker_main(conn, cpu_seconds: int, memory_mb: int):
+    _limit_memory(memory_mb)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        _limit_cpu(cpu_seconds)
+        status, payload = profile_code(job["code"])
+        # O profiling é enviado antes das medições extras, que têm orçamento próprio de CPU
+        # e de tempo de parede: se elas estourarem, o relatório do cProfile não se perde.
+        conn.send((status, payload))
+        if status == "ok":
+            for section in _requested_sections(job):
+                _limit_cpu(cpu_seconds)
+                conn.send((section, run_extra(job, section)))
+
+
+class ProfilingPool:
+    """
+    Pool de processos pré-criados que executam o profiling com limites de CPU, memória e tempo de parede.
+    O benchmark e a medição de memória têm um limite de tempo de parede próprio ('extras_wall_seconds').
+    Processos que estouram os limites são encerrados e substituídos por novos. Os demais são
+    substituídos após 'jobs_per_worker' jobs: o estado deixado por um trecho (módulos alterados,
+    threads, memória retida) e o orçamento de memória, calculado ao iniciar o processo, valem
+    apenas até lá.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        cpu_seconds: int,
+        wall_seconds: float,
+        memory_mb: int,
+        extras_wall_seconds: float,
+        jobs_per_worker: int = 1,
+    ):
+        self.workers = workers
+        self.jobs_per_worker = max(1, jobs_per_worker)
+        self.cpu_seconds = cpu_seconds
+        self.wall_seconds = wall_seconds
+        self.extras_wall_seconds = extras_wall_seconds
+        self.memory_mb = memory_mb
+        self._context = multiprocessing.get_context(
+            "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        )
+        self._idle: queue.Queue = queue.Queue()
+        self._jobs_done: dict[int, int] = {}
+        self._started = False
+        self._lock = threading.Lock()
+
+    def _spawn_worker(self):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.cpu_seconds, self.memory_mb),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return process, parent_conn
+
+    def _stop_worker(self, worker):
+        process, conn = worker
+        with contextlib.suppress(OSError):
+            conn.send(None)
+        process.join(timeout=1)
+        if process.is_alive():
+            process.kill()
+            process.join(timeout=1)
+        conn.close()
+        self._jobs_done.pop(process.pid, None)
+
+    def _replace_worker(self, worker):
+        process, conn = worker
+        if process.is_alive():
+            process.kill()
+        process.join(timeout=1)
+        conn.close()
+        self._jobs_done.pop(process.pid, None)
+        self._idle.put(self._spawn_worker())
+
+    def _release_worker(self, worker):
+        """
+        Devolve o processo ao pool ou, se ele já executou 'jobs_per_worker' jobs, coloca um
+        processo novo no seu lugar e o encerra.
+        """
+        process, _ = worker
+        jobs_done = self._jobs_done.get(process.pid, 0) + 1
+        if jobs_done < self.jobs_per_worker:
+            self._jobs_done[process.pid] = jobs_done
+            self._idle.put(worker)
+            return
+        self._idle.put(self._spawn_worker())
+        self._stop_worker(worker)
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.workers):
+                self._idle.put(self._spawn_worker())
+            self._started = True
+            logging.info(f"Pool de profiling iniciado com {self.workers} processos.")
+
+    def shutdown(self):
+        with self._lock:
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._stop_worker(worker)
+            self._started = False
+
+    def profile(
+        self,
+        code: str,
+        benchmark_runs: int = 0,
+        warmup_runs: int = 0,
+        benchmark_seconds: float = 0.0,
+        memory_top_sites: int = 0,
+    ) -> dict:
+        """
+        Executa o código em um processo do pool e retorna um dicionário com as estatísticas do
+        cProfile em 'stats' e, se solicitados, os resultados do benchmark e da memória. Medições
+        que estouram os seus limites voltam como {"skipped": motivo}, sem descartar o profiling.
+        Lança ProfilingError se o código falhar ou estourar algum dos limites do profiling.
+        """
+        self.start()
+        worker = self._idle.get()
+        process, conn = worker
+        job = {
+            "code": code,
+            "benchmark_runs": benchmark_runs,
+            "warmup_runs": warmup_runs,
+            "benchmark_seconds": benchmark_seconds,
+            "memory_top_sites": memory_top_sites,
+        }
+
+        try:
+            conn.send(job)
+            if not conn.poll(self.wall_seconds):
+                self._replace_worker(worker)
+                raise ProfilingError(f"O código excedeu o tempo limite de {self.wall_seconds} segundos.")
+            status, payload = conn.recv()
+        except (EOFError, OSError):
+            self._replace_worker(worker)
+            raise ProfilingError(
+                "O processo de profiling foi encerrado (limite de CPU ou memória excedido)."
+            )
+
+        if status != "ok":
+            self._release_worker(worker)
+            raise ProfilingError(payload)
+
+        result = {"stats": payload}
+        if _requested_sections(job):
+            result.update(self._receive_extras(worker, job))
+        else:
+            self._release_worker(worker)
+        return result
+
+    def _receive_extras(self, worker, job: dict) -> dict:
+        """
+        Recebe cada medição extra assim que ela termina, por até 'extras_wall_seconds' no total.
+        Se o tempo acabar ou o processo for encerrado, ele é substituído e as medições que
+        faltavam são marcadas como ignoradas.
+        """
+        process, conn = worker
+        pending = _requested_sections(job)
+        extras = {}
+        deadline = time.monotonic() + self.extras_wall_seconds
+        reason = None
+        try:
+            while pending:
+                if not conn.poll(max(0.0, deadline - time.monotonic())):
+                    reason = f"As medições excederam o tempo limite de {self.extras_wall_seconds} segundos."
+                    break
+                section, value = conn.recv()
+                extras[section] = value
+                pending.remove(section)
+        except (EOFError, OSError):
+            reason = "O processo foi encerrado durante as medições (limite de CPU ou memória excedido)."
+
+        if reason is None:
+            self._release_worker(worker)
+            return extras
+        self._replace_worker(worker)
+        logging.warning(f"Medições ignoradas ({', '.join(pending)}): {reason}")
+        return {**extras, **{section: {"skipped": reason} for section in pending}}
@@ -1,42 +1,71 @@
-import cProfile
-import pstats
-import io
 import json
 
 from crewai.tools import BaseTool
 
+import config
+from profile_report import build_profile_report
+from sandbox import ProfilingError, ProfilingPool
+from metrics import TOOL_LATENCY, timed
+
+
+profiling_pool = ProfilingPool(
+    workers=config.PROFILER_WORKERS,
+    cpu_seconds=config.PROFILER_CPU_SECONDS,
+    wall_seconds=config.PROFILER_WALL_SECONDS,
+    memory_mb=config.PROFILER_MEMORY_MB,
+    extras_wall_seconds=config.PROFILER_EXTRAS_WALL_SECONDS,
+    jobs_per_worker=config.PROFILER_JOBS_PER_WORKER,
+)
+
 
 class CProfileAnalysisTool(BaseTool):
     name: str = "Analisador de Performance de Código Python com cProfile"
     description: str = (
         "Esta ferramenta executa um trecho de código Python dentro do profiler 'cProfile' para "
         "coletar estatísticas de performance, como número de chamadas de função e tempo de execução. "
-        "Retorna um relatório de performance em texto."
+        "Retorna um relatório de performance compacto em JSON, com as funções mais custosas "
+        "por 'tottime' e 'cumtime', as relações chamador/chamado das funções mais quentes, "
+        "estatísticas de tempo de várias execuções sem o profiler e o pico de memória."
     )
 
+    @timed("cprofile", TOOL_LATENCY, tool="cprofile")
     def _run(self, code: str) -> str:
         """
-        Executa o código dentro do cProfile e captura as estatísticas.
+        Executa o código dentro do cProfile, em um processo isolado do pool, e resume as estatísticas
+        em um relatório JSON limitado às funções mais relevantes, acrescido das medições repetidas
+        de tempo ('benchmark') e do pico de memória ('memory') quando habilitadas.
         """
-
-        profiler = cProfile.Profile()
-        stream = io.StringIO()
-
         try:
-            profiler.run(code, filename='<string>')
-            stats = pstats.Stats(profiler, stream=stream)
-
-            stats.strip_dirs()
-            stats.sort_stats('cumulative')
-            stats.print_stats()
-
-            return stream.getvalue()
-
-        except Exception as e:
+            result = profiling_pool.profile(
+                code,
+                benchmark_runs=config.BENCHMARK_RUNS,
+                warmup_runs=config.BENCHMARK_WARMUP_RUNS,
+                benchmark_seconds=config.BENCHMARK_MAX_SECONDS,
+                memory_top_sites=config.MEMORY_TOP_SITES if config.BENCHMARK_TRACE_MEMORY else 0,
+            )
+        except ProfilingError as e:
             error_report = {
                 "error": "Falha ao executar o código dentro do profiler.",
                 "details": str(e)
             }
             return json.dumps(error_report)
-        finally:
-            stream.close()
+
+        profile_report = build_profile_report(
+            result["stats"],
+            top_n=config.PROFILE_TOP_N,
+            hot_functions=config.PROFILE_HOT_FUNCTIONS,
+            max_edges=config.PROFILE_MAX_EDGES,
+            include_stdlib=config.PROFILE_INCLUDE_STDLIB,
+            include_builtins=config.PROFILE_INCLUDE_BUILTINS,
+        )
+        for section in ("benchmark", "memory"):
+            if section in result:
+                profile_report[section] = result[section]
+        return json.dumps(profile_report, separators=(",", ":"))
+
+    def run_batch(self, files: dict[str, str]) -> dict[str, str]:
+        """
+        Executa o profiling de cada arquivo. Como o cProfile mede uma execução,
+        não há como agrupar os arquivos em uma única chamada.
+        """
+        return {path: self._run(code) for path, code in files.items()}
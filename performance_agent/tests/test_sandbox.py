@@ -0,0 +1,98 @@
+import pytest
+
+from sandbox import ProfilingError, ProfilingPool
+
+
+@pytest.fixture
+def make_pool():
+    pools = []
+
+    def make(
+        cpu_seconds: int = 5,
+        wall_seconds: float = 5,
+        memory_mb: int = 256,
+        extras_wall_seconds: float = 5,
+        jobs_per_worker: int = 1,
+    ) -> ProfilingPool:
+        pool = ProfilingPool(
+            workers=1, cpu_seconds=cpu_seconds, wall_seconds=wall_seconds, memory_mb=memory_mb,
+            extras_wall_seconds=extras_wall_seconds, jobs_per_worker=jobs_per_worker,
+        )
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_profiles_code_and_reuses_the_worker(make_pool):
+    pool = make_pool()
+    result = pool.profile("def square(n):\n    return n * n\n\nsquare(3)", benchmark_runs=3, benchmark_seconds=5, memory_top_sites=2)
+    assert any(function[2] == "square" for function in result["stats"])
+    assert result["benchmark"]["runs"] == 3
+    assert "peak_kib" in result["memory"]
+    assert pool._idle.qsize() == 1
+
+
+def test_code_errors_are_reported_without_replacing_the_worker(make_pool):
+    pool = make_pool(jobs_per_worker=2)
+    pool.start()
+    process, _ = pool._idle.queue[0]
+    with pytest.raises(ProfilingError, match="ZeroDivisionError"):
+        pool.profile("1 / 0")
+    assert pool._idle.queue[0][0] is process
+
+
+def test_builtins_changed_by_a_job_are_not_seen_by_the_next(make_pool):
+    pool = make_pool(jobs_per_worker=2)
+    pool.profile("__builtins__['len'] = lambda value: 0")
+    pool.profile("assert len('abc') == 3")
+
+
+def test_worker_is_recycled_after_jobs_per_worker_jobs(make_pool):
+    pool = make_pool(jobs_per_worker=2)
+    pool.start()
+    process, _ = pool._idle.queue[0]
+    pool.profile("import builtins\nbuiltins.leaked = True")
+    assert pool._idle.queue[0][0] is process
+    pool.profile("x = 1")
+    assert not process.is_alive()
+    with pytest.raises(ProfilingError, match="NameError"):
+        pool.profile("leaked")
+
+
+def test_wall_time_limit_replaces_the_worker(make_pool):
+    pool = make_pool(wall_seconds=0.5)
+    pool.start()
+    process, _ = pool._idle.queue[0]
+    with pytest.raises(ProfilingError, match="tempo limite"):
+        pool.profile("import time\ntime.sleep(30)")
+    assert not process.is_alive()
+    assert "stats" in pool.profile("x = 1")
+
+
+def test_cpu_limit_kills_the_worker(make_pool):
+    pool = make_pool(cpu_seconds=1, wall_seconds=10)
+    with pytest.raises(ProfilingError, match="limite de CPU"):
+        pool.profile("while True:\n    pass")
+    assert "stats" in pool.profile("x = 1")
+
+
+def test_memory_limit_raises_memory_error(make_pool):
+    pool = make_pool(memory_mb=64)
+    with pytest.raises(ProfilingError, match="limite de memória"):
+        pool.profile("data = bytearray(512 * 1024 * 1024)")
+    assert "stats" in pool.profile("data = bytearray(1024)")
+
+
+def test_extras_over_budget_are_skipped_and_keep_the_profile(make_pool):
+    pool = make_pool(wall_seconds=5, extras_wall_seconds=0.5)
+    result = pool.profile(
+        "import time\ntime.sleep(0.2)",
+        benchmark_runs=20, benchmark_seconds=30, memory_top_sites=2,
+    )
+    assert result["stats"]
+    assert "tempo limite" in result["benchmark"]["skipped"]
+    assert "tempo limite" in result["memory"]["skipped"]
+    assert "stats" in pool.profile("x = 1")
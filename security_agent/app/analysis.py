@@ -0,0 +1,67 @@
+import logging
+
+import models
+from cache import make_cache_key, result_cache
+from code_context import build_code_context
+from batching import analyze_batch
+from metrics import timed
+from fast_path import build_fast_path_response
+from findings import parse_findings, render_findings
+from structured_output import parse_with_repair
+from suggestion_kb import analyze_with_knowledge_base
+from crew import security_crews, batch_security_crews, findings_security_crews, fast_findings_security_crews, bandit_tool
+
+
+def analyze(code: str) -> models.AnalysisResponse:
+    """
+    Executa a análise completa de um trecho de código: cache, ferramenta e crew.
+    Usada pelo endpoint /analyze e, no modo em processo, diretamente pelo orquestrador.
+    Lança um dos STRUCTURED_OUTPUT_ERRORS se a resposta da IA não validar nem após as correções.
+    """
+    cache_key = make_cache_key(code, "security")
+    cached_response = result_cache.get(cache_key)
+    if cached_response is not None:
+        logging.info("Resultado encontrado no cache. Retornando sem executar o crew.")
+        return models.AnalysisResponse(**cached_response)
+
+    tool_report = bandit_tool._run(code)
+    fast_response = build_fast_path_response(tool_report)
+    if fast_response is not None:
+        logging.info("Nenhum achado relevante do bandit. Retornando resposta determinística sem executar o crew.")
+        result_cache.set(cache_key, fast_response.model_dump())
+        return fast_response
+
+    findings = parse_findings(tool_report)
+    if findings:
+        response = analyze_with_knowledge_base(
+            code,
+            findings,
+            lambda codes: render_findings(tool_report, codes),
+            findings_security_crews,
+            fast_findings_security_crews
+        )
+        result_cache.set(cache_key, response.model_dump())
+        return response
+
+    with security_crews.checkout() as crew:
+        with timed("crew"):
+            result = crew.kickoff(inputs={'code': code})
+        response = parse_with_repair(result.tasks_output[0].raw, models.AnalysisResponse, crew.agents[0].llm)
+
+    result_cache.set(cache_key, response.model_dump())
+    return response
+
+
+def finding_context(code: str, tool_report: str) -> str:
+    """
+    Trecho do código ao redor dos achados do relatório, ou o código completo se o relatório não puder ser interpretado.
+    """
+    findings = parse_findings(tool_report)
+    return build_code_context(code, [finding["line"] for finding in findings]) if findings else code
+
+
+def analyze_files(files: list[models.FileInput]) -> models.BatchAnalysisResponse:
+    """
+    Executa a análise em lote: a ferramenta roda uma única vez e os arquivos são agrupados por chamada ao LLM.
+    """
+    return analyze_batch(files, bandit_tool.run_batch, batch_security_crews, build_fast_path_response, finding_context)
@@ -1,8 +1,40 @@
+import queue
+from contextlib import contextmanager
+from typing import Iterator
+
 from crewai import Agent, Task, Crew, Process
 
-from config import llm
+import config
+from config import llm, llm_for_batch
 from tools import BanditAnalysisTool
-from models import AnalysisResponse
+from models import AnalysisResponse, BatchAnalysisResponse
+
+
+class CrewPool:
+    """
+    Pool de cópias de um crew. O kickoff interpola as entradas nas descrições das tarefas do
+    próprio crew, então requisições concorrentes não podem compartilhar o mesmo objeto: cada
+    uma empresta uma cópia exclusiva do crew de referência. Se todas estiverem em uso, uma nova cópia é
+    criada e devolvida ao pool ao final (até 'size' cópias ociosas).
+    """
+
+    def __init__(self, template: Crew, size: int):
+        self.template = template
+        self._idle: queue.LifoQueue[Crew] = queue.LifoQueue(maxsize=size)
+
+    @contextmanager
+    def checkout(self) -> Iterator[Crew]:
+        try:
+            crew = self._idle.get_nowait()
+        except queue.Empty:
+            crew = self.template.copy()
+        try:
+            yield crew
+        finally:
+            try:
+                self._idle.put_nowait(crew)
+            except queue.Full:
+                pass
 
 
 bandit_tool = BanditAnalysisTool()
@@ -48,3 +80,96 @@ security_crew = Crew(
     tasks=[analysis_task],
     process=Process.sequential
 )
+
+batch_security_analyst_agent = Agent(
+    role=security_analyst_agent.role,
+    goal=f"""
+        Analisar relatórios já gerados pela ferramenta 'bandit' para vários arquivos de uma só vez e traduzi-los
+        em sugestões claras, práticas e acionáveis, agrupadas pelo caminho de cada arquivo.
+        Sua saída final DEVE ser um objeto JSON que valide estritamente com o seguinte schema Pydantic:
+        {BatchAnalysisResponse.model_json_schema()}
+    """,
+    backstory=security_analyst_agent.backstory,
+    tools=[],
+    llm=llm_for_batch,
+    verbose=True,
+    allow_delegation=False
+)
+
+batch_analysis_task = Task(
+    description=(
+        "1. A seguir estão vários arquivos Python, cada um com o seu relatório JSON do bandit já executado. "
+        "Arquivos longos trazem apenas as regiões ao redor dos achados, com o número original de cada linha:\n{files}\n"
+        "2. Para cada arquivo, e para cada vulnerabilidade do seu relatório, crie uma sugestão clara contendo um 'title', "
+        "uma 'explanation' detalhada do risco e um 'code_example' mostrando a correção.\n"
+        "3. Retorne um item em 'results' para CADA arquivo, usando exatamente o mesmo 'path' informado. "
+        "Arquivos sem vulnerabilidades devem ter uma única sugestão com o 'title' 'Nenhuma vulnerabilidade encontrada', "
+        "a 'explanation' 'Nenhuma vulnerabilidade foi identificada no código fornecido.' e o 'code_example' vazio.\n"
+        "4. Formate tudo em um único objeto JSON que corresponda exatamente ao schema Pydantic fornecido em seu objetivo. "
+        "Não adicione nenhuma palavra, comentário ou formatação markdown fora do JSON."
+    ),
+    expected_output=(
+        "Uma string contendo um único objeto JSON válido com a chave 'results', uma lista de objetos com as chaves "
+        "'path' e 'suggestions'."
+    ),
+    agent=batch_security_analyst_agent
+)
+
+batch_security_crew = Crew(
+    agents=[batch_security_analyst_agent],
+    tasks=[batch_analysis_task],
+    process=Process.sequential
+)
+
+
+def build_findings_security_crew(agent_llm) -> Crew:
+    """
+    Crew que converte achados já produzidos pela ferramenta em sugestões, no modelo informado.
+    """
+    findings_security_analyst_agent = Agent(
+        role=security_analyst_agent.role,
+        goal=f"""
+            Converter achados já produzidos pela ferramenta 'bandit' em sugestões claras e acionáveis,
+            uma por código de achado.
+            Sua saída final DEVE ser um objeto JSON que valide estritamente com o seguinte schema Pydantic:
+            {AnalysisResponse.model_json_schema()}
+        """,
+        backstory=security_analyst_agent.backstory,
+        tools=[],
+        llm=agent_llm,
+        verbose=True,
+        allow_delegation=False
+    )
+
+    findings_security_task = Task(
+        description=(
+            "1. Receba o código Python ao redor dos achados, com o número original de cada linha e '...' entre as regiões omitidas "
+            "(ou o código completo, se for curto):\n{code}\n"
+            "2. A seguir está a relatório JSON do bandit, já executada e contendo apenas os achados que precisam de uma nova sugestão:\n{findings}\n"
+            "3. Crie UMA sugestão para cada código de achado distinto, contendo um 'title' que comece obrigatoriamente com o código "
+            "seguido de dois pontos (ex: 'B602: Uso de subprocess com shell=True'), uma 'explanation' detalhada do risco e um 'code_example' mostrando a correção.\n"
+            "4. Formate TODAS as sugestões em um único objeto JSON que corresponda exatamente ao schema Pydantic fornecido em seu objetivo."
+        ),
+        expected_output=(
+            "Uma string contendo um único objeto JSON válido. O JSON deve ter uma chave 'suggestions' contendo uma lista de objetos, "
+            "cada um com as chaves 'title', 'explanation' e 'code_example'."
+        ),
+        agent=findings_security_analyst_agent
+    )
+
+    return Crew(
+        agents=[findings_security_analyst_agent],
+        tasks=[findings_security_task],
+        process=Process.sequential
+    )
+
+
+findings_security_crew = build_findings_security_crew(llm)
+# Variante no modelo rápido, usada pelo roteamento nos casos simples.
+fast_findings_security_crew = build_findings_security_crew(config.fast_llm) if config.FAST_MODEL_NAME else None
+
+# Cada requisição executa o kickoff em uma cópia exclusiva de cada crew (ver CrewPool).
+security_crews = CrewPool(security_crew, config.ANALYZE_MAX_CONCURRENCY)
+batch_security_crews = CrewPool(batch_security_crew, config.ANALYZE_MAX_CONCURRENCY)
+findings_security_crews = CrewPool(findings_security_crew, config.ANALYZE_MAX_CONCURRENCY)
+fast_findings_security_crews = CrewPool(fast_findings_security_crew, config.ANALYZE_MAX_CONCURRENCY) if config.FAST_MODEL_NAME else None
@@ -0,0 +1,57 @@
+import json
+
+import config
+from models import AnalysisResponse, EnrichedSuggestion
+
+
+NO_FINDINGS_SUGGESTION = EnrichedSuggestion(
+    title="Nenhuma vulnerabilidade encontrada",
+    explanation="Nenhuma vulnerabilidade foi identificada no código fornecido.",
+    code_example="",
+)
+
+
+def _templated_suggestion(test_id: str, issues: list[dict]) -> EnrichedSuggestion:
+    first_issue = issues[0]
+    lines = ", ".join(str(issue.get("line_number")) for issue in issues)
+    explanation = (
+        f"O bandit ({test_id} - {first_issue.get('test_name', '')}) apontou: {first_issue.get('issue_text', '')} "
+        f"Severidade {first_issue.get('issue_severity', '')}, confiança {first_issue.get('issue_confidence', '')}. "
+        f"Linhas: {lines}."
+    )
+    if first_issue.get("more_info"):
+        explanation += f" Mais informações: {first_issue['more_info']}"
+    return EnrichedSuggestion(
+        title=f"{test_id}: {first_issue.get('issue_text', '')}".strip(),
+        explanation=explanation,
+        code_example="",
+    )
+
+
+def build_fast_path_response(tool_report: str) -> AnalysisResponse | None:
+    """
+    Monta a resposta sem o LLM quando o relatório do bandit não tem achados, ou só tem achados
+    de testes listados em FAST_PATH_ALLOWLIST. Retorna None quando o crew precisa ser executado.
+    """
+    if not config.FAST_PATH_ENABLED:
+        return None
+
+    try:
+        report = json.loads(tool_report)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(report, dict) or "error" in report or report.get("errors"):
+        return None
+
+    issues_by_test: dict[str, list[dict]] = {}
+    for issue in report.get("results", []):
+        test_id = issue.get("test_id")
+        if test_id not in config.FAST_PATH_ALLOWLIST:
+            return None
+        issues_by_test.setdefault(test_id, []).append(issue)
+
+    if not issues_by_test:
+        return AnalysisResponse(suggestions=[NO_FINDINGS_SUGGESTION])
+    return AnalysisResponse(suggestions=[
+        _templated_suggestion(test_id, issues) for test_id, issues in issues_by_test.items()
+    ])
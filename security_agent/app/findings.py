@@ -0,0 +1,43 @@
+import json
+
+
+# Campos de cada achado do bandit enviados ao LLM; os demais (trecho de código, links, CWE) só aumentam o prompt.
+PROMPT_FIELDS = ("test_id", "test_name", "issue_severity", "issue_confidence", "line_number", "issue_text")
+
+def _load_report(tool_report: str) -> dict | None:
+    try:
+        report = json.loads(tool_report)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(report, dict) or "error" in report:
+        return None
+    return report
+
+
+def parse_findings(tool_report: str) -> list[dict] | None:
+    """
+    Extrai os achados do relatório JSON do bandit como dicionários com 'code' (test ID), 'line' e 'text'.
+    Retorna None se o relatório for um erro ou não puder ser interpretado.
+    """
+    report = _load_report(tool_report)
+    if report is None:
+        return None
+    return [
+        {"code": issue.get("test_id", ""), "line": issue.get("line_number", 0), "text": issue.get("issue_text", "")}
+        for issue in report.get("results", [])
+    ]
+
+
+def render_findings(tool_report: str, codes: set[str]) -> str:
+    """
+    Retorna o relatório do bandit contendo apenas os achados dos test IDs informados,
+    com os campos de PROMPT_FIELDS.
+    """
+    report = _load_report(tool_report) or {}
+    return json.dumps({
+        "results": [
+            {field: issue.get(field) for field in PROMPT_FIELDS}
+            for issue in report.get("results", []) if issue.get("test_id") in codes
+        ],
+        "errors": report.get("errors", []),
+    })
@@ -0,0 +1,196 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+
+class QueueFullError(Exception):
+    """
+    Lançada quando a fila de espera por uma vaga de execução está cheia.
+    'retry_after' é uma estimativa, em segundos, de quando haverá vaga.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Fila de análise cheia. Tente novamente em {retry_after} segundos.")
+        self.retry_after = retry_after
+
+
+class RateLimitExceeded(Exception):
+    """
+    Lançada quando a cota de chamadas ao LLM não libera uma vaga dentro do tempo máximo de espera.
+    """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Limite de chamadas ao LLM atingido. Tente novamente em {retry_after} segundos.")
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """
+    Limita as análises simultâneas: no máximo 'max_concurrency' executam ao mesmo tempo, em um pool
+    de threads próprio (o kickoff do crew é bloqueante e não pode rodar no event loop), e até
+    'max_queue' aguardam por uma vaga. Acima disso a requisição é recusada com QueueFullError.
+    Deve ser usado a partir de um único event loop.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="analysis")
+        self._waiting = 0
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._total_wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._total_run_seconds = 0.0
+
+    def _retry_after(self) -> int:
+        average_run = self._total_run_seconds / self._completed if self._completed else 1.0
+        return max(1, math.ceil(average_run * (self._waiting + 1) / self.max_concurrency))
+
+    async def run(self, func: Callable, *args):
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise QueueFullError(self._retry_after())
+
+        self._waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        waited = time.perf_counter() - queued_at
+        self._admitted += 1
+        self._total_wait_seconds += waited
+        self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+        self._active += 1
+        started = time.perf_counter()
+        try:
+            # Copia o contexto para que a análise enxergue os tempos da requisição corrente.
+            context = contextvars.copy_context()
+            return await asyncio.get_running_loop().run_in_executor(self._executor, context.run, func, *args)
+        finally:
+            self._total_run_seconds += time.perf_counter() - started
+            self._completed += 1
+            self._active -= 1
+            self._semaphore.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "queue_depth": self._waiting,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "average_wait_seconds": round(self._total_wait_seconds / self._admitted, 4) if self._admitted else 0.0,
+            "max_wait_seconds": round(self._max_wait_seconds, 4),
+        }
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: libera 'rate_per_minute' chamadas por minuto, com rajadas de até 'burst'.
+    Com 'rate_per_minute' <= 0 o limite fica desabilitado.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int, max_wait_seconds: float):
+        self.rate_per_second = rate_per_minute / 60
+        self.capacity = max(1, burst)
+        self.max_wait_seconds = max_wait_seconds
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._acquired = 0
+        self._throttled = 0
+        self._rejected = 0
+        self._total_wait_seconds = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def acquire(self):
+        """
+        Consome uma ficha, bloqueando até que ela esteja disponível. Lança RateLimitExceeded
+        se a espera necessária ultrapassar 'max_wait_seconds'.
+        """
+        if self.rate_per_second <= 0:
+            return
+        started = time.monotonic()
+        throttled = False
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self._acquired += 1
+                    if throttled:
+                        self._throttled += 1
+                        self._total_wait_seconds += now - started
+                    return
+                wait = (1 - self._tokens) / self.rate_per_second
+                if now - started + wait > self.max_wait_seconds:
+                    self._rejected += 1
+                    raise RateLimitExceeded(max(1, math.ceil(wait)))
+            throttled = True
+            time.sleep(wait)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "enabled": self.rate_per_second > 0,
+                "rate_per_minute": round(self.rate_per_second * 60, 2),
+                "burst": self.capacity,
+                "available_tokens": round(self._tokens, 2),
+                "acquired": self._acquired,
+                "throttled": self._throttled,
+                "rejected": self._rejected,
+                "total_wait_seconds": round(self._total_wait_seconds, 4),
+            }
+
+
+_llm_buckets: dict[str, TokenBucket] = {}
+_llm_buckets_lock = threading.Lock()
+
+
+def llm_token_bucket(api_key: str, rate_per_minute: float, burst: int, max_wait_seconds: float) -> TokenBucket:
+    """
+    Retorna o token bucket compartilhado pelas chamadas ao LLM feitas com a mesma chave de API no processo.
+    """
+    key = hashlib.sha256((api_key or "").encode()).hexdigest()
+    with _llm_buckets_lock:
+        if key not in _llm_buckets:
+            _llm_buckets[key] = TokenBucket(rate_per_minute, burst, max_wait_seconds)
+        return _llm_buckets[key]
+
+
+def llm_bucket_stats() -> dict:
+    with _llm_buckets_lock:
+        buckets = list(_llm_buckets.items())
+    return {key[:12]: bucket.stats() for key, bucket in buckets}
+
+
+def rate_limited(call: Callable, bucket: TokenBucket) -> Callable:
+    """
+    Envolve o método 'call' de um LLM para que cada chamada consuma uma ficha do bucket.
+    """
+    @functools.wraps(call)
+    def wrapper(*args, **kwargs):
+        bucket.acquire()
+        return call(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,102 @@
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import TYPE_CHECKING, Callable, TypeVar
+
+if TYPE_CHECKING:
+    from crew import CrewPool
+
+import config
+from limits import RateLimitExceeded
+from metrics import ROUTING_DECISIONS
+from tracing import set_span_attributes
+
+
+T = TypeVar("T")
+
+# Threads dedicadas à corrida entre modelos, para não ocupar as vagas do executor de análises.
+_race_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="model-race")
+
+
+def is_simple_case(findings_count: int, code: str) -> bool:
+    """
+    Um caso é simples quando tem até ROUTING_MAX_FINDINGS achados e até ROUTING_MAX_CODE_LINES linhas de código.
+    """
+    return findings_count <= config.ROUTING_MAX_FINDINGS and code.count("\n") + 1 <= config.ROUTING_MAX_CODE_LINES
+
+
+def _record(task: str, model: str, outcome: str, reason: str, started: float):
+    elapsed = time.perf_counter() - started
+    ROUTING_DECISIONS.labels(service=config.SERVICE_NAME, task=task, model=model, outcome=outcome).inc()
+    set_span_attributes(routing_model=model, routing_outcome=outcome)
+    logging.info(f"Roteamento ({task}): modelo '{model}', resultado '{outcome}', motivo '{reason}', {elapsed:.2f}s.")
+
+
+def run_routed(
+    task: str,
+    run: Callable[["CrewPool"], T],
+    primary_crew: "CrewPool",
+    fast_crew: "CrewPool | None",
+    simple: bool
+) -> T:
+    """
+    Executa 'run' (kickoff de um crew emprestado do pool seguido da validação da resposta) no modelo adequado ao caso.
+    Casos simples vão primeiro ao modelo rápido (FAST_MODEL_NAME) e só são repetidos no modelo
+    principal se a resposta não validar ou a chamada falhar. Com ROUTING_RACE, os dois modelos
+    disputam em paralelo e vence a primeira resposta válida dentro de ROUTING_RACE_DEADLINE_SECONDS.
+    Casos complexos, ou sem modelo rápido configurado, vão direto ao modelo principal.
+    Cada decisão é registrada no log e na métrica llm_routing_decisions_total.
+    """
+    started = time.perf_counter()
+    if fast_crew is None or not simple:
+        result = run(primary_crew)
+        _record(task, "primary", "ok", "sem modelo rápido" if fast_crew is None else "caso complexo", started)
+        return result
+    if config.ROUTING_RACE:
+        return _race(task, run, primary_crew, fast_crew, started)
+
+    try:
+        result = run(fast_crew)
+    except RateLimitExceeded:
+        raise
+    except Exception as e:
+        _record(task, "fast", "escalated", f"{type(e).__name__}: {e}", started)
+        result = run(primary_crew)
+        _record(task, "primary", "ok", "escalonado", started)
+        return result
+    _record(task, "fast", "ok", "caso simples", started)
+    return result
+
+
+def _race(task: str, run: Callable[["CrewPool"], T], primary_crew: "CrewPool", fast_crew: "CrewPool", started: float) -> T:
+    """
+    Dispara os dois modelos ao mesmo tempo e devolve a primeira resposta válida. A chamada
+    perdedora continua em segundo plano até terminar, mas seu resultado é descartado.
+    """
+    futures = {}
+    for model, crew in (("fast", fast_crew), ("primary", primary_crew)):
+        # Cada thread recebe sua própria cópia do contexto (tempos da requisição e trace).
+        context = contextvars.copy_context()
+        futures[_race_executor.submit(context.run, run, crew)] = model
+
+    deadline = time.monotonic() + config.ROUTING_RACE_DEADLINE_SECONDS
+    pending = set(futures)
+    errors = {}
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            _record(task, "race", "timeout", f"nenhuma resposta válida em {config.ROUTING_RACE_DEADLINE_SECONDS}s", started)
+            raise TimeoutError(f"Nenhum modelo respondeu em {config.ROUTING_RACE_DEADLINE_SECONDS} segundos.")
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                errors[futures[future]] = e
+                logging.warning(f"Roteamento ({task}): modelo '{futures[future]}' falhou na corrida: {e}")
+                continue
+            _record(task, futures[future], "race_won", "primeira resposta válida", started)
+            return result
+
+    _record(task, "race", "failed", "os dois modelos falharam", started)
+    raise errors["primary"]
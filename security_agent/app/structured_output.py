@@ -0,0 +1,101 @@
+import json
+import logging
+import re
+from typing import TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+import config
+from metrics import STRUCTURED_OUTPUT_REPAIRS, timed
+
+
+M = TypeVar("M", bound=BaseModel)
+
+# Erros de uma resposta do LLM que não pôde ser convertida no schema esperado.
+STRUCTURED_OUTPUT_ERRORS = (json.JSONDecodeError, TypeError, ValidationError)
+
+FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL | re.IGNORECASE)
+TRAILING_COMMA_PATTERN = re.compile(r",\s*([}\]])")
+
+REPAIR_SYSTEM_PROMPT = (
+    "Você corrige respostas que não validam em um schema JSON. Responda apenas com o objeto JSON corrigido, "
+    "sem formatação markdown e sem nenhum texto antes ou depois dele."
+)
+
+
+def extract_json(raw: str):
+    """
+    Faz o parse tolerante da resposta do LLM: aceita cercas markdown, texto antes ou depois do
+    objeto, quebras de linha dentro das strings e vírgulas sobrando antes de '}' ou ']'.
+    Lança json.JSONDecodeError se nenhum objeto JSON puder ser lido, ou TypeError se 'raw' não for texto.
+    """
+    if not isinstance(raw, str):
+        raise TypeError(f"Resposta do LLM não é texto: {type(raw).__name__}")
+    text = raw.strip()
+    fenced = FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1).strip()
+
+    candidates = [text]
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start and (start, end) != (0, len(text) - 1):
+        candidates.append(text[start:end + 1])
+
+    error = None
+    for candidate in candidates:
+        for attempt in (candidate, TRAILING_COMMA_PATTERN.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt, strict=False)
+            except json.JSONDecodeError as e:
+                error = error or e
+    raise error
+
+
+def parse_structured(raw: str, schema: type[M]) -> M:
+    """
+    Extrai o JSON da resposta e o valida no schema. Lança um dos STRUCTURED_OUTPUT_ERRORS em caso de falha.
+    """
+    return schema.model_validate(extract_json(raw))
+
+
+def _repair_messages(raw: str, schema: type[BaseModel], error: Exception) -> list[dict]:
+    return [
+        {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+        {"role": "user", "content": (
+            f"A resposta abaixo não pôde ser validada com o schema {schema.__name__}.\n\n"
+            f"Erro: {error}\n\n"
+            f"Schema:\n{json.dumps(schema.model_json_schema(), ensure_ascii=False)}\n\n"
+            f"Resposta anterior:\n{raw}\n\n"
+            "Retorne a mesma análise como um único objeto JSON válido nesse schema, mantendo o conteúdo das sugestões."
+        )},
+    ]
+
+
+def parse_with_repair(raw: str, schema: type[M], llm) -> M:
+    """
+    Valida a resposta final do crew no schema. Se ela não validar, pede ao mesmo LLM que a corrija,
+    informando o erro de validação, em até STRUCTURED_OUTPUT_MAX_REPAIRS novas chamadas. Apenas a
+    última etapa é repetida: a ferramenta e o crew não são executados de novo.
+    Lança o último erro de validação se nenhuma tentativa produzir uma resposta válida.
+    """
+    for attempt in range(config.STRUCTURED_OUTPUT_MAX_REPAIRS + 1):
+        try:
+            with timed("json_parse"):
+                response = parse_structured(raw, schema)
+        except STRUCTURED_OUTPUT_ERRORS as e:
+            if attempt == config.STRUCTURED_OUTPUT_MAX_REPAIRS:
+                if attempt:
+                    STRUCTURED_OUTPUT_REPAIRS.labels(
+                        service=config.SERVICE_NAME, schema=schema.__name__, outcome="failed"
+                    ).inc()
+                logging.error(f"Resposta do LLM inválida para {schema.__name__} após {attempt} correções: {e}")
+                logging.error(f"Resposta recebida: {raw}")
+                raise
+            logging.warning(f"Resposta do LLM inválida para {schema.__name__}: {e}. Solicitando correção ({attempt + 1}).")
+            with timed("json_repair"):
+                raw = llm.call(_repair_messages(raw, schema, e))
+            continue
+        if attempt:
+            STRUCTURED_OUTPUT_REPAIRS.labels(service=config.SERVICE_NAME, schema=schema.__name__, outcome="repaired").inc()
+            logging.info(f"Resposta do LLM corrigida para {schema.__name__} após {attempt} correções.")
+        return response
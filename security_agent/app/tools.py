@@ -1,10 +1,77 @@
 import subprocess
 import tempfile
+import threading
+import logging
+import io
 import os
 import json
 
 from crewai.tools import BaseTool
 
+from metrics import TOOL_LATENCY, timed
+
+
+class InProcessBandit:
+    """
+    Executa o bandit dentro do próprio processo sobre o código em memória.
+    A configuração e o conjunto de testes (plugins) são carregados uma única vez e reutilizados.
+    """
+
+    # O teste B613 (trojansource) lê o arquivo do disco; códigos com caracteres
+    # bidirecionais são delegados ao subprocess para não perder essa verificação.
+    FILE_BASED_TESTS = ["B613"]
+
+    def __init__(self):
+        from bandit.core import config as bandit_config
+        from bandit.core import manager as bandit_manager
+        from bandit.core import metrics as bandit_metrics
+        from bandit.plugins.trojansource import BIDI_CHARACTERS
+
+        logging.getLogger("bandit").setLevel(logging.ERROR)
+        self._bidi_characters = BIDI_CHARACTERS
+        self._metrics_class = bandit_metrics.Metrics
+        self._manager = bandit_manager.BanditManager(
+            bandit_config.BanditConfig(), "file", quiet=True, profile={"exclude": self.FILE_BASED_TESTS}
+        )
+        self._lock = threading.Lock()
+
+    def supports(self, code: str) -> bool:
+        return not any(char in code for char in self._bidi_characters)
+
+    def scan(self, files: dict[str, str]) -> dict:
+        """
+        Analisa os arquivos informados (caminho -> código) e retorna um relatório
+        com as chaves 'results' e 'errors' no mesmo formato da saída JSON do bandit.
+        """
+        with self._lock:
+            manager = self._manager
+            manager.results = []
+            manager.skipped = []
+            manager.scores = []
+            manager.metrics = self._metrics_class()
+            manager.files_list = list(files)
+
+            scanned_files = list(files)
+            for filename, code in files.items():
+                manager._parse_file(filename, io.BytesIO(code.encode("utf-8")), scanned_files)
+
+            issues = sorted(manager.get_issue_list(), key=lambda issue: (issue.fname, issue.lineno))
+            return {
+                "results": [issue.as_dict() for issue in issues],
+                "errors": [{"filename": filename, "reason": reason} for filename, reason in manager.skipped],
+            }
+
+
+def _build_bandit_engine() -> InProcessBandit | None:
+    try:
+        return InProcessBandit()
+    except Exception as e:
+        logging.warning(f"Não foi possível inicializar o bandit em processo, será usado o subprocess: {e}")
+        return None
+
+
+bandit_engine = _build_bandit_engine()
+
 
 class BanditAnalysisTool(BaseTool):
     name: str = "Analisador de Segurança de Código Python com Bandit"
@@ -13,7 +80,20 @@ class BanditAnalysisTool(BaseTool):
         "Ela recebe o código como uma string e retorna o relatório de vulnerabilidades em formato JSON bruto."
     )
 
+    @timed("bandit", TOOL_LATENCY, tool="bandit")
     def _run(self, code: str) -> str:
+        """
+        Executa o bandit em processo sobre o código em memória, recorrendo ao subprocess em caso de falha.
+        """
+        if bandit_engine is not None and bandit_engine.supports(code):
+            try:
+                return json.dumps(bandit_engine.scan({"snippet.py": code}))
+            except Exception as e:
+                logging.warning(f"Falha no bandit em processo, usando o subprocess: {e}")
+
+        return self._run_subprocess(code)
+
+    def _run_subprocess(self, code: str) -> str:
         """
         Executa o bandit em um arquivo temporário contendo o código fornecido.
         """
@@ -40,3 +120,66 @@ class BanditAnalysisTool(BaseTool):
             return json.dumps(error_report)
 
         return result.stdout
+
+    @timed("bandit_batch", TOOL_LATENCY, tool="bandit_batch")
+    def run_batch(self, files: dict[str, str]) -> dict[str, str]:
+        """
+        Executa o bandit uma única vez sobre todos os arquivos e agrupa o relatório por arquivo.
+        """
+        paths = list(files)
+        reports = {path: {"results": [], "errors": []} for path in paths}
+
+        bandit_report = None
+        if bandit_engine is not None and all(bandit_engine.supports(code) for code in files.values()):
+            try:
+                bandit_report = bandit_engine.scan(files)
+            except Exception as e:
+                logging.warning(f"Falha no bandit em processo para o lote, usando o subprocess: {e}")
+
+        if bandit_report is None:
+            bandit_report = self._run_batch_subprocess(files)
+            if "error" in bandit_report:
+                error_report = json.dumps(bandit_report)
+                return {path: error_report for path in paths}
+
+        for section in ("results", "errors"):
+            for item in bandit_report.get(section, []):
+                path = item.get("filename")
+                if path in reports:
+                    reports[path][section].append(item)
+
+        return {path: json.dumps(report) for path, report in reports.items()}
+
+    def _run_batch_subprocess(self, files: dict[str, str]) -> dict:
+        """
+        Executa o comando bandit uma única vez sobre um diretório temporário com todos os arquivos.
+        Os arquivos são gravados com nomes sequenciais para evitar colisões e caminhos inválidos,
+        e os nomes são convertidos de volta para os caminhos originais no relatório.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_to_path = {}
+            for index, path in enumerate(files):
+                temp_filename = os.path.join(temp_dir, f"file_{index:05d}.py")
+                with open(temp_filename, "w", encoding="utf-8") as temp_file:
+                    temp_file.write(files[path])
+                temp_to_path[temp_filename] = path
+
+            result = subprocess.run(
+                ["bandit", "-r", "-f", "json", temp_dir],
+                capture_output=True,
+                text=True,
+                check=False
+            )
+
+        try:
+            bandit_report = json.loads(result.stdout)
+        except json.JSONDecodeError:
+            return {
+                "error": "Falha ao executar a ferramenta Bandit.",
+                "details": result.stderr.strip()
+            }
+
+        for section in ("results", "errors"):
+            for item in bandit_report.get(section, []):
+                item["filename"] = temp_to_path.get(item.get("filename"), item.get("filename"))
+        return bandit_report
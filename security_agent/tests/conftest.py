@@ -0,0 +1,5 @@
+import os
+
+# A configuração do serviço exige estas variáveis ao ser importada; os testes não chamam o LLM.
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.setdefault("MODEL_NAME", "gemini-test")
@@ -0,0 +1,39 @@
+from crew import CrewPool
+
+
+class FakeCrew:
+    def __init__(self):
+        self.copies = 0
+
+    def copy(self):
+        self.copies += 1
+        return FakeCrew()
+
+
+def test_concurrent_checkouts_get_distinct_copies():
+    template = FakeCrew()
+    pool = CrewPool(template, size=2)
+    with pool.checkout() as first, pool.checkout() as second:
+        assert first is not second
+        assert template not in (first, second)
+    assert template.copies == 2
+
+
+def test_released_copy_is_reused():
+    template = FakeCrew()
+    pool = CrewPool(template, size=1)
+    with pool.checkout() as first:
+        pass
+    with pool.checkout() as second:
+        assert second is first
+    assert template.copies == 1
+
+
+def test_keeps_at_most_size_idle_copies():
+    template = FakeCrew()
+    pool = CrewPool(template, size=1)
+    with pool.checkout(), pool.checkout():
+        pass
+    with pool.checkout(), pool.checkout():
+        pass
+    assert template.copies == 3
@@ -0,0 +1,86 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+import structured_output
+from models import AnalysisResponse
+from structured_output import extract_json, parse_with_repair
+
+
+VALID = '{"suggestions": [{"title": "B602: shell=True", "explanation": "Risco.", "code_example": "run([...])"}]}'
+
+
+class FakeLLM:
+    """LLM de correção que devolve as respostas informadas, na ordem, e guarda as mensagens recebidas."""
+
+    def __init__(self, *responses: str):
+        self.responses = list(responses)
+        self.calls = []
+
+    def call(self, messages: list[dict]) -> str:
+        self.calls.append(messages)
+        return self.responses.pop(0)
+
+
+@pytest.fixture(autouse=True)
+def max_repairs(monkeypatch):
+    monkeypatch.setattr(structured_output.config, "STRUCTURED_OUTPUT_MAX_REPAIRS", 2)
+
+
+@pytest.mark.parametrize("raw", [
+    f"```json\n{VALID}\n```",
+    f"Segue a análise:\n{VALID}\nEspero ter ajudado.",
+    VALID.replace('"}]}', '",}],}'),
+    VALID.replace("Risco.", "Risco\nem duas linhas."),
+])
+def test_extract_json_tolerates_common_llm_noise(raw):
+    data = extract_json(raw)
+    assert data["suggestions"][0]["title"] == "B602: shell=True"
+
+
+def test_extract_json_rejects_text_without_object():
+    with pytest.raises(json.JSONDecodeError):
+        extract_json("Não encontrei vulnerabilidades.")
+    with pytest.raises(TypeError):
+        extract_json(None)
+
+
+def test_valid_response_does_not_call_the_llm():
+    llm = FakeLLM()
+    response = parse_with_repair(VALID, AnalysisResponse, llm)
+    assert response.suggestions[0].title == "B602: shell=True"
+    assert llm.calls == []
+
+
+def test_invalid_response_is_repaired_with_the_validation_error():
+    invalid = '{"suggestions": [{"title": "B602: shell=True"}]}'
+    llm = FakeLLM(VALID)
+    response = parse_with_repair(invalid, AnalysisResponse, llm)
+    assert response.suggestions[0].code_example == "run([...])"
+    assert len(llm.calls) == 1
+    prompt = llm.calls[0][-1]["content"]
+    assert invalid in prompt
+    assert "explanation" in prompt
+
+
+def test_each_repair_receives_the_previous_answer():
+    llm = FakeLLM("ainda inválido", VALID)
+    parse_with_repair("{}", AnalysisResponse, llm)
+    assert len(llm.calls) == 2
+    assert "ainda inválido" in llm.calls[1][-1]["content"]
+
+
+def test_gives_up_after_max_repairs():
+    llm = FakeLLM("{}", '{"suggestions": "nenhuma"}')
+    with pytest.raises(ValidationError):
+        parse_with_repair("sem json", AnalysisResponse, llm)
+    assert len(llm.calls) == 2
+
+
+def test_no_repairs_when_disabled(monkeypatch):
+    monkeypatch.setattr(structured_output.config, "STRUCTURED_OUTPUT_MAX_REPAIRS", 0)
+    llm = FakeLLM(VALID)
+    with pytest.raises(json.JSONDecodeError):
+        parse_with_repair("sem json", AnalysisResponse, llm)
+    assert llm.calls == []
@@ -0,0 +1,39 @@
+import sqlite3
+
+import suggestion_kb
+from models import EnrichedSuggestion
+from suggestion_kb import SuggestionKnowledgeBase
+
+
+SUGGESTION = EnrichedSuggestion(title="B602: shell=True", explanation="Risco.", code_example="run([...])")
+
+
+def test_persisted_entries_are_keyed_by_model(tmp_path, monkeypatch):
+    path = str(tmp_path / "kb.db")
+    monkeypatch.setattr(suggestion_kb.config, "MODEL_NAME", "modelo-a")
+    SuggestionKnowledgeBase(sqlite_path=path).learn(["B602"], [SUGGESTION])
+
+    assert SuggestionKnowledgeBase(sqlite_path=path).lookup(["B602"]) == {"B602": SUGGESTION}
+
+    monkeypatch.setattr(suggestion_kb.config, "MODEL_NAME", "modelo-b")
+    assert SuggestionKnowledgeBase(sqlite_path=path).lookup(["B602"]) == {}
+
+
+def test_entries_without_model_are_discarded(tmp_path, monkeypatch):
+    path = str(tmp_path / "kb.db")
+    legacy = sqlite3.connect(path)
+    legacy.execute(
+        "CREATE TABLE suggestion_kb (code TEXT NOT NULL, prompt_version TEXT NOT NULL, value TEXT NOT NULL, "
+        "PRIMARY KEY (code, prompt_version))"
+    )
+    legacy.execute(
+        "INSERT INTO suggestion_kb VALUES (?, ?, ?)",
+        ("B602", suggestion_kb.config.PROMPT_VERSION, SUGGESTION.model_dump_json())
+    )
+    legacy.commit()
+    legacy.close()
+
+    knowledge_base = SuggestionKnowledgeBase(sqlite_path=path)
+    assert knowledge_base.lookup(["B602"]) == {}
+    knowledge_base.learn(["B602"], [SUGGESTION])
+    assert SuggestionKnowledgeBase(sqlite_path=path).lookup(["B602"]) == {"B602": SUGGESTION}
@@ -0,0 +1,85 @@
+import pytest
+
+import limits
+from limits import RateLimitExceeded, TokenBucket, rate_limited
+
+
+class FakeClock:
+    """Relógio controlado pelo teste: sleep() apenas avança o tempo."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(limits.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(limits.time, "sleep", fake.sleep)
+    return fake
+
+
+def test_burst_is_served_without_waiting(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst=3, max_wait_seconds=10)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+    assert bucket.stats()["available_tokens"] == 0
+
+
+def test_waits_for_refill_when_empty(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst=1, max_wait_seconds=10)
+    bucket.acquire()
+    bucket.acquire()
+    assert clock.sleeps == [pytest.approx(1.0)]
+    stats = bucket.stats()
+    assert stats["acquired"] == 2
+    assert stats["throttled"] == 1
+    assert stats["total_wait_seconds"] == pytest.approx(1.0)
+
+
+def test_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate_per_minute=60, burst=2, max_wait_seconds=10)
+    bucket.acquire()
+    clock.now += 3600
+    assert bucket.stats()["available_tokens"] == 2
+
+
+def test_rejects_when_wait_exceeds_limit(clock):
+    bucket = TokenBucket(rate_per_minute=6, burst=1, max_wait_seconds=5)
+    bucket.acquire()
+    with pytest.raises(RateLimitExceeded) as error:
+        bucket.acquire()
+    assert error.value.retry_after == 10
+    assert clock.sleeps == []
+    assert bucket.stats()["rejected"] == 1
+
+
+def test_disabled_bucket_never_blocks(clock):
+    bucket = TokenBucket(rate_per_minute=0, burst=1, max_wait_seconds=0)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+
+def test_rate_limited_consumes_a_token_per_call(clock):
+    bucket = TokenBucket(rate_per_minute=6, burst=2, max_wait_seconds=0)
+    call = rate_limited(lambda value: value * 2, bucket)
+    assert call(2) == 4
+    assert call(3) == 6
+    with pytest.raises(RateLimitExceeded):
+        call(4)
+
+
+def test_buckets_are_shared_per_api_key():
+    first = limits.llm_token_bucket("chave-compartilhada", 60, 5, 10)
+    assert limits.llm_token_bucket("chave-compartilhada", 1, 1, 1) is first
+    assert limits.llm_token_bucket("outra-chave", 60, 5, 10) is not first